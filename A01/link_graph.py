@@ -0,0 +1,136 @@
+import struct
+import sys
+from array import array
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from utils import hash_url
+
+# Binary edge file layout: MAGIC | version (uint32) | (source, target) int32
+# pairs, all little-endian. A02/edge_list.py reads the same layout, so
+# page_rank.py can rank a crawl without converting it to text.
+EDGE_FILE_MAGIC = b"EDGS"
+EDGE_FILE_VERSION = 1
+
+# The number of edges kept in memory before they are written out.
+EDGE_BUFFER_SIZE = 65536
+
+def resolve_link(base_url: str, href: str):
+    """
+    Description:
+        Returns the absolute URL a hyperlink points to, without its fragment.
+
+    Parameters:
+        base_url (str): The URL of the page the link is on.
+        href (str): The href of the link.
+
+    Returns:
+        str: The absolute URL, or None if the link does not point to a web page.
+    """
+    if (not href):
+        return None
+
+    url, _ = urldefrag(urljoin(base_url, href.strip()))
+    if (urlparse(url).scheme not in ("http", "https")):
+        return None
+
+    return url
+
+class LinkGraphWriter:
+    """
+    Description:
+        Streams the link graph found by a crawl to disk. Every URL gets an
+        integer ID the first time it is seen, keyed by its SHA256 hash, and
+        is appended to the ID to URL table (one "id<TAB>hash<TAB>url" line).
+        Links are buffered and appended to the binary edge file as int32
+        (source, target) pairs, so memory use does not grow with the edges.
+
+    Parameters:
+        edge_file (str): The path of the binary edge file.
+        url_file (str): The path of the ID to URL table.
+    """
+    def __init__(self, edge_file: str, url_file: str):
+        self.edge_file = edge_file
+        self.url_file = url_file
+        self.ids = {}
+        self.num_edges = 0
+        self._edges = array("i")
+        self._edge_out = open(edge_file, "wb")
+        self._edge_out.write(EDGE_FILE_MAGIC + struct.pack("<I", EDGE_FILE_VERSION))
+        self._url_out = open(url_file, "w", encoding="utf-8")
+
+    def node_id(self, url: str):
+        """
+        Description:
+            Returns the ID of a URL, assigning the next one if it is new.
+
+        Parameters:
+            url (str): The URL.
+
+        Returns:
+            int: The ID of the URL.
+        """
+        hashed = hash_url(url)
+        node = self.ids.get(hashed)
+        if (node is None):
+            node = len(self.ids)
+            self.ids[hashed] = node
+            self._url_out.write(f"{node}\t{hashed}\t{url}\n")
+
+        return node
+
+    def add_links(self, url: str, links: list):
+        """
+        Description:
+            Records the links of a crawled page.
+
+        Parameters:
+            url (str): The URL of the page.
+            links (list): The absolute URLs the page links to.
+        """
+        source = self.node_id(url)
+        for link in links:
+            self._edges.append(source)
+            self._edges.append(self.node_id(link))
+        self.num_edges += len(links)
+
+        if (len(self._edges) >= 2 * EDGE_BUFFER_SIZE):
+            self.flush()
+
+        return
+
+    def flush(self):
+        """
+        Description:
+            Writes the buffered edges and URLs to disk.
+        """
+        if (self._edges.itemsize != 4):
+            raise TypeError("array('i') is not 32 bits on this platform")
+
+        edges = self._edges
+        if (sys.byteorder == "big"):
+            edges = array("i", edges)
+            edges.byteswap()
+        edges.tofile(self._edge_out)
+        self._edges = array("i")
+        self._edge_out.flush()
+        self._url_out.flush()
+
+        return
+
+    def close(self):
+        """
+        Description:
+            Writes everything that is left and closes the files.
+        """
+        self.flush()
+        self._edge_out.close()
+        self._url_out.close()
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
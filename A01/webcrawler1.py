@@ -1,6 +1,7 @@
 import argparse
 import datetime as dt
 from bs4 import BeautifulSoup
+from link_graph import LinkGraphWriter, resolve_link
 from utils import *
 
 def get_dt():
@@ -10,10 +11,11 @@ def get_dt():
     """
     return dt.datetime.now()
 
-def crawl_urls(url: str, max_depth: int, rewrite: bool = False, verbose: bool = False, depth:int = 0):
+def crawl_urls(url: str, max_depth: int, rewrite: bool = False, verbose: bool = False, depth:int = 0, graph: LinkGraphWriter = None):
     """
     Description:
-        Crawls the given URL and all of its hyperlinks.
+        Crawls the given URL and all of its hyperlinks, recording the links
+        of every page in the link graph if one is given.
 
     Parameters:
         url (str): The URL to crawl.
@@ -21,6 +23,7 @@ def crawl_urls(url: str, max_depth: int, rewrite: bool = False, verbose: bool =
         rewrite (bool): Whether to rewrite the files.
         verbose (bool): Whether to print the URLs as they are crawled.
         depth (int): The current depth of the crawler.
+        graph (LinkGraphWriter): The link graph of the crawl.
     """
     http_resp = get_page(url, {})
     if (not http_resp):
@@ -33,6 +36,11 @@ def crawl_urls(url: str, max_depth: int, rewrite: bool = False, verbose: bool =
 
     hyperlinks = soup.find_all("a")
     links = [link.get("href") for link in hyperlinks]
+    if (graph is not None):
+        # The page is recorded under the same URL its in-links resolve to.
+        source = resolve_link(url, url)
+        if (source):
+            graph.add_links(source, [resolved for resolved in (resolve_link(url, href) for href in links) if resolved])
 
     filename = "{}.txt".format(hashed)
     if (not rewrite and os.path.isfile(filename) and verbose):
@@ -46,7 +54,7 @@ def crawl_urls(url: str, max_depth: int, rewrite: bool = False, verbose: bool =
         print(f"{url},{depth}")
 
     for link in links:
-        crawl_urls(link, max_depth - 1, rewrite, verbose, depth + 1)
+        crawl_urls(link, max_depth - 1, rewrite, verbose, depth + 1, graph)
 
     return
 
@@ -64,6 +72,8 @@ def main():
     parser.add_argument("max_depth", help="The maximum depth to crawl.", type=int)
     parser.add_argument("--rewrite", help="Rewrite the files.", action="store_true")
     parser.add_argument("--verbose", help="Print the URLs as they are crawled.", action="store_true")
+    parser.add_argument("--graph", help="The path prefix of the link graph files (<prefix>.edges and <prefix>.urls).", type=str, default="crawler1")
+    parser.add_argument("--no-graph", help="Do not write the link graph.", dest="graph", action="store_const", const=None)
     parser.add_argument("url", help="The URL to crawl.", type=str)
     args = parser.parse_args()
 
@@ -83,7 +93,14 @@ def main():
     print_giraffe()
     print_loading()
 
-    crawl_urls(args.url, args.max_depth, args.rewrite, args.verbose)
+    if (args.graph is None):
+        crawl_urls(args.url, args.max_depth, args.rewrite, args.verbose)
+        return
+
+    with LinkGraphWriter(args.graph + ".edges", args.graph + ".urls") as graph:
+        crawl_urls(args.url, args.max_depth, args.rewrite, args.verbose, graph=graph)
+    print(f"Link graph: {len(graph.ids)} URLs, {graph.num_edges} links in {graph.edge_file} and {graph.url_file}")
+
     return
 
 if (__name__ == "__main__"):
@@ -0,0 +1,157 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from typing import Callable, List
+
+import numpy as np
+
+from boolean_query import live_documents, parse_query, search
+from index_segments import open_index
+
+QUERY_SHAPES = ["{0} AND {1}", "{0} AND {1} AND {2}", "{0} OR {1}", "{0} AND NOT {1}", "({0} OR {1}) AND {2}", "{0} AND {1} AND {2} AND {3}"]
+
+def index_terms(index):
+    """
+    Description:
+        Returns the document frequency of every term of an index.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+
+    Returns:
+        (Counter): The document frequency of every term.
+    """
+    frequencies = Counter()
+    for segment in getattr(index, "segments", [index]):
+        frequencies.update(dict(segment.terms.items()))
+
+    return frequencies
+
+def make_query_log(frequencies: Counter, count: int, seed: int):
+    """
+    Description:
+        Generates boolean queries of the shapes in QUERY_SHAPES. Terms are
+        drawn with probability proportional to their document frequency, so
+        like real queries most of them are common terms with long postings.
+
+    Parameters:
+        frequencies (Counter): The document frequency of every term.
+        count (int): The number of queries.
+        seed (int): The random seed.
+
+    Returns:
+        (List[str]): The queries, made of index terms.
+    """
+    rng = random.Random(seed)
+    terms = sorted(frequencies)
+    weights = [frequencies[term] for term in terms]
+    queries = []
+    for _ in range(count):
+        shape = rng.choice(QUERY_SHAPES)
+        queries.append(shape.format(*rng.choices(terms, weights, k=4)))
+
+    return queries
+
+def evaluate_naive(index, node: tuple):
+    """
+    Description:
+        Evaluates a query node the straightforward way: every term's postings
+        are decoded whole and the lists are combined in the order written.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        node (tuple): The query node.
+
+    Returns:
+        (np.ndarray): The sorted document numbers matched.
+    """
+    kind = node[0]
+    if kind == "term":
+        return index.postings_of(node[1])[0]
+    if kind == "not":
+        return np.setdiff1d(live_documents(index), evaluate_naive(index, node[1]), assume_unique=True)
+    if kind == "or":
+        return np.unique(np.concatenate([evaluate_naive(index, child) for child in node[1]]))
+
+    result = evaluate_naive(index, node[1][0])
+    for child in node[1][1:]:
+        result = np.intersect1d(result, evaluate_naive(index, child), assume_unique=True)
+
+    return result
+
+def run(name: str, queries: List[str], engine: Callable[[str], np.ndarray]):
+    """
+    Description:
+        Answers every query, timing each, and prints the throughput and
+        latency percentiles.
+
+    Parameters:
+        name (str): The name of the engine.
+        queries (List[str]): The queries.
+        engine (Callable[[str], np.ndarray]): Returns the documents matching a query.
+
+    Returns:
+        (List[np.ndarray]): The documents matching every query.
+    """
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(engine(query))
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<10} {len(queries) / (latencies.sum() / 1000):>10.1f} {latencies.mean():>9.3f} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f}")
+
+    return results
+
+def main():
+    """
+    Description:
+        Main function of the program. Answers a log of boolean queries with
+        the naive evaluation and with the query engine, prints the latency
+        of each and checks that they agree.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Boolean Query Benchmark")
+    parser.add_argument("--index", default="wikipedia.index", help="the inverted index file, or the directory of a segmented index.")
+    parser.add_argument("--queries", type=int, default=1000, help="the number of queries generated.")
+    parser.add_argument("--seed", type=int, default=42, help="the random seed.")
+    parser.add_argument("--log", help="a query log file, one query per line; written if it does not exist.")
+    args = parser.parse_args()
+
+    try:
+        index = open_index(args.index)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    if args.log and os.path.isfile(args.log):
+        with open(args.log, "r", encoding="utf-8") as file:
+            queries = file.read().splitlines()
+    else:
+        queries = make_query_log(index_terms(index), args.queries, args.seed)
+        if args.log:
+            with open(args.log, "w", encoding="utf-8") as file:
+                file.write("\n".join(queries))
+
+    # The queries are made of index terms, which are not normalized again.
+    print(f"{index.num_docs} documents, {len(queries)} queries")
+    print(f"{'engine':<10} {'queries/s':>10} {'mean (ms)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+
+    naive = run("naive", queries, lambda query: evaluate_naive(index, parse_query(query, lambda word: word)))
+    ordered = run("ordered", queries, lambda query: search(index, query, lambda word: word))
+
+    mismatches = sum(not np.array_equal(a, b) for a, b in zip(naive, ordered))
+    print(f"{mismatches} of {len(queries)} results differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import itertools
+import os
+import time
+
+import nltk.stem
+
+from normalization import NORMALIZATION_CACHE_SIZE, porter_normalizer
+from wikipedia_processing import _remove_stopwords, get_tokenized_corpus
+
+def time_stemming(stem, tokens: list):
+    """
+    Description:
+        Stems every token and returns the time taken.
+
+    Parameters:
+        stem (Callable[[str], str]): The stemming function.
+        tokens (list): The tokens to stem.
+
+    Returns:
+        (float): The time taken, in seconds.
+    """
+    start = time.perf_counter()
+    for token in tokens:
+        stem(token)
+
+    return time.perf_counter() - start
+
+def main():
+    """
+    Description:
+        Main function of the program. Stems the first tokens of the
+        Wikipedia corpus with the plain Porter stemmer, then with the cached
+        stemmer at every cache size, starting empty and starting from a
+        cache saved by the previous run, and prints the time and hit rate
+        of each.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Stem Cache Benchmark")
+    parser.add_argument("--tokens", type=int, default=2000000, help="the number of corpus tokens to stem.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1 << 10, 1 << 14, NORMALIZATION_CACHE_SIZE], help="the cache sizes to time.")
+    parser.add_argument("--cache-file", default="benchmark_stems.json", help="the file the warm cache is saved to.")
+    args = parser.parse_args()
+
+    tokens = list(itertools.islice(_remove_stopwords(get_tokenized_corpus()), args.tokens))
+    print(f"{len(tokens)} tokens, {len(set(tokens))} distinct")
+
+    baseline = time_stemming(nltk.stem.PorterStemmer().stem, tokens)
+    print(f"{'stemmer':<22} {'time (s)':>9} {'speedup':>8} {'hit rate':>9}")
+    print(f"{'porter':<22} {baseline:>9.2f} {1.0:>8.2f} {'-':>9}")
+
+    for size in args.sizes:
+        stemmer = porter_normalizer(size)
+        elapsed = time_stemming(stemmer, tokens)
+        print(f"{'cached-' + str(size):<22} {elapsed:>9.2f} {baseline / elapsed:>8.2f} {stemmer.hit_rate():>9.2%}")
+
+        stemmer.save(args.cache_file)
+        warm = porter_normalizer(size)
+        warm.load(args.cache_file)
+        elapsed = time_stemming(warm, tokens)
+        print(f"{'cached-' + str(size) + '-warm':<22} {elapsed:>9.2f} {baseline / elapsed:>8.2f} {warm.hit_rate():>9.2%}")
+
+    os.remove(args.cache_file)
+
+if __name__ == "__main__":
+    main()
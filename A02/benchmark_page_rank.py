@@ -0,0 +1,313 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import scipy
+
+ENGINES = ["dict", "csr", "parallel", "blocked"]
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+REPORT_FILE_NAME = "page_rank_benchmark.json"
+
+# Average number of links per node of the generated graphs, close to the
+# 8.2 of web-Stanford.
+EDGES_PER_NODE = 8
+
+def power_law_graph(num_edges: int, dangling: float, exponent: float, seed: int):
+    """
+    Description:
+        Generates a directed graph whose in-degrees and out-degrees follow a
+        power law: the source and the target of every edge are drawn with a
+        probability proportional to rank ** -exponent of a node in a random
+        popularity order. A fraction of the nodes never link anywhere, which
+        makes them dangling nodes.
+
+    Parameters:
+        num_edges (int): The number of edges.
+        dangling (float): The fraction of nodes without out-links.
+        exponent (float): The exponent of the power law.
+        seed (int): The random seed.
+
+    Returns:
+        sources (np.ndarray): The from_node of every edge.
+        targets (np.ndarray): The to_node of every edge.
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = max(2, num_edges // EDGES_PER_NODE)
+    weights = np.arange(1, num_nodes + 1, dtype=np.float64) ** -exponent
+
+    linking = rng.permutation(num_nodes)[:max(1, int(num_nodes * (1 - dangling)))]
+    source_weights = weights[:len(linking)] / weights[:len(linking)].sum()
+    sources = linking[rng.choice(len(linking), size=num_edges, p=source_weights)]
+
+    popularity = rng.permutation(num_nodes)
+    targets = popularity[rng.choice(num_nodes, size=num_edges, p=weights / weights.sum())]
+
+    # Node IDs start at 1, as in the SNAP data sets.
+    return sources + 1, targets + 1
+
+def write_edge_list(path: str, sources: np.ndarray, targets: np.ndarray, description: str):
+    """
+    Description:
+        Writes a graph in the format of data/web-Stanford.txt.
+
+    Parameters:
+        path (str): The path of the edge list.
+        sources (np.ndarray): The from_node of every edge.
+        targets (np.ndarray): The to_node of every edge.
+        description (str): The comment written at the top of the file.
+
+    Returns:
+        None
+    """
+    temp_file = path + ".tmp"
+    with open(temp_file, "w") as file:
+        file.write(f"# {description}\n# FromNodeId\tToNodeId\n")
+        for start in range(0, len(sources), 1_000_000):
+            lines = zip(sources[start:start + 1_000_000].tolist(), targets[start:start + 1_000_000].tolist())
+            file.write("".join(f"{source}\t{target}\n" for source, target in lines))
+    os.replace(temp_file, path)
+
+    return
+
+def graph_file(workdir: str, num_edges: int, dangling: float, exponent: float, seed: int):
+    """
+    Description:
+        Returns the edge list of a generated graph, generating it the first
+        time it is asked for.
+
+    Parameters:
+        workdir (str): The directory of the generated graphs.
+        num_edges (int): The number of edges.
+        dangling (float): The fraction of nodes without out-links.
+        exponent (float): The exponent of the power law.
+        seed (int): The random seed.
+
+    Returns:
+        (str): The path of the edge list.
+    """
+    path = os.path.join(workdir, f"powerlaw-{num_edges}-{dangling:g}-{exponent:g}-{seed}.txt")
+    if not os.path.exists(path):
+        os.makedirs(workdir, exist_ok=True)
+        sources, targets = power_law_graph(num_edges, dangling, exponent, seed)
+        write_edge_list(path, sources, targets, f"Synthetic power-law graph: {num_edges} edges, {dangling:g} dangling, exponent {exponent:g}, seed {seed}")
+
+    return path
+
+def peak_memory_mb():
+    """
+    Description:
+        Returns the peak resident memory of this process and of its finished
+        child processes, the largest of the two.
+
+    Returns:
+        (float): The peak memory in megabytes.
+    """
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+def run_engine(engine: str, path: str, lambda_: float, thr: float, maxiteration: int, workers: int, budget: int):
+    """
+    Description:
+        Loads a graph and ranks it with one engine, timing both. Every engine
+        loads the text edge list itself, without its caches, so the load
+        times compare the parsers.
+
+    Parameters:
+        engine (str): The engine, one of ENGINES.
+        path (str): The path of the edge list.
+        lambda_ (float): The λ parameter value.
+        thr (float): The threshold value.
+        maxiteration (int): The maximum number of iterations.
+        workers (int): The number of processes of the parallel engine.
+        budget (int): The memory budget of the blocked engine, in megabytes.
+
+    Returns:
+        (dict): The measurements.
+    """
+    import page_rank
+    from edge_list import read_edges
+    from page_rank_blocked import blocked_graph_dir, page_rank_blocked, partition_graph
+    from page_rank_csr import build_transition_matrix, index_nodes, page_rank_csr
+    from page_rank_parallel import page_rank_parallel
+
+    start = time.perf_counter()
+    if engine == "dict":
+        graph, outbound = page_rank.load_data(path)
+        num_nodes = len(graph)
+        load = time.perf_counter() - start
+        _, iterations, times = page_rank.page_rank_dict(graph, outbound, maxiteration, lambda_, thr, verbose=False)
+
+    elif engine == "blocked":
+        graph_dir = blocked_graph_dir(path)
+        if os.path.isdir(graph_dir):
+            shutil.rmtree(graph_dir)
+        manifest = partition_graph(path, graph_dir, budget << 20)
+        num_nodes = manifest["num_nodes"]
+        load = time.perf_counter() - start
+        _, iterations, times = page_rank_blocked(graph_dir, lambda_, maxiteration, thr, memory_budget=budget << 20, verbose=False)
+        shutil.rmtree(graph_dir)
+
+    else:
+        node_ids, sources, targets = index_nodes(*read_edges(path))
+        num_nodes = len(node_ids)
+        matrix = build_transition_matrix(sources, targets, num_nodes)
+        del sources, targets
+        load = time.perf_counter() - start
+        if engine == "parallel":
+            _, iterations, times = page_rank_parallel(matrix, lambda_, maxiteration, thr, workers, verbose=False)
+        else:
+            _, iterations, times = page_rank_csr(matrix, lambda_, maxiteration, thr, verbose=False)
+
+    return {
+        "engine": engine,
+        "nodes": num_nodes,
+        "load_s": load,
+        "iterations": iterations,
+        "iteration_s": float(np.median(times)) if times else 0.0,
+        "total_s": load + sum(times),
+        "peak_mb": peak_memory_mb(),
+    }
+
+def measure(engine: str, path: str, args: argparse.Namespace):
+    """
+    Description:
+        Runs one engine in a fresh interpreter, so the peak memory of every
+        measurement is its own.
+
+    Parameters:
+        engine (str): The engine, one of ENGINES.
+        path (str): The path of the edge list.
+        args (argparse.Namespace): The benchmark arguments.
+
+    Returns:
+        (dict): The measurements, or an "error" entry if the run failed.
+    """
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", engine, os.path.abspath(path),
+        "--lambda_", str(args.lambda_), "--thr", str(args.thr), "--maxiteration", str(args.maxiteration),
+        "--workers", str(args.workers), "--budget", str(args.budget),
+    ]
+    process = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if process.returncode != 0:
+        return {"engine": engine, "error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}"}
+
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def compare_with_baseline(results: list, baseline_file: str, tolerance: float):
+    """
+    Description:
+        Prints the measurements that are more than tolerance times slower,
+        or use more than tolerance times the memory, than in a previous
+        report.
+
+    Parameters:
+        results (list): The measurements of this run.
+        baseline_file (str): The previous report.
+        tolerance (float): The allowed ratio.
+
+    Returns:
+        (int): The number of regressions.
+    """
+    with open(baseline_file, "r") as file:
+        baseline = {(entry["engine"], entry["edges"]): entry for entry in json.load(file)["results"] if "error" not in entry}
+
+    regressions = 0
+    for entry in results:
+        previous = baseline.get((entry["engine"], entry["edges"]))
+        if previous is None or "error" in entry:
+            continue
+        for key in ("load_s", "iteration_s", "iterations", "peak_mb"):
+            if previous[key] > 0 and entry[key] > tolerance * previous[key]:
+                print(f"Regression: {entry['engine']} on {entry['edges']} edges, {key} {previous[key]:.4g} -> {entry[key]:.4g}")
+                regressions += 1
+
+    return regressions
+
+def main():
+    """
+    Description:
+        Main function of the program. Generates power-law graphs of every
+        size, measures every engine on them and writes a JSON report.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="PageRank Scaling Benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="the numbers of edges of the generated graphs.")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES, help="the engines to measure.")
+    parser.add_argument("--dict-max-edges", type=int, default=1_000_000, help="the largest graph the dict engine is run on.")
+    parser.add_argument("--dangling", type=float, default=0.1, help="the fraction of nodes without out-links.")
+    parser.add_argument("--exponent", type=float, default=0.8, help="the exponent of the power law.")
+    parser.add_argument("--seed", type=int, default=42, help="the random seed.")
+    parser.add_argument("--lambda_", type=float, default=0.85, help="the λ parameter value.")
+    parser.add_argument("--thr", type=float, default=1e-8, help="the threshold value.")
+    parser.add_argument("--maxiteration", type=int, default=100, help="the maximum number of iterations.")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="the number of processes of the parallel engine.")
+    parser.add_argument("--budget", type=int, default=256, help="the memory budget of the blocked engine, in megabytes.")
+    parser.add_argument("--workdir", default="benchmark_graphs", help="the directory of the generated graphs.")
+    parser.add_argument("--report", default=REPORT_FILE_NAME, help="the JSON report to write.")
+    parser.add_argument("--baseline", help="a previous report to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="the slowdown or memory ratio reported as a regression.")
+    parser.add_argument("--child", nargs=2, metavar=("ENGINE", "GRAPH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        engine, path = args.child
+        print(json.dumps(run_engine(engine, path, args.lambda_, args.thr, args.maxiteration, args.workers, args.budget)))
+        return
+
+    results = []
+    print(f"{'edges':>10} {'engine':<9} {'nodes':>9} {'load (s)':>9} {'ms/iter':>9} {'iters':>6} {'total (s)':>10} {'peak MB':>8}")
+    for num_edges in args.sizes:
+        start = time.perf_counter()
+        path = graph_file(args.workdir, num_edges, args.dangling, args.exponent, args.seed)
+        generated = time.perf_counter() - start
+        if generated > 1:
+            print(f"{num_edges:>10} (graph generated in {generated:.1f}s)")
+
+        for engine in args.engines:
+            if engine == "dict" and num_edges > args.dict_max_edges:
+                continue
+
+            entry = {"edges": num_edges, **measure(engine, path, args)}
+            results.append(entry)
+            if "error" in entry:
+                print(f"{num_edges:>10} {engine:<9} error: {entry['error']}")
+            else:
+                print(f"{num_edges:>10} {engine:<9} {entry['nodes']:>9} {entry['load_s']:>9.3f} {entry['iteration_s'] * 1000:>9.2f} {entry['iterations']:>6} {entry['total_s']:>10.3f} {entry['peak_mb']:>8.1f}")
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "cpus": multiprocessing.cpu_count(),
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("child", "report", "baseline")},
+        "results": results,
+    }
+    with open(args.report, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.report}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        print(f"{regressions} regression(s) against {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import numpy as np
+
+from edge_list import load_edges
+from page_rank_csr import build_transition_matrix, index_nodes, page_rank_csr
+from page_rank_local import out_links, personalization_vector, personalized_page_rank
+
+DATA_SET = "data/web-Stanford.txt"
+
+def main():
+    """
+    Description:
+        Main function of the program. Computes the PageRank personalized to
+        the seed nodes exactly with power iteration, then approximately with
+        forward push at every tolerance, and prints the time, the work and
+        the error of each.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Personalized PageRank Benchmark")
+    parser.add_argument("--data", default=DATA_SET, help="the edge list to rank.")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 3, 4, 5], help="the NodeIDs of the seed nodes.")
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[1e-4, 1e-5, 1e-6, 1e-7], help="the push tolerances to time.")
+    parser.add_argument("--lambda_", type=float, default=0.85, help="the λ parameter value.")
+    parser.add_argument("--top", type=int, default=100, help="the number of top nodes compared between the exact and approximate ranks.")
+    args = parser.parse_args()
+
+    node_ids, sources, targets = index_nodes(*load_edges(args.data))
+    matrix = build_transition_matrix(sources, targets, len(node_ids))
+    links = out_links(matrix)
+
+    positions = np.searchsorted(node_ids, args.nodes)
+    seeds = [int(position) for position, node in zip(positions, args.nodes) if position < len(node_ids) and node_ids[position] == node]
+    if not seeds:
+        print("Error: none of the seed nodes are in the graph")
+        exit()
+    print(f"{len(node_ids)} nodes, {matrix.nnz} edges, {len(seeds)} seed node(s)")
+
+    start = time.perf_counter()
+    exact, iterations, _ = page_rank_csr(matrix, args.lambda_, 1000, 1e-12, verbose=False, personalization=personalization_vector(seeds, len(node_ids)))
+    elapsed = time.perf_counter() - start
+    top = min(args.top, int(np.count_nonzero(exact)))
+    exact_top = set(np.argpartition(-exact, top - 1)[:top].tolist())
+
+    print(f"{'method':<14} {'time (ms)':>10} {'work':>12} {'nodes':>9} {'L1 error':>10} {'max error':>10} {'top-' + str(top):>8}")
+    print(f"{'power':<14} {elapsed * 1000:>10.2f} {iterations * matrix.nnz:>12} {len(node_ids):>9} {0.0:>10.1e} {0.0:>10.1e} {1.0:>8.2f}")
+
+    for tolerance in args.tolerance:
+        start = time.perf_counter()
+        ranks, pushes, edges = personalized_page_rank(links, seeds, args.lambda_, tolerance)
+        elapsed = time.perf_counter() - start
+
+        approximate = np.zeros(len(node_ids))
+        approximate[list(ranks)] = list(ranks.values())
+        error = np.abs(exact - approximate)
+        approximate_top = set(sorted(ranks, key=ranks.get, reverse=True)[:top])
+        print(f"{'push-' + format(tolerance, 'g'):<14} {elapsed * 1000:>10.2f} {edges:>12} {len(ranks):>9} {error.sum():>10.1e} {error.max():>10.1e} {len(exact_top & approximate_top) / top:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from typing import Callable, List
+
+import numpy as np
+
+from benchmark_boolean_query import index_terms
+from index_segments import open_index
+from ranked_query import TOP_K, BM25, Ranker, TfIdf
+
+def make_query_log(frequencies: Counter, count: int, max_terms: int, seed: int):
+    """
+    Description:
+        Generates free text queries of one to max_terms terms. Each term is
+        drawn either with probability proportional to its document
+        frequency or uniformly, so queries mix common terms with long
+        postings and rare, discriminating ones.
+
+    Parameters:
+        frequencies (Counter): The document frequency of every term.
+        count (int): The number of queries.
+        max_terms (int): The largest number of terms in a query.
+        seed (int): The random seed.
+
+    Returns:
+        (List[str]): The queries, made of index terms.
+    """
+    rng = random.Random(seed)
+    terms = sorted(frequencies)
+    weights = [frequencies[term] for term in terms]
+    queries = []
+    for _ in range(count):
+        length = rng.randint(1, max_terms)
+        queries.append(" ".join(rng.choices(terms, weights)[0] if rng.random() < 0.5 else rng.choice(terms) for _ in range(length)))
+
+    return queries
+
+def run(name: str, queries: List[str], ranker: Ranker, search: Callable[[str], list]):
+    """
+    Description:
+        Answers every query, timing each, and prints the throughput, the
+        latency percentiles and the documents scored per query.
+
+    Parameters:
+        name (str): The name of the run.
+        queries (List[str]): The queries.
+        ranker (Ranker): The ranker, whose count of scored documents is read.
+        search (Callable[[str], list]): Returns the top documents of a query.
+
+    Returns:
+        (List[list]): The top documents of every query.
+    """
+    results = []
+    latencies = []
+    ranker.documents_scored = 0
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<18} {len(queries) / (latencies.sum() / 1000):>10.1f} {latencies.mean():>9.3f} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {ranker.documents_scored / len(queries):>10.1f}")
+
+    return results
+
+def main():
+    """
+    Description:
+        Main function of the program. Answers a log of free text queries
+        with exhaustive and pruned top-k retrieval, for BM25 and TF-IDF,
+        prints the latency of each and checks that they return the same
+        documents and scores.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Ranked Query Benchmark")
+    parser.add_argument("--index", default="wikipedia.index", help="the inverted index file, or the directory of a segmented index.")
+    parser.add_argument("--queries", type=int, default=1000, help="the number of queries generated.")
+    parser.add_argument("--terms", type=int, default=4, help="the largest number of terms in a generated query.")
+    parser.add_argument("--top", type=int, default=TOP_K, help="the number of documents returned per query.")
+    parser.add_argument("--seed", type=int, default=42, help="the random seed.")
+    parser.add_argument("--log", help="a query log file, one query per line; written if it does not exist.")
+    args = parser.parse_args()
+
+    try:
+        index = open_index(args.index)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    if args.log and os.path.isfile(args.log):
+        with open(args.log, "r", encoding="utf-8") as file:
+            queries = file.read().splitlines()
+    else:
+        queries = make_query_log(index_terms(index), args.queries, args.terms, args.seed)
+        if args.log:
+            with open(args.log, "w", encoding="utf-8") as file:
+                file.write("\n".join(queries))
+
+    # The queries are made of index terms, which are not normalized again.
+    print(f"{index.num_docs} documents, {len(queries)} queries, top {args.top}")
+    print(f"{'ranking':<18} {'queries/s':>10} {'mean (ms)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'scored/q':>10}")
+
+    for name, scorer in [("bm25", BM25()), ("tfidf", TfIdf())]:
+        try:
+            ranker = Ranker(index, scorer)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit()
+        exhaustive = run(f"{name}-exhaustive", queries, ranker, lambda query: ranker.search_exhaustive(query, args.top, lambda word: word))
+        pruned = run(f"{name}-maxscore", queries, ranker, lambda query: ranker.search(query, args.top, lambda word: word))
+        mismatches = sum(a != b for a, b in zip(exhaustive, pruned))
+        print(f"{'':<18} {mismatches} of {len(queries)} results differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import math
+import random
+import string
+import time
+from typing import Callable, List, Tuple
+
+from language_model import MODEL_FILE_NAME
+from noisy_channel import channel_model, load_word_probs, noisy_channel_model, trie_channel_model
+from spell_index import SymmetricDeleteIndex, VocabularyTrie
+
+def misspell(word: str, edits: int, rng: random.Random):
+    """
+    Description:
+        Applies random deletions, insertions, substitutions and
+        transpositions to a word.
+
+    Parameters:
+        word (str): The word to misspell.
+        edits (int): The number of edits to apply.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        (str): The misspelled word.
+    """
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        operation = rng.choice("dist") if len(word) > 1 else "i"
+        if operation == "d" and i < len(word):
+            word = word[:i] + word[i + 1:]
+        elif operation == "s" and i < len(word):
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+        elif operation == "t" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        else:
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+
+    return word
+
+def make_queries(vocab: dict, count: int, edits: int, seed: int):
+    """
+    Description:
+        Samples vocabulary words and misspells them.
+
+    Parameters:
+        vocab (dict): A dictionary of words and their probabilities.
+        count (int): The number of queries.
+        edits (int): The number of edits per query.
+        seed (int): The random seed.
+
+    Returns:
+        (List[Tuple[str, str]]): The (misspelling, intended word) pairs.
+    """
+    rng = random.Random(seed)
+    words = sorted(vocab)
+    queries = []
+    for _ in range(count):
+        word = rng.choice(words)
+        queries.append((misspell(word, edits, rng), word))
+
+    return queries
+
+def run(name: str, queries: List[Tuple[str, str]], model: Callable[[str], dict]):
+    """
+    Description:
+        Corrects every query and prints the throughput and recall.
+
+    Parameters:
+        name (str): The name of the candidate generator.
+        queries (List[Tuple[str, str]]): The (misspelling, intended word) pairs.
+        model (Callable[[str], dict]): Returns the candidate probabilities of a word.
+
+    Returns:
+        None
+    """
+    found = 0
+    correct = 0
+    start = time.perf_counter()
+    for typo, word in queries:
+        probs = model(typo)
+        if word in probs:
+            found += 1
+        if probs and max(probs, key=probs.get) == word:
+            correct += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<12} {len(queries) / elapsed:>14.1f} {found / len(queries):>10.3f} {correct / len(queries):>10.3f}")
+
+    return
+
+def check_trie(queries: List[Tuple[str, str]], vocab: dict, trie: VocabularyTrie, distance: int, costs: Tuple[int, int, int]):
+    """
+    Description:
+        Compares the probability the trie gives every intended word with
+        channel_model's, which is 0 when the word is out of reach: more than
+        one character longer or shorter, or past the edit distance.
+
+    Parameters:
+        queries (List[Tuple[str, str]]): The (misspelling, intended word) pairs.
+        vocab (dict): A dictionary of words and their probabilities.
+        trie (VocabularyTrie): A trie over the words of vocab.
+        distance (int): The maximum edit distance of a candidate.
+        costs (Tuple[int, int, int]): The deletion, insertion and
+            substitution costs.
+
+    Returns:
+        (int): The number of pairs whose probabilities differ.
+    """
+    mismatches = 0
+    for typo, word in queries:
+        unit = channel_model(typo, word, 1, 1, 1)
+        expected = channel_model(typo, word, *costs) * vocab[word] if unit and -math.log(unit) <= distance + 1e-9 else 0
+        if not math.isclose(trie_channel_model(typo, vocab, trie, distance, *costs).get(word, 0), expected):
+            mismatches += 1
+
+    return mismatches
+
+def main():
+    """
+    Description:
+        Main function of the program.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description='Noisy Channel Candidate Generation Benchmark')
+    parser.add_argument('--model', default=MODEL_FILE_NAME, help='the prebuilt language model file')
+    parser.add_argument('--corpus', help='the corpus file or directory to rebuild the language model from; defaults to the one it was built from')
+    parser.add_argument('--queries', type=int, default=1000, help='the number of misspellings to correct')
+    parser.add_argument('--edits', type=int, default=1, help='the number of edits applied to each word')
+    parser.add_argument('--distance', type=int, nargs='+', default=[1, 2], help='the edit distances to build indexes for')
+    parser.add_argument('--seed', type=int, default=42, help='the random seed')
+    args = parser.parse_args()
+
+    vocab = load_word_probs(args.model, args.corpus)
+    queries = make_queries(vocab, args.queries, args.edits, args.seed)
+    print(f"{len(vocab)} terms, {len(queries)} queries with {args.edits} edit(s)")
+    print(f"{'generator':<12} {'corrections/s':>14} {'recall':>10} {'accuracy':>10}")
+
+    run("edits", queries, lambda typo: noisy_channel_model(typo, vocab))
+    for distance in args.distance:
+        start = time.perf_counter()
+        index = SymmetricDeleteIndex(vocab, distance)
+        build = time.perf_counter() - start
+        run(f"symspell-{distance}", queries, lambda typo: noisy_channel_model(typo, vocab, index=index))
+        print(f"{'':<12} (index built in {build:.2f}s, {len(index.deletes)} keys)")
+
+    start = time.perf_counter()
+    trie = VocabularyTrie(vocab)
+    build = time.perf_counter() - start
+    for distance in args.distance:
+        run(f"trie-{distance}", queries, lambda typo: trie_channel_model(typo, vocab, trie, distance))
+    print(f"{'':<12} (trie built in {build:.2f}s)")
+
+    # Random pairs, many of them out of reach, under unit and weighted costs.
+    rng = random.Random(args.seed)
+    words = sorted(vocab)
+    pairs = queries + [(typo, rng.choice(words)) for typo, _ in queries]
+    for costs in [(1, 1, 1), (2, 1, 1), (1, 2, 3)]:
+        for distance in args.distance:
+            mismatches = check_trie(pairs, vocab, trie, distance, costs)
+            print(f"trie-{distance} costs {costs}: {mismatches} of {len(pairs)} probabilities differ from channel_model")
+
+if __name__ == '__main__':
+    main()
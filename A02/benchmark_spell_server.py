@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+from urllib.parse import urlencode
+
+from benchmark_spell import misspell
+from spell_server import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_WORDS = ["advertise", "university", "improve", "computer", "algorithm", "medicine", "search", "engine", "retrieval", "language"]
+
+def make_requests(words: List[str], count: int, words_per_request: int, edits: int, seed: int):
+    """
+    Description:
+        Generates request paths asking to correct misspelled words.
+
+    Parameters:
+        words (List[str]): The words to misspell.
+        count (int): The number of requests.
+        words_per_request (int): The number of words in each request.
+        edits (int): The number of edits applied to each word.
+        seed (int): The random seed.
+
+    Returns:
+        (List[str]): The request paths.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        query = [("w", misspell(rng.choice(words), edits, rng)) for _ in range(words_per_request)]
+        requests.append("/correct?" + urlencode(query))
+
+    return requests
+
+async def client(host: str, port: int, paths: List[str], latencies: List[float]):
+    """
+    Description:
+        Sends requests one after another over one keep-alive connection,
+        recording the latency of each.
+
+    Parameters:
+        host (str): The server address.
+        port (int): The server port.
+        paths (List[str]): The request paths to send.
+        latencies (List[float]): The list the latencies are appended to.
+
+    Returns:
+        None
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            json.loads(await reader.readexactly(length))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+def percentile(values: List[float], fraction: float):
+    """
+    Description:
+        Returns a percentile of a list of values.
+
+    Parameters:
+        values (List[float]): The sorted values.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        (float): The value at that percentile.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def run(host: str, port: int, requests: List[str], concurrency: int):
+    """
+    Description:
+        Spreads the requests over concurrent connections and prints the
+        throughput and latency percentiles.
+
+    Parameters:
+        host (str): The server address.
+        port (int): The server port.
+        requests (List[str]): The request paths.
+        concurrency (int): The number of concurrent connections.
+
+    Returns:
+        None
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests[i::concurrency], latencies) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {concurrency} connections in {elapsed:.2f}s")
+    print(f"requests/s: {len(latencies) / elapsed:.1f}")
+    print(f"p50 latency: {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"p99 latency: {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"max latency: {latencies[-1] * 1000:.2f} ms")
+
+    return
+
+def main():
+    """
+    Description:
+        Main function of the program.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description='Spell Correction Server Load Generator')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='the server address')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='the server port')
+    parser.add_argument('--requests', type=int, default=5000, help='the number of requests to send')
+    parser.add_argument('--concurrency', type=int, default=32, help='the number of concurrent connections')
+    parser.add_argument('--words', type=int, default=3, help='the number of words in each request')
+    parser.add_argument('--edits', type=int, default=1, help='the number of edits applied to each word')
+    parser.add_argument('--vocab', nargs='+', default=DEFAULT_WORDS, help='the words to misspell')
+    parser.add_argument('--seed', type=int, default=42, help='the random seed')
+    args = parser.parse_args()
+
+    requests = make_requests(args.vocab, args.requests, args.words, args.edits, args.seed)
+    asyncio.run(run(args.host, args.port, requests, args.concurrency))
+
+if __name__ == '__main__':
+    main()
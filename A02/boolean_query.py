@@ -0,0 +1,336 @@
+import argparse
+import re
+import time
+from typing import Callable, Union
+
+import numpy as np
+
+from index_segments import SegmentedIndex, open_index
+from index_store import InvertedIndex
+from normalization import index_term
+
+# A term's postings are intersected through the block skip table, decoding
+# only the blocks that may hold a candidate, when the term has more than this
+# many postings per candidate. Otherwise the whole list is decoded at once,
+# which costs less per posting than decoding blocks one by one.
+SKIP_RATIO = 512
+
+# Two sorted lists are intersected by binary searching the shorter one in
+# the longer one (galloping) when the longer one is more than this many times
+# longer; otherwise by a linear merge.
+GALLOP_RATIO = 32
+
+OPERATORS = {"AND", "OR", "NOT"}
+TOKEN_PATTERN = re.compile(r"\(|\)|[^\s()]+")
+
+def parse_query(query: str, normalize: Callable[[str], str] = index_term):
+    """
+    Description:
+        Parses a boolean query. NOT binds tightest, then AND, then OR;
+        parentheses group, and words next to each other are ANDed. Words
+        that normalize to nothing, such as stopwords, are dropped.
+
+    Parameters:
+        query (str): The query, e.g. "apple AND (pie OR NOT tart)".
+        normalize (Callable[[str], str]): Maps a word to its index term, or None.
+
+    Returns:
+        (tuple): The query tree: ("term", term), ("not", node),
+        ("and", [nodes]) or ("or", [nodes]), or None if nothing is left.
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        nodes = [parse_and()]
+        while peek() == "OR":
+            position += 1
+            nodes.append(parse_and())
+        return _combine("or", nodes)
+
+    def parse_and():
+        nonlocal position
+        nodes = [parse_not()]
+        while peek() is not None and peek() not in ("OR", ")"):
+            if peek() == "AND":
+                position += 1
+            nodes.append(parse_not())
+        return _combine("and", nodes)
+
+    def parse_not():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise ValueError(f"query {query!r} ends unexpectedly")
+        position += 1
+        if token == "NOT":
+            node = parse_not()
+            return ("not", node) if node is not None else None
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"query {query!r} is missing a ')'")
+            position += 1
+            return node
+        if token == ")" or token in OPERATORS:
+            raise ValueError(f"unexpected {token!r} in query {query!r}")
+        term = normalize(token)
+        return ("term", term) if term else None
+
+    if not tokens:
+        return None
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"unexpected {tokens[position]!r} in query {query!r}")
+
+    return node
+
+def _combine(kind: str, nodes: list):
+    """
+    Description:
+        Returns the AND or OR of query nodes, leaving out dropped words and
+        flattening nested nodes of the same kind.
+
+    Parameters:
+        kind (str): "and" or "or".
+        nodes (list): The nodes.
+
+    Returns:
+        (tuple): The node, or None if no node is left.
+    """
+    flat = []
+    for node in nodes:
+        if node is None:
+            continue
+        flat.extend(node[1] if node[0] == kind else [node])
+    if not flat:
+        return None
+    return flat[0] if len(flat) == 1 else (kind, flat)
+
+def intersect(shorter: np.ndarray, longer: np.ndarray):
+    """
+    Description:
+        Intersects two sorted lists of document numbers. When one list is
+        much longer, each document of the shorter one is found in it by
+        binary search, so the cost grows with the shorter list.
+
+    Parameters:
+        shorter (np.ndarray): A sorted list.
+        longer (np.ndarray): Another sorted list.
+
+    Returns:
+        (np.ndarray): The documents in both.
+    """
+    if len(shorter) > len(longer):
+        shorter, longer = longer, shorter
+    if not len(shorter):
+        return shorter
+    if len(longer) <= GALLOP_RATIO * len(shorter):
+        return np.intersect1d(shorter, longer, assume_unique=True)
+
+    positions = np.searchsorted(longer, shorter)
+    found = positions < len(longer)
+    found[found] = longer[positions[found]] == shorter[found]
+    return shorter[found]
+
+def _skip_intersect(segment: InvertedIndex, term_id: int, candidates: np.ndarray):
+    """
+    Description:
+        Intersects candidate documents with a term's postings in one index
+        file, using the last document of every block as skip pointers: each
+        candidate is located in the block that may hold it, and only those
+        blocks are decoded.
+
+    Parameters:
+        segment (InvertedIndex): The index file.
+        term_id (int): The term ID.
+        candidates (np.ndarray): The sorted candidate documents.
+
+    Returns:
+        (np.ndarray): The candidates the term occurs in.
+    """
+    blocks = segment.block_range(term_id)
+    positions = np.searchsorted(segment.block_docs[blocks.start:blocks.stop], candidates)
+    inside = positions < len(blocks)
+    candidates, positions = candidates[inside], positions[inside]
+
+    found = []
+    starts = np.flatnonzero(np.diff(positions, prepend=-1))
+    for start, end in zip(starts.tolist(), np.append(starts[1:], len(positions)).tolist()):
+        doc_numbers, _ = segment.decode_block(term_id, blocks.start + int(positions[start]))
+        found.append(intersect(candidates[start:end], doc_numbers))
+
+    return np.concatenate(found) if found else candidates[:0]
+
+def term_documents(index: Union[InvertedIndex, SegmentedIndex], term: str, candidates: np.ndarray = None):
+    """
+    Description:
+        Returns the documents a term occurs in, limited to the candidates if
+        given. Terms far longer than the candidates go through the skip
+        pointers instead of being decoded whole.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        term (str): The term.
+        candidates (np.ndarray): The sorted candidate documents, or None for all.
+
+    Returns:
+        (np.ndarray): The sorted document numbers.
+    """
+    if candidates is None or index.document_frequency(term) <= SKIP_RATIO * len(candidates):
+        doc_numbers, _ = index.postings_of(term)
+        return doc_numbers if candidates is None else intersect(candidates, doc_numbers)
+
+    if isinstance(index, InvertedIndex):
+        segments, bases = [index], [0, index.num_docs]
+    else:
+        segments, bases = index.segments, index.bases.tolist()
+
+    found = []
+    for number, segment in enumerate(segments):
+        term_id = segment.terms.term_id(term)
+        if term_id < 0:
+            continue
+        low, high = np.searchsorted(candidates, [bases[number], bases[number + 1]])
+        if low < high:
+            found.append(_skip_intersect(segment, term_id, candidates[low:high] - bases[number]) + bases[number])
+
+    # Deleted documents are never candidates, since every query starts from
+    # a postings list or the live documents.
+    return np.concatenate(found) if found else candidates[:0]
+
+def estimate(index: Union[InvertedIndex, SegmentedIndex], node: tuple):
+    """
+    Description:
+        Returns an upper bound of the number of documents a query node
+        matches, from the document frequencies, used to order evaluation.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        node (tuple): The query node.
+
+    Returns:
+        (int): The estimate.
+    """
+    kind = node[0]
+    if kind == "term":
+        return index.document_frequency(node[1])
+    if kind == "and":
+        return min([estimate(index, child) for child in node[1] if child[0] != "not"], default=index.num_docs)
+    if kind == "or":
+        return min(index.num_docs, sum(estimate(index, child) for child in node[1]))
+    return index.num_docs
+
+def evaluate(index: Union[InvertedIndex, SegmentedIndex], node: tuple, candidates: np.ndarray = None):
+    """
+    Description:
+        Evaluates a query node. The children of an AND are evaluated in
+        order of increasing estimated size, each limited to the documents
+        matched so far, and NOT children are subtracted last; evaluation
+        stops as soon as nothing is left.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        node (tuple): The query node.
+        candidates (np.ndarray): The sorted documents to limit the result to, or None for all.
+
+    Returns:
+        (np.ndarray): The sorted document numbers matched.
+    """
+    kind = node[0]
+    if kind == "term":
+        return term_documents(index, node[1], candidates)
+
+    if kind == "not":
+        if candidates is None:
+            candidates = live_documents(index)
+        excluded = evaluate(index, node[1], candidates)
+        return candidates[~np.isin(candidates, excluded, assume_unique=True)]
+
+    if kind == "or":
+        results = [evaluate(index, child, candidates) for child in node[1]]
+        return np.unique(np.concatenate(results))
+
+    children = sorted(node[1], key=lambda child: (child[0] == "not", estimate(index, child)))
+    for child in children:
+        candidates = evaluate(index, child, candidates)
+        if not len(candidates):
+            break
+
+    return candidates
+
+def live_documents(index: Union[InvertedIndex, SegmentedIndex]):
+    """
+    Description:
+        Returns the numbers of the documents of an index that are not deleted.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+
+    Returns:
+        (np.ndarray): The sorted document numbers.
+    """
+    if isinstance(index, InvertedIndex):
+        return np.arange(index.num_docs, dtype=np.int64)
+    return np.flatnonzero(~index.deleted).astype(np.int64)
+
+def search(index: Union[InvertedIndex, SegmentedIndex], query: str, normalize: Callable[[str], str] = index_term):
+    """
+    Description:
+        Returns the documents matching a boolean query.
+
+    Parameters:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        query (str): The query.
+        normalize (Callable[[str], str]): Maps a word to its index term, or None.
+
+    Returns:
+        (np.ndarray): The sorted document numbers.
+    """
+    node = parse_query(query, normalize)
+    if node is None:
+        return np.empty(0, dtype=np.int64)
+    return evaluate(index, node)
+
+def main():
+    """
+    Description:
+        Main function of the program. Prints the documents matching every
+        query and the time taken.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Boolean Query")
+    parser.add_argument("--index", default="wikipedia.index", help="the inverted index file, or the directory of a segmented index.")
+    parser.add_argument("--limit", type=int, default=10, help="the number of document IDs printed per query.")
+    parser.add_argument("queries", nargs="+", help="the queries, e.g. \"apple AND (pie OR NOT tart)\".")
+    args = parser.parse_args()
+
+    try:
+        index = open_index(args.index)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    for query in args.queries:
+        start = time.perf_counter()
+        try:
+            doc_numbers = search(index, query)
+        except ValueError as e:
+            print(f"Error: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{query}: {len(doc_numbers)} documents in {elapsed * 1000:.3f} ms")
+        for number in doc_numbers[:args.limit].tolist():
+            print("\t", index.doc_id(number))
+
+if __name__ == "__main__":
+    main()
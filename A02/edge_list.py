@@ -0,0 +1,261 @@
+import os
+import struct
+
+import numpy as np
+
+# Bytes read per chunk while parsing a text edge list. Each chunk is parsed
+# into integers in C, so memory stays at a few chunks plus the edge arrays.
+EDGE_CHUNK_BYTES = 1 << 24
+GRAPH_CACHE_VERSION = 1
+
+# Binary edge file layout, as written by the crawler (A01/link_graph.py):
+# MAGIC | version (uint32) | (source, target) int32 pairs, all little-endian.
+EDGE_FILE_MAGIC = b"EDGS"
+EDGE_FILE_VERSION = 1
+EDGE_FILE_HEADER = len(EDGE_FILE_MAGIC) + 4
+
+def file_fingerprint(path: str):
+    """
+    Description:
+        Returns the size and modification time of a file, used to decide
+        whether a cache built from it is out of date.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        (np.ndarray): The [size, mtime_ns] of the file.
+    """
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+def is_binary_edge_file(path: str):
+    """
+    Description:
+        Checks whether a file is a binary edge file rather than a text one.
+
+    Parameters:
+        path (str): The path of the edge file.
+
+    Returns:
+        (bool): True if the file starts with the binary edge file header.
+    """
+    with open(path, "rb") as file:
+        header = file.read(EDGE_FILE_HEADER)
+
+    if len(header) < EDGE_FILE_HEADER or header[:len(EDGE_FILE_MAGIC)] != EDGE_FILE_MAGIC:
+        return False
+
+    (version,) = struct.unpack("<I", header[len(EDGE_FILE_MAGIC):])
+    if version != EDGE_FILE_VERSION:
+        raise ValueError(f"{path} is a binary edge file of unsupported version {version}")
+
+    return True
+
+def read_binary_edges(path: str):
+    """
+    Description:
+        Maps the edges of a binary edge file without reading them.
+
+    Parameters:
+        path (str): The path of the edge file.
+
+    Returns:
+        (np.ndarray): The edges, one (source, target) row each.
+    """
+    size = os.path.getsize(path) - EDGE_FILE_HEADER
+    if size % 8:
+        raise ValueError(f"{path} ends with a partial edge")
+    if size == 0:
+        return np.empty((0, 2), dtype="<i4")
+
+    return np.memmap(path, dtype="<i4", mode="r", offset=EDGE_FILE_HEADER).reshape(-1, 2)
+
+def _parse_chunk(chunk: bytes):
+    """
+    Description:
+        Parses the whitespace separated integers of a chunk of whole lines,
+        skipping comment lines that start with #.
+
+    Parameters:
+        chunk (bytes): The lines to parse.
+
+    Returns:
+        (np.ndarray): The integers, in order.
+    """
+    if b"#" in chunk:
+        chunk = b"\n".join(line for line in chunk.split(b"\n") if not line.lstrip().startswith(b"#"))
+
+    return np.fromstring(chunk.decode("ascii"), dtype=np.int64, sep=" ")
+
+def iter_edge_chunks(path: str, chunk_bytes: int = EDGE_CHUNK_BYTES):
+    """
+    Description:
+        Reads a text edge list of "from_node to_node" lines chunk by chunk,
+        parsing each chunk straight into an integer array instead of building
+        a list of lines and a string for every node ID. A binary edge file is
+        read in chunks of the same size, without parsing.
+
+    Parameters:
+        path (str): The path of the edge list.
+        chunk_bytes (int): The number of bytes read at a time.
+
+    Returns:
+        (Iterator[np.ndarray]): The edges of every chunk, one row per edge.
+    """
+    if is_binary_edge_file(path):
+        edges = read_binary_edges(path)
+        rows = max(1, chunk_bytes // 8)
+        for start in range(0, len(edges), rows):
+            yield np.array(edges[start:start + rows], dtype=np.int64)
+        return
+
+    remainder = b""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_bytes)
+            if not chunk:
+                break
+
+            chunk = remainder + chunk
+            end = chunk.rfind(b"\n") + 1
+            remainder = chunk[end:]
+            values = _parse_chunk(chunk[:end])
+            if len(values) % 2:
+                raise ValueError(f"{path} does not contain pairs of node IDs")
+            yield values.reshape(-1, 2)
+
+    values = _parse_chunk(remainder)
+    if len(values) % 2:
+        raise ValueError(f"{path} does not contain pairs of node IDs")
+    yield values.reshape(-1, 2)
+
+def read_edges(path: str, chunk_bytes: int = EDGE_CHUNK_BYTES):
+    """
+    Description:
+        Reads a text or binary edge list into int32 arrays, or int64 if a
+        node ID does not fit in 32 bits.
+
+    Parameters:
+        path (str): The path of the edge list.
+        chunk_bytes (int): The number of bytes read at a time.
+
+    Returns:
+        sources (np.ndarray): The from_node of every edge.
+        targets (np.ndarray): The to_node of every edge.
+    """
+    if is_binary_edge_file(path):
+        edges = read_binary_edges(path)
+        return edges[:, 0].astype(np.int32), edges[:, 1].astype(np.int32)
+
+    edges = np.concatenate(list(iter_edge_chunks(path, chunk_bytes)))
+    dtype = np.int32 if not len(edges) or (edges.min() >= np.iinfo(np.int32).min and edges.max() <= np.iinfo(np.int32).max) else np.int64
+    edges = edges.astype(dtype)
+
+    return np.ascontiguousarray(edges[:, 0]), np.ascontiguousarray(edges[:, 1])
+
+def graph_cache_file(path: str):
+    """
+    Description:
+        Returns the binary cache file of an edge list.
+
+    Parameters:
+        path (str): The path of the edge list.
+
+    Returns:
+        (str): The path of the cache file.
+    """
+    return os.path.splitext(path)[0] + ".edges.npz"
+
+def load_edges(path: str, cache_file: str = None, use_cache: bool = True):
+    """
+    Description:
+        Loads an edge list from its binary cache if the cache was built from
+        the same file (same size and modification time), otherwise parses
+        the text file and rewrites the cache. A binary edge file needs no
+        cache and is read directly.
+
+    Parameters:
+        path (str): The path of the edge list.
+        cache_file (str): The cache file. Defaults to graph_cache_file(path).
+        use_cache (bool): Whether to read and write the cache at all.
+
+    Returns:
+        sources (np.ndarray): The from_node of every edge.
+        targets (np.ndarray): The to_node of every edge.
+    """
+    if not use_cache or is_binary_edge_file(path):
+        return read_edges(path)
+
+    if cache_file is None:
+        cache_file = graph_cache_file(path)
+    fingerprint = file_fingerprint(path)
+
+    try:
+        with np.load(cache_file) as cache:
+            if int(cache["version"]) == GRAPH_CACHE_VERSION and np.array_equal(cache["fingerprint"], fingerprint):
+                return cache["sources"], cache["targets"]
+    except (FileNotFoundError, PermissionError, KeyError, ValueError, OSError):
+        pass
+
+    sources, targets = read_edges(path)
+    save_edges(cache_file, sources, targets, fingerprint)
+
+    return sources, targets
+
+def save_edges(cache_file: str, sources: np.ndarray, targets: np.ndarray, fingerprint: np.ndarray):
+    """
+    Description:
+        Writes an edge list cache, atomically replacing any old one. A cache
+        that cannot be written is skipped, since it only saves time.
+
+    Parameters:
+        cache_file (str): The cache file.
+        sources (np.ndarray): The from_node of every edge.
+        targets (np.ndarray): The to_node of every edge.
+        fingerprint (np.ndarray): The fingerprint of the edge list.
+
+    Returns:
+        None
+    """
+    temp_file = cache_file + ".tmp.npz"
+    try:
+        np.savez(temp_file, version=GRAPH_CACHE_VERSION, fingerprint=fingerprint, sources=sources, targets=targets)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print(f"Warning: could not write the graph cache {cache_file}: {e}")
+
+    return
+
+def load_url_table(path: str):
+    """
+    Description:
+        Reads the ID to URL table written by the crawler next to a binary
+        edge file, one "id<TAB>hash<TAB>url" line per URL.
+
+    Parameters:
+        path (str): The path of the URL table.
+
+    Returns:
+        (Dict[int, str]): The URL of every node ID.
+    """
+    urls = {}
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            node, _, url = line.rstrip("\n").split("\t", 2)
+            urls[int(node)] = url
+
+    return urls
+
+def url_table_file(path: str):
+    """
+    Description:
+        Returns the ID to URL table of a binary edge file.
+
+    Parameters:
+        path (str): The path of the edge file.
+
+    Returns:
+        (str): The path of the URL table.
+    """
+    return os.path.splitext(path)[0] + ".urls"
@@ -0,0 +1,501 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from index_store import InvertedIndex, build_index, merge_segments, read_header
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# A segment is small when the largest segment holds more than this many
+# times its live postings. Small segments are merged once there are at least
+# COMPACT_MIN_SEGMENTS of them, so the number of segments grows with the
+# logarithm of the number of updates while each posting is rewritten a
+# logarithmic number of times.
+COMPACT_FACTOR = 4
+COMPACT_MIN_SEGMENTS = 4
+
+# A segment with more than this fraction of its documents deleted is
+# rewritten without them at the next compaction.
+COMPACT_DELETED_FRACTION = 0.5
+
+def file_digest(path: str):
+    """
+    Description:
+        Returns the SHA256 hash of a file's contents, read in chunks.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        (str): The hexadecimal hash.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+def read_manifest(directory: str):
+    """
+    Description:
+        Reads the manifest of a segmented index, or returns an empty one if
+        the index does not exist yet.
+
+    Parameters:
+        directory (str): The directory of the index.
+
+    Returns:
+        (dict): The manifest. "segments" lists every segment with its file,
+        the number of its documents and postings and its deleted document
+        numbers; "sources" maps every indexed file to its size, mtime, hash
+        and segment; "next_segment" numbers the next segment.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE_NAME), "r") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "next_segment": 0, "segments": [], "sources": {}}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{directory} was written by an unsupported version")
+
+    return manifest
+
+def write_manifest(directory: str, manifest: dict):
+    """
+    Description:
+        Writes the manifest of a segmented index, atomically replacing the
+        old one, so readers see either the old or the new set of segments.
+
+    Parameters:
+        directory (str): The directory of the index.
+        manifest (dict): The manifest.
+
+    Returns:
+        None
+    """
+    path = os.path.join(directory, MANIFEST_FILE_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(path + ".tmp", path)
+
+    return
+
+def _segment_docs_file(directory: str, segment: dict):
+    """
+    Description:
+        Returns the path of the file listing the document numbers of every
+        source file of a segment.
+
+    Parameters:
+        directory (str): The directory of the index.
+        segment (dict): The manifest entry of the segment.
+
+    Returns:
+        (str): The path.
+    """
+    return os.path.join(directory, os.path.splitext(segment["file"])[0] + ".docs.json")
+
+def _read_segment_docs(directory: str, segment: dict):
+    with open(_segment_docs_file(directory, segment), "r") as file:
+        return json.load(file)
+
+def _write_segment_docs(directory: str, segment: dict, docs: Dict[str, List[int]]):
+    with open(_segment_docs_file(directory, segment), "w") as file:
+        json.dump(docs, file)
+
+def _new_segment(manifest: dict):
+    """
+    Description:
+        Returns the manifest entry of a new, empty segment.
+
+    Parameters:
+        manifest (dict): The manifest, whose segment counter is advanced.
+
+    Returns:
+        (dict): The segment entry.
+    """
+    segment = {"file": f"segment-{manifest['next_segment']:05d}.index", "num_docs": 0, "num_postings": 0, "deleted": []}
+    manifest["next_segment"] += 1
+
+    return segment
+
+def _live_postings(segment: dict):
+    """
+    Description:
+        Returns the estimated number of postings of a segment's live documents.
+
+    Parameters:
+        segment (dict): The manifest entry of the segment.
+
+    Returns:
+        (float): The estimate.
+    """
+    if not segment["num_docs"]:
+        return 0.0
+    return segment["num_postings"] * (1 - len(segment["deleted"]) / segment["num_docs"])
+
+def _remove_segment_files(directory: str, segment: dict):
+    for path in (os.path.join(directory, segment["file"]), _segment_docs_file(directory, segment)):
+        if os.path.exists(path):
+            os.remove(path)
+
+def scan_sources(manifest: dict, file_names: List[str]):
+    """
+    Description:
+        Compares the source files with the ones in the manifest. A file
+        whose size and modification time are unchanged is not read; one
+        whose size or time changed is hashed, and only counts as changed
+        if its contents did.
+
+    Parameters:
+        manifest (dict): The manifest of the index.
+        file_names (List[str]): The current source files.
+
+    Returns:
+        added (List[str]): The files that are not indexed yet.
+        changed (List[str]): The indexed files whose contents changed.
+        removed (List[str]): The indexed files that no longer exist.
+        touched (Dict[str, dict]): The new size and time of the files whose
+            contents are unchanged.
+        stats (Dict[str, dict]): The size, time and hash of every added
+            or changed file.
+    """
+    sources = manifest["sources"]
+    added, changed, touched, stats = [], [], {}, {}
+    for path in file_names:
+        key = os.path.normpath(path)
+        stat = os.stat(path)
+        entry = sources.get(key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            continue
+
+        digest = file_digest(path)
+        if entry is not None and entry["sha256"] == digest:
+            touched[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            continue
+
+        stats[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        (changed if entry is not None else added).append(path)
+
+    current = {os.path.normpath(path) for path in file_names}
+    removed = [key for key in sources if key not in current]
+
+    return added, changed, removed, touched, stats
+
+def delete_sources(directory: str, manifest: dict, keys: List[str]):
+    """
+    Description:
+        Removes source files from the index by adding tombstones for their
+        documents to their segments in the manifest; the postings stay in
+        the segment files until the segments are compacted. Segment files
+        are never changed once written, so the index stays consistent until
+        the manifest is replaced.
+
+    Parameters:
+        directory (str): The directory of the index.
+        manifest (dict): The manifest, updated in place.
+        keys (List[str]): The sources to remove.
+
+    Returns:
+        (int): The number of documents deleted.
+    """
+    segments = {segment["file"]: segment for segment in manifest["segments"]}
+    docs_cache = {}
+    deleted = 0
+    for key in keys:
+        entry = manifest["sources"].pop(key)
+        segment = segments.get(entry["segment"])
+        if segment is None:
+            # Its segment was dropped once all its documents were deleted.
+            continue
+        if segment["file"] not in docs_cache:
+            docs_cache[segment["file"]] = _read_segment_docs(directory, segment)
+        numbers = docs_cache[segment["file"]].get(key, [])
+        segment["deleted"] = sorted(set(segment["deleted"]).union(numbers))
+        deleted += len(numbers)
+
+    return deleted
+
+def add_segment(directory: str, manifest: dict, file_names: List[str], index_files: Callable[[List[str]], Iterable[dict]], memory_budget: int, stats: Dict[str, dict]):
+    """
+    Description:
+        Indexes source files into a new segment with build_index and
+        records which documents came from which file. Files that yield no
+        documents are not recorded, and no segment is kept if none of the
+        files did.
+
+    Parameters:
+        directory (str): The directory of the index.
+        manifest (dict): The manifest, updated in place.
+        file_names (List[str]): The files to index.
+        index_files (Callable[[List[str]], Iterable[dict]]): Yields the
+            partial index of every file, in order.
+        memory_budget (int): The memory budget of build_index, in bytes.
+        stats (Dict[str, dict]): The size, time and hash of every file.
+
+    Returns:
+        (dict): The report of build_index.
+    """
+    segment = _new_segment(manifest)
+    source_docs = {}
+
+    def partials():
+        # The partials come first, so their generator runs to its end.
+        for partial, path in zip(index_files(file_names), file_names):
+            source_docs[os.path.normpath(path)] = set().union(*partial.values())
+            yield partial
+
+    report = build_index(partials(), os.path.join(directory, segment["file"]), memory_budget)
+    if report["documents"] == 0:
+        _remove_segment_files(directory, segment)
+        return report
+
+    index = InvertedIndex(os.path.join(directory, segment["file"]))
+    doc_number = {doc_id: number for number, doc_id in enumerate(index.all_doc_ids())}
+    index.close()
+
+    docs = {key: sorted(doc_number[doc_id] for doc_id in doc_ids) for key, doc_ids in source_docs.items() if doc_ids}
+    _write_segment_docs(directory, segment, docs)
+    segment["num_docs"] = report["documents"]
+    segment["num_postings"] = report["postings"]
+    manifest["segments"].append(segment)
+    for key in docs:
+        manifest["sources"][key] = {**stats[key], "segment": segment["file"]}
+
+    return report
+
+def compact(directory: str, manifest: dict, force: bool = False):
+    """
+    Description:
+        Merges small segments, and rewrites segments that are mostly
+        deleted documents, dropping the deleted documents. The merged
+        segment is written under a new name and the manifest is replaced
+        before the old segments are removed, so a reader that opened the
+        old segments keeps working while compaction runs.
+
+    Parameters:
+        directory (str): The directory of the index.
+        manifest (dict): The manifest, updated in place and written.
+        force (bool): Whether to merge every segment into one.
+
+    Returns:
+        (dict): The segments merged and the time taken, in seconds.
+    """
+    segments = [segment for segment in manifest["segments"] if segment["num_docs"] > len(segment["deleted"])]
+    dropped = [segment for segment in manifest["segments"] if segment not in segments]
+    manifest["segments"] = segments
+    # Sources left in a dropped segment have no documents, and are indexed
+    # again like new files.
+    dropped_files = {segment["file"] for segment in dropped}
+    for key in [key for key, entry in manifest["sources"].items() if entry["segment"] in dropped_files]:
+        del manifest["sources"][key]
+
+    if force:
+        chosen = segments if len(segments) > 1 or any(segment["deleted"] for segment in segments) else []
+    else:
+        largest = max((_live_postings(segment) for segment in segments), default=0)
+        small = [segment for segment in segments if _live_postings(segment) * COMPACT_FACTOR < largest]
+        chosen = small if len(small) >= COMPACT_MIN_SEGMENTS else []
+        chosen += [segment for segment in segments if segment not in chosen and len(segment["deleted"]) > COMPACT_DELETED_FRACTION * segment["num_docs"]]
+
+    report = {"merged": len(chosen), "time": 0.0}
+    if not chosen:
+        write_manifest(directory, manifest)
+        for segment in dropped:
+            _remove_segment_files(directory, segment)
+        return report
+
+    start = time.perf_counter()
+    merged = _new_segment(manifest)
+    renumber = merge_segments([os.path.join(directory, segment["file"]) for segment in chosen], os.path.join(directory, merged["file"]), deleted=[segment["deleted"] for segment in chosen])
+
+    docs = {}
+    for segment, numbers in zip(chosen, renumber):
+        for key, old_numbers in _read_segment_docs(directory, segment).items():
+            # Sources deleted or indexed again since are left behind.
+            if manifest["sources"].get(key, {}).get("segment") != segment["file"]:
+                continue
+            new_numbers = numbers[np.asarray(old_numbers, dtype=np.int64)]
+            docs[key] = sorted(new_numbers[new_numbers >= 0].tolist())
+            manifest["sources"][key]["segment"] = merged["file"]
+    _write_segment_docs(directory, merged, docs)
+
+    header = read_header(os.path.join(directory, merged["file"]))
+    merged["num_docs"] = header["num_docs"]
+    merged["num_postings"] = header["num_postings"]
+    position = manifest["segments"].index(chosen[0])
+    manifest["segments"] = [segment for segment in manifest["segments"] if segment not in chosen]
+    manifest["segments"].insert(position, merged)
+    write_manifest(directory, manifest)
+
+    for segment in chosen + dropped:
+        _remove_segment_files(directory, segment)
+    report["time"] = time.perf_counter() - start
+
+    return report
+
+def update_index(directory: str, file_names: List[str], index_files: Callable[[List[str]], Iterable[dict]], memory_budget: int):
+    """
+    Description:
+        Brings a segmented index up to date with its source files. Only the
+        added and changed files are indexed, into one new segment; the
+        documents of changed and removed files are deleted with tombstones,
+        and small segments are then compacted. The work done is
+        proportional to the new data, apart from compaction, which
+        rewrites each posting a logarithmic number of times overall.
+
+    Parameters:
+        directory (str): The directory of the index, created if missing.
+        file_names (List[str]): The current source files.
+        index_files (Callable[[List[str]], Iterable[dict]]): Yields the
+            partial index of every file, in order.
+        memory_budget (int): The memory budget of build_index, in bytes.
+
+    Returns:
+        (dict): The files added, changed, removed and unchanged, the
+        documents deleted, the segment built and the compaction done.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    added, changed, removed, touched, stats = scan_sources(manifest, file_names)
+
+    report = {"added": len(added), "changed": len(changed), "removed": len(removed), "unchanged": len(file_names) - len(added) - len(changed), "deleted_docs": 0, "segment": None}
+    for key, stat in touched.items():
+        manifest["sources"][key].update(stat)
+    report["deleted_docs"] = delete_sources(directory, manifest, removed + [os.path.normpath(path) for path in changed])
+
+    if added or changed:
+        report["segment"] = add_segment(directory, manifest, added + changed, index_files, memory_budget, stats)
+
+    report["compaction"] = compact(directory, manifest)
+    report["segments"] = len(manifest["segments"])
+
+    return report
+
+class SegmentedIndex:
+    """
+    Description:
+        A read-only view of the segments of an index as one index. The
+        documents of every segment are numbered after those of the
+        segments before it, so concatenating a term's postings from every
+        segment keeps them sorted, and deleted documents are filtered out
+        with one boolean array. Like the segments, nothing but the headers
+        is read when it is opened.
+
+    Attributes:
+        segments (List[InvertedIndex]): The segments.
+        bases (np.ndarray): The first document number of every segment, plus the end.
+        deleted (np.ndarray): Whether every document is deleted.
+    """
+    def __init__(self, directory: str):
+        manifest = read_manifest(directory)
+        self.segments = [InvertedIndex(os.path.join(directory, segment["file"])) for segment in manifest["segments"]]
+        self.bases = np.zeros(len(self.segments) + 1, dtype=np.int64)
+        np.cumsum([segment.num_docs for segment in self.segments], out=self.bases[1:])
+        self.deleted = np.zeros(int(self.bases[-1]), dtype=bool)
+        for base, segment in zip(self.bases.tolist(), manifest["segments"]):
+            self.deleted[base + np.asarray(segment["deleted"], dtype=np.int64)] = True
+        self._has_deleted = bool(self.deleted.any())
+
+    @property
+    def num_docs(self):
+        return int(self.bases[-1]) - int(self.deleted.sum())
+
+    def __contains__(self, term):
+        return any(term in segment for segment in self.segments)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def document_frequency(self, term: str):
+        """
+        Description:
+            Returns the number of documents a term occurs in, counting
+            deleted documents until their segment is compacted.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (int): The document frequency.
+        """
+        return sum(segment.document_frequency(term) for segment in self.segments)
+
+    def doc_id(self, doc_number: int):
+        """
+        Description:
+            Returns the ID of a document from its number.
+
+        Parameters:
+            doc_number (int): The document number.
+
+        Returns:
+            (str): The document ID.
+        """
+        number = int(np.searchsorted(self.bases, doc_number, side="right")) - 1
+        return self.segments[number].doc_id(doc_number - int(self.bases[number]))
+
+    def postings_of(self, term: str):
+        """
+        Description:
+            Returns the postings of a term across the segments, without
+            deleted documents.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        doc_numbers = []
+        frequencies = []
+        for base, segment in zip(self.bases.tolist(), self.segments):
+            segment_doc_numbers, segment_frequencies = segment.postings_of(term)
+            doc_numbers.append(segment_doc_numbers + base)
+            frequencies.append(segment_frequencies)
+
+        doc_numbers = np.concatenate(doc_numbers) if doc_numbers else np.empty(0, dtype=np.int64)
+        frequencies = np.concatenate(frequencies) if frequencies else np.empty(0, dtype=np.int64)
+        if self._has_deleted:
+            keep = ~self.deleted[doc_numbers]
+            doc_numbers, frequencies = doc_numbers[keep], frequencies[keep]
+
+        return doc_numbers, frequencies
+
+    def to_dict(self, term: str):
+        """
+        Description:
+            Returns the postings of a term in the shape of the JSON index.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (Dict[str, int]): The count of the term in every document.
+        """
+        doc_numbers, frequencies = self.postings_of(term)
+        return {self.doc_id(number): frequency for number, frequency in zip(doc_numbers.tolist(), frequencies.tolist())}
+
+def open_index(path: str):
+    """
+    Description:
+        Opens an index file, or the segments of an index directory.
+
+    Parameters:
+        path (str): The path of the index file or directory.
+
+    Returns:
+        (Union[InvertedIndex, SegmentedIndex]): The index.
+    """
+    if os.path.isdir(path):
+        return SegmentedIndex(path)
+    return InvertedIndex(path)
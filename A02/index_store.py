@@ -0,0 +1,902 @@
+import argparse
+import heapq
+import itertools
+import json
+import mmap
+import operator
+import os
+import shutil
+import struct
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from term_table import TermTable
+
+# File layout: MAGIC | header length (uint32) | JSON header | arrays, laid
+# out like a term table file so every array can be used straight out of the
+# memory-mapped file.
+INDEX_MAGIC = b"IIDX"
+INDEX_VERSION = 2
+INDEX_ALIGNMENT = 8
+
+# The number of postings compressed together. A block is the unit a reader
+# decodes, so a lookup that only needs part of a long postings list skips
+# the blocks before it using their last document.
+POSTINGS_BLOCK_SIZE = 128
+
+# The number of postings an IndexWriter buffers before encoding them.
+WRITER_BUFFER_POSTINGS = 1 << 20
+
+# The estimated memory of a term and of a posting in an index dictionary
+# ({term: {doc_id: count}}), used to keep a SPIMI block within its budget.
+TERM_BYTES = 300
+POSTING_BYTES = 48
+
+def _pad(length: int):
+    """
+    Description:
+        Returns the number of bytes needed to align a length.
+
+    Parameters:
+        length (int): The current length.
+
+    Returns:
+        (int): The number of padding bytes.
+    """
+    return -length % INDEX_ALIGNMENT
+
+def vbyte_encode(values: np.ndarray):
+    """
+    Description:
+        Encodes non-negative integers with variable byte coding: seven bits
+        per byte, least significant first, with the high bit set on the
+        last byte of every integer.
+
+    Parameters:
+        values (np.ndarray): The integers.
+
+    Returns:
+        data (np.ndarray): The encoded bytes.
+        lengths (np.ndarray): The number of bytes of every integer.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+
+    starts = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    data = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(int(lengths.max()) if len(values) else 0):
+        has_byte = lengths > byte
+        data[starts[has_byte] + byte] = (values[has_byte] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+    data[starts + lengths - 1] |= 0x80
+
+    return data, lengths
+
+def vbyte_decode(data):
+    """
+    Description:
+        Decodes integers written by vbyte_encode.
+
+    Parameters:
+        data (Union[bytes, np.ndarray]): The encoded bytes.
+
+    Returns:
+        (np.ndarray): The integers.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data & 0x80)
+    if not len(ends):
+        return np.empty(0, dtype=np.uint64)
+    if ends[-1] != len(data) - 1:
+        raise ValueError("variable byte data ends inside an integer")
+
+    starts = np.zeros(len(ends), dtype=np.int64)
+    starts[1:] = ends[:-1] + 1
+    shifts = (np.arange(len(data)) - np.repeat(starts, ends - starts + 1)) * 7
+    values = (data & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+
+    return np.add.reduceat(values, starts)
+
+def _doc_order(doc_ids: List[str]):
+    """
+    Description:
+        Returns the document IDs in the order they are numbered: by value if
+        they are all numbers, as Wikipedia article IDs are, otherwise as
+        strings.
+
+    Parameters:
+        doc_ids (List[str]): The document IDs.
+
+    Returns:
+        (List[str]): The sorted document IDs.
+    """
+    if all(doc_id.isdigit() for doc_id in doc_ids):
+        return sorted(doc_ids, key=lambda doc_id: (int(doc_id), doc_id))
+    return sorted(doc_ids)
+
+def _string_pool(strings: List[str]):
+    """
+    Description:
+        Stores strings back to back in one UTF-8 pool.
+
+    Parameters:
+        strings (List[str]): The strings.
+
+    Returns:
+        pool (bytes): The concatenated strings.
+        offsets (np.ndarray): The start of every string in pool, plus the end.
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(key) for key in encoded], out=offsets[1:])
+
+    return b"".join(encoded), offsets
+
+def encode_postings(doc_numbers: np.ndarray, frequencies: np.ndarray, term_lengths: np.ndarray, doc_lengths: np.ndarray):
+    """
+    Description:
+        Compresses the postings of every term into blocks of
+        POSTINGS_BLOCK_SIZE postings. A block holds the gaps between its
+        document numbers, the first one taken from the last document of the
+        block before it, followed by their term frequencies, all variable
+        byte coded. Every term is encoded at once with vectorized
+        operations instead of block by block. The largest term frequency and
+        the shortest document of every block are kept too, which bound the
+        score any posting of the block can get.
+
+    Parameters:
+        doc_numbers (np.ndarray): The document numbers of every term's
+            postings, sorted within each term, terms one after another.
+        frequencies (np.ndarray): The term frequency of every posting.
+        term_lengths (np.ndarray): The number of postings of every term.
+        doc_lengths (np.ndarray): The length of every document, in terms.
+
+    Returns:
+        postings (np.ndarray): The compressed blocks.
+        term_blocks (np.ndarray): The first block of every term, plus the end.
+        block_docs (np.ndarray): The last document number of every block.
+        block_offsets (np.ndarray): The start of every block in postings, plus the end.
+        block_max_frequencies (np.ndarray): The largest term frequency of every block.
+        block_min_lengths (np.ndarray): The length of the shortest document of every block.
+    """
+    term_lengths = np.asarray(term_lengths, dtype=np.int64)
+    num_postings = int(term_lengths.sum())
+    term_starts = np.zeros(len(term_lengths), dtype=np.int64)
+    np.cumsum(term_lengths[:-1], out=term_starts[1:])
+
+    blocks_per_term = -(-term_lengths // POSTINGS_BLOCK_SIZE)
+    term_blocks = np.zeros(len(term_lengths) + 1, dtype=np.uint64)
+    np.cumsum(blocks_per_term, out=term_blocks[1:])
+
+    # The block and position in the block of every posting.
+    term_of = np.repeat(np.arange(len(term_lengths)), term_lengths)
+    rank = np.arange(num_postings) - term_starts[term_of]
+    block_of = term_blocks[:-1].astype(np.int64)[term_of] + rank // POSTINGS_BLOCK_SIZE
+
+    doc_numbers = np.asarray(doc_numbers, dtype=np.int64)
+    gaps = np.diff(doc_numbers, prepend=0)
+    gaps[term_starts[term_lengths > 0]] = doc_numbers[term_starts[term_lengths > 0]]
+    num_blocks = int(term_blocks[-1])
+    block_ends = np.flatnonzero(np.diff(block_of, append=num_blocks))
+    block_docs = doc_numbers[block_ends].astype(np.uint32)
+
+    frequencies = np.asarray(frequencies, dtype=np.int64)
+    block_starts = np.flatnonzero(np.diff(block_of, prepend=-1))
+    if num_postings:
+        block_max_frequencies = np.maximum.reduceat(frequencies, block_starts).astype(np.uint32)
+        block_min_lengths = np.minimum.reduceat(np.asarray(doc_lengths)[doc_numbers], block_starts).astype(np.uint32)
+    else:
+        block_max_frequencies = block_min_lengths = np.empty(0, dtype=np.uint32)
+
+    # Every block is its gaps followed by its frequencies.
+    order = np.lexsort((np.tile(rank, 2), np.repeat([0, 1], num_postings), np.tile(block_of, 2)))
+    data, lengths = vbyte_encode(np.concatenate((gaps, frequencies))[order])
+
+    block_offsets = np.zeros(num_blocks + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(np.tile(block_of, 2)[order], weights=lengths, minlength=num_blocks).astype(np.uint64), out=block_offsets[1:])
+
+    return data, term_blocks, block_docs, block_offsets, block_max_frequencies, block_min_lengths
+
+class IndexWriter:
+    """
+    Description:
+        Writes an index file term by term, in sorted order. Postings are
+        buffered and encoded WRITER_BUFFER_POSTINGS at a time into a
+        temporary file, so only the term dictionary and the block table
+        stay in memory, whatever the size of the postings.
+
+    Parameters:
+        path (str): The path of the index file.
+        doc_ids (List[str]): The document IDs, indexed by document number.
+        doc_lengths (np.ndarray): The length of every document, in terms.
+        metadata (dict): Extra information saved with the index.
+    """
+    def __init__(self, path: str, doc_ids: List[str], doc_lengths: np.ndarray, metadata: dict = None):
+        self.path = path
+        self.doc_ids = doc_ids
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.uint32)
+        self.metadata = metadata or {}
+        self.num_postings = 0
+        self._terms = []
+        self._document_frequencies = []
+        self._blocks_per_term = []
+        self._block_docs = []
+        self._block_offsets = []
+        self._block_max_frequencies = []
+        self._block_min_lengths = []
+        self._bytes = 0
+        self._buffer = []
+        self._buffered = 0
+        self._postings_file = path + ".postings.tmp"
+        self._postings_out = open(self._postings_file, "wb")
+
+    def add(self, term: str, doc_numbers: np.ndarray, frequencies: np.ndarray):
+        """
+        Description:
+            Adds the postings of the next term.
+
+        Parameters:
+            term (str): The term, greater than every term added before it.
+            doc_numbers (np.ndarray): The sorted document numbers.
+            frequencies (np.ndarray): Their term frequencies.
+
+        Returns:
+            None
+        """
+        if self._terms and term <= self._terms[-1]:
+            raise ValueError(f"term {term!r} was added out of order")
+
+        self._terms.append(term)
+        self._document_frequencies.append(len(doc_numbers))
+        self._buffer.append((doc_numbers, frequencies))
+        self._buffered += len(doc_numbers)
+        if self._buffered >= WRITER_BUFFER_POSTINGS:
+            self._flush()
+
+        return
+
+    def _flush(self):
+        """
+        Description:
+            Encodes the buffered postings and appends them to the temporary file.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        if not self._buffer:
+            return
+
+        data, term_blocks, block_docs, block_offsets, block_max_frequencies, block_min_lengths = encode_postings(
+            np.concatenate([doc_numbers for doc_numbers, _ in self._buffer]),
+            np.concatenate([frequencies for _, frequencies in self._buffer]),
+            [len(doc_numbers) for doc_numbers, _ in self._buffer],
+            self.doc_lengths)
+        self._postings_out.write(data.tobytes())
+        self._blocks_per_term.append(np.diff(term_blocks))
+        self._block_docs.append(block_docs)
+        self._block_offsets.append(block_offsets[:-1] + np.uint64(self._bytes))
+        self._block_max_frequencies.append(block_max_frequencies)
+        self._block_min_lengths.append(block_min_lengths)
+        self._bytes += len(data)
+        self.num_postings += self._buffered
+        self._buffer = []
+        self._buffered = 0
+
+        return
+
+    def close(self):
+        """
+        Description:
+            Writes the index file and removes the temporary file.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._flush()
+        self._postings_out.close()
+
+        term_blocks = np.zeros(len(self._terms) + 1, dtype=np.uint64)
+        if self._blocks_per_term:
+            np.cumsum(np.concatenate(self._blocks_per_term), out=term_blocks[1:])
+        block_offsets = np.concatenate(self._block_offsets + [np.array([self._bytes], dtype=np.uint64)])
+        block_docs = np.concatenate(self._block_docs) if self._block_docs else np.empty(0, dtype=np.uint32)
+        block_max_frequencies = np.concatenate(self._block_max_frequencies) if self._block_max_frequencies else np.empty(0, dtype=np.uint32)
+        block_min_lengths = np.concatenate(self._block_min_lengths) if self._block_min_lengths else np.empty(0, dtype=np.uint32)
+
+        table = TermTable.from_counts(dict(zip(self._terms, self._document_frequencies)))
+        doc_pool, doc_offsets = _string_pool(self.doc_ids)
+        # The postings are copied from the temporary file through a memory
+        # map rather than read into memory.
+        postings = np.memmap(self._postings_file, dtype=np.uint8, mode="r") if self._bytes else np.empty(0, dtype=np.uint8)
+
+        save_arrays(self.path, {
+            "term_pool": np.frombuffer(bytes(table.pool), dtype=np.uint8),
+            "term_offsets": table.offsets,
+            "document_frequencies": table.counts,
+            "term_slots": table.slots,
+            "term_blocks": term_blocks,
+            "block_docs": block_docs,
+            "block_offsets": block_offsets,
+            "block_max_frequencies": block_max_frequencies,
+            "block_min_lengths": block_min_lengths,
+            "postings": postings,
+            "doc_pool": np.frombuffer(doc_pool, dtype=np.uint8),
+            "doc_offsets": doc_offsets,
+            "doc_lengths": self.doc_lengths,
+        }, {"num_terms": len(self._terms), "num_docs": len(self.doc_ids), "num_postings": self.num_postings, "block_size": POSTINGS_BLOCK_SIZE, "metadata": self.metadata})
+
+        del postings
+        os.remove(self._postings_file)
+
+        return
+
+def write_index(path: str, index: Dict[str, Dict[str, int]], metadata: dict = None):
+    """
+    Description:
+        Writes an inverted index in the binary format, atomically replacing
+        any old file. Documents are numbered in the order of their IDs.
+
+    Parameters:
+        path (str): The path of the index file.
+        index (Dict[str, Dict[str, int]]): The count of every term in every document.
+        metadata (dict): Extra information saved with the index.
+
+    Returns:
+        None
+    """
+    doc_ids = _doc_order(list({doc_id for postings in index.values() for doc_id in postings}))
+    doc_number = {doc_id: number for number, doc_id in enumerate(doc_ids)}
+    doc_lengths = np.zeros(len(doc_ids), dtype=np.int64)
+    for postings in index.values():
+        for doc_id, count in postings.items():
+            doc_lengths[doc_number[doc_id]] += count
+
+    writer = IndexWriter(path, doc_ids, doc_lengths, metadata)
+    for term in sorted(index):
+        postings = sorted((doc_number[doc_id], count) for doc_id, count in index[term].items())
+        writer.add(term, np.array([number for number, _ in postings], dtype=np.int64), np.array([count for _, count in postings], dtype=np.int64))
+    writer.close()
+
+    return
+
+def merge_indexes(index: dict, partial: dict):
+    """
+    Description:
+        Merges the inverted index of a file into the index of the files
+        before it. Merging the files in order gives the index a serial
+        pass over them would.
+
+    Parameters:
+        index (Dict[str, Dict[str, int]]): The index to merge into.
+        partial (Dict[str, Dict[str, int]]): The index of the next file.
+
+    Returns:
+        (int): The number of postings added to the index.
+    """
+    added = 0
+    for word, postings in partial.items():
+        merged = index.get(word)
+        if merged is None:
+            index[word] = postings
+            added += len(postings)
+            continue
+
+        for doc_id, count in postings.items():
+            if doc_id not in merged:
+                added += 1
+            merged[doc_id] = merged.get(doc_id, 0) + count
+
+    return added
+
+def build_index(partials: Iterable[dict], path: str, memory_budget: int, metadata: dict = None):
+    """
+    Description:
+        Builds an index file with single-pass in-memory indexing (SPIMI).
+        The partial indexes are merged into one dictionary until its
+        estimated size passes the memory budget; it is then written to a
+        sorted segment next to the index and emptied. At the end the
+        segments are merged k ways into the index and removed. If no
+        segment was needed the dictionary is written straight away.
+
+    Parameters:
+        partials (Iterable[dict]): The partial indexes, {term: {doc_id: count}}.
+        path (str): The path of the index file.
+        memory_budget (int): The estimated memory the dictionary may use, in bytes.
+        metadata (dict): Extra information saved with the index.
+
+    Returns:
+        (dict): The report: the number of terms, documents and postings of
+        the index, the segments written and the postings of each, and the
+        time spent writing segments and merging them, in seconds.
+    """
+    segment_dir = path + ".segments"
+    if os.path.isdir(segment_dir):
+        shutil.rmtree(segment_dir)
+
+    report = {"memory_budget": memory_budget, "segments": 0, "segment_postings": [], "flush_time": 0.0, "merge_time": 0.0}
+    segment_files = []
+    index = {}
+    postings = 0
+    for partial in partials:
+        postings += merge_indexes(index, partial)
+        if len(index) * TERM_BYTES + postings * POSTING_BYTES <= memory_budget:
+            continue
+
+        start = time.perf_counter()
+        os.makedirs(segment_dir, exist_ok=True)
+        segment_files.append(os.path.join(segment_dir, f"segment-{len(segment_files):05d}.index"))
+        write_index(segment_files[-1], index)
+        report["flush_time"] += time.perf_counter() - start
+        report["segment_postings"].append(postings)
+        index = {}
+        postings = 0
+
+    start = time.perf_counter()
+    if not segment_files:
+        write_index(path, index, metadata)
+    else:
+        if index:
+            segment_files.append(os.path.join(segment_dir, f"segment-{len(segment_files):05d}.index"))
+            write_index(segment_files[-1], index)
+            report["segment_postings"].append(postings)
+        index = None
+        merge_segments(segment_files, path, metadata)
+        shutil.rmtree(segment_dir)
+    report["merge_time" if segment_files else "flush_time"] += time.perf_counter() - start
+    report["segments"] = len(segment_files)
+
+    header = read_header(path)
+    report.update(terms=header["num_terms"], documents=header["num_docs"], postings=header["num_postings"])
+
+    return report
+
+def document_lengths(index):
+    """
+    Description:
+        Returns the length of every document of an index file, counting
+        them from the postings if the file predates stored lengths.
+
+    Parameters:
+        index (InvertedIndex): The index.
+
+    Returns:
+        (np.ndarray): The length of every document, in terms.
+    """
+    if index.doc_lengths is not None:
+        return index.doc_lengths.astype(np.int64)
+
+    doc_lengths = np.zeros(index.num_docs, dtype=np.int64)
+    for term_id in range(len(index)):
+        doc_numbers, frequencies = index.term_postings(term_id)
+        doc_lengths[doc_numbers] += frequencies
+
+    return doc_lengths
+
+def merge_segments(segment_files: List[str], path: str, metadata: dict = None, deleted: List[np.ndarray] = None):
+    """
+    Description:
+        Merges index segments into one index. The sorted term dictionaries
+        of the segments are merged k ways with heapq.merge, so each term's
+        postings are read from every segment holding it, renumbered to the
+        merged document numbering and written before the next term is read.
+        Counts of a document found in more than one segment are added, and
+        deleted documents are left out.
+
+    Parameters:
+        segment_files (List[str]): The paths of the segments.
+        path (str): The path of the merged index.
+        metadata (dict): Extra information saved with the index.
+        deleted (List[np.ndarray]): The deleted document numbers of every segment.
+
+    Returns:
+        (List[np.ndarray]): The merged number of every document of every
+        segment, -1 for deleted documents.
+    """
+    segments = [InvertedIndex(segment_file) for segment_file in segment_files]
+    segment_doc_ids = [segment.all_doc_ids() for segment in segments]
+    live = [np.ones(len(ids), dtype=bool) for ids in segment_doc_ids]
+    for number, numbers in enumerate(deleted or []):
+        live[number][np.asarray(numbers, dtype=np.int64)] = False
+
+    doc_ids = _doc_order(list({doc_id for ids, keep in zip(segment_doc_ids, live) for doc_id, alive in zip(ids, keep.tolist()) if alive}))
+    doc_number = {doc_id: number for number, doc_id in enumerate(doc_ids)}
+    renumber = [np.array([doc_number[doc_id] if alive else -1 for doc_id, alive in zip(ids, keep.tolist())], dtype=np.int64) for ids, keep in zip(segment_doc_ids, live)]
+
+    doc_lengths = np.zeros(len(doc_ids), dtype=np.int64)
+    for segment, numbers in zip(segments, renumber):
+        keep = numbers >= 0
+        doc_lengths[numbers[keep]] += document_lengths(segment)[keep]
+
+    def segment_terms(number: int):
+        terms = segments[number].terms
+        for term_id in range(len(terms)):
+            yield terms.term(term_id), number, term_id
+
+    writer = IndexWriter(path, doc_ids, doc_lengths, metadata)
+    for term, entries in itertools.groupby(heapq.merge(*(segment_terms(number) for number in range(len(segments)))), key=operator.itemgetter(0)):
+        doc_numbers = []
+        frequencies = []
+        for _, number, term_id in entries:
+            segment_doc_numbers, segment_frequencies = segments[number].term_postings(term_id)
+            merged_numbers = renumber[number][segment_doc_numbers]
+            keep = merged_numbers >= 0
+            doc_numbers.append(merged_numbers[keep])
+            frequencies.append(segment_frequencies[keep])
+
+        if len(doc_numbers) == 1:
+            doc_numbers, frequencies = doc_numbers[0], frequencies[0]
+        else:
+            doc_numbers, inverse = np.unique(np.concatenate(doc_numbers), return_inverse=True)
+            frequencies = np.bincount(inverse, weights=np.concatenate(frequencies)).astype(np.int64)
+        if len(doc_numbers):
+            writer.add(term, doc_numbers, frequencies)
+    writer.close()
+
+    for segment in segments:
+        segment.close()
+
+    return renumber
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray], header: dict):
+    """
+    Description:
+        Writes arrays to an index file, each one aligned, atomically
+        replacing any old file.
+
+    Parameters:
+        path (str): The path of the index file.
+        arrays (Dict[str, np.ndarray]): The arrays.
+        header (dict): The rest of the header.
+
+    Returns:
+        None
+    """
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        dtype = array.dtype.newbyteorder("<") if array.dtype.itemsize > 1 else array.dtype
+        layout[name] = [position, len(array), dtype.str]
+        position += array.nbytes + _pad(array.nbytes)
+
+    header_bytes = json.dumps({"version": INDEX_VERSION, **header, "arrays": layout}).encode("utf-8")
+    header_bytes += b" " * _pad(len(INDEX_MAGIC) + 4 + len(header_bytes))
+
+    temp_file = path + ".tmp"
+    with open(temp_file, "wb") as file:
+        file.write(INDEX_MAGIC)
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        for name, array in arrays.items():
+            data = np.ascontiguousarray(array.astype(np.dtype(layout[name][2]), copy=False))
+            file.write(memoryview(data).cast("B"))
+            file.write(b"\0" * _pad(data.nbytes))
+
+    os.replace(temp_file, path)
+
+    return
+
+def read_header(path: str):
+    """
+    Description:
+        Reads the header of an index file.
+
+    Parameters:
+        path (str): The path of the index file.
+
+    Returns:
+        (dict): The header, or None if the file is missing or not an index.
+    """
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                return None
+
+            (header_length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_length))
+
+    except (FileNotFoundError, PermissionError, struct.error, ValueError):
+        return None
+
+    # Version 1 files lack the document lengths and block maxima used for
+    # ranking, but can still be read and merged.
+    if header.get("version") not in (1, INDEX_VERSION):
+        return None
+
+    header["data_offset"] = len(INDEX_MAGIC) + 4 + header_length
+    return header
+
+class InvertedIndex:
+    """
+    Description:
+        A read-only view of a binary inverted index. The file is
+        memory-mapped, so opening it reads nothing but the header, and a
+        lookup finds the term in the hash table of the term dictionary and
+        decodes only that term's postings blocks.
+
+    Attributes:
+        terms (TermTable): The term dictionary, with the document frequency
+            of every term as its count.
+        term_blocks (np.ndarray): The first block of every term, plus the end.
+        block_docs (np.ndarray): The last document number of every block.
+        block_offsets (np.ndarray): The start of every block, plus the end.
+        block_max_frequencies (np.ndarray): The largest term frequency of
+            every block, None in a version 1 file.
+        block_min_lengths (np.ndarray): The length of the shortest document
+            of every block, None in a version 1 file.
+        postings (np.ndarray): The compressed blocks.
+        doc_lengths (np.ndarray): The length of every document, in terms,
+            None in a version 1 file.
+        header (dict): The header of the file.
+        path (str): The file the index was loaded from.
+    """
+    def __init__(self, path: str):
+        header = read_header(path)
+        if header is None:
+            raise ValueError(f"{path} is not an inverted index file")
+
+        with open(path, "rb") as file:
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        arrays = {}
+        for name, (offset, length, dtype) in header["arrays"].items():
+            arrays[name] = np.frombuffer(self._mapped, dtype=np.dtype(dtype), count=length, offset=header["data_offset"] + offset)
+
+        self.header = header
+        self.path = path
+        self.block_size = header["block_size"]
+        self.terms = TermTable(memoryview(arrays["term_pool"]), arrays["term_offsets"], arrays["document_frequencies"], arrays["term_slots"], header["metadata"])
+        self.term_blocks = arrays["term_blocks"]
+        self.block_docs = arrays["block_docs"]
+        self.block_offsets = arrays["block_offsets"]
+        self.block_max_frequencies = arrays.get("block_max_frequencies")
+        self.block_min_lengths = arrays.get("block_min_lengths")
+        self.postings = arrays["postings"]
+        self.doc_lengths = arrays.get("doc_lengths")
+        self._doc_pool = memoryview(arrays["doc_pool"])
+        self._doc_offsets = memoryview(arrays["doc_offsets"]).cast("B").cast("Q")
+        # Scalar reads from memoryviews are much faster than from arrays.
+        self._term_blocks = memoryview(self.term_blocks).cast("B").cast("Q")
+        self._block_offsets = memoryview(self.block_offsets).cast("B").cast("Q")
+
+    def __len__(self):
+        return len(self.terms)
+
+    def close(self):
+        """
+        Description:
+            Unmaps the file. The index cannot be used afterwards.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self.terms = self.term_blocks = self.block_docs = self.block_offsets = self.postings = None
+        self.block_max_frequencies = self.block_min_lengths = self.doc_lengths = None
+        self._doc_pool = self._doc_offsets = self._term_blocks = self._block_offsets = None
+        try:
+            self._mapped.close()
+        except BufferError:
+            # Arrays taken from the index are still in use; the map is
+            # closed once they are freed.
+            pass
+
+        return
+
+    def __contains__(self, term):
+        return term in self.terms
+
+    @property
+    def num_docs(self):
+        return self.header["num_docs"]
+
+    def document_frequency(self, term: str):
+        """
+        Description:
+            Returns the number of documents a term occurs in.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (int): The document frequency, 0 if the term is not indexed.
+        """
+        return self.terms.count(term)
+
+    def doc_id(self, doc_number: int):
+        """
+        Description:
+            Returns the ID of a document from its number.
+
+        Parameters:
+            doc_number (int): The document number.
+
+        Returns:
+            (str): The document ID.
+        """
+        return bytes(self._doc_pool[self._doc_offsets[doc_number]:self._doc_offsets[doc_number + 1]]).decode("utf-8")
+
+    def all_doc_ids(self):
+        """
+        Description:
+            Returns the IDs of every document.
+
+        Parameters:
+            None
+
+        Returns:
+            (List[str]): The document IDs, indexed by document number.
+        """
+        pool = bytes(self._doc_pool)
+        offsets = self._doc_offsets
+        return [pool[offsets[number]:offsets[number + 1]].decode("utf-8") for number in range(self.num_docs)]
+
+    def block_range(self, term_id: int):
+        """
+        Description:
+            Returns the blocks of a term.
+
+        Parameters:
+            term_id (int): The term ID.
+
+        Returns:
+            (range): The block numbers.
+        """
+        return range(self._term_blocks[term_id], self._term_blocks[term_id + 1])
+
+    def decode_block(self, term_id: int, block: int):
+        """
+        Description:
+            Decodes one block of a term's postings.
+
+        Parameters:
+            term_id (int): The term ID.
+            block (int): The block number.
+
+        Returns:
+            doc_numbers (np.ndarray): The document numbers of the block.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        first = self._term_blocks[term_id]
+        length = min(self.block_size, self.terms._counts[term_id] - (block - first) * self.block_size)
+        values = vbyte_decode(self.postings[self._block_offsets[block]:self._block_offsets[block + 1]])
+        doc_numbers = np.cumsum(values[:length])
+        if block > first:
+            doc_numbers += np.uint64(self.block_docs[block - 1])
+
+        return doc_numbers.astype(np.int64), values[length:].astype(np.int64)
+
+    def decode_blocks(self, term_id: int, start: int, stop: int):
+        """
+        Description:
+            Decodes consecutive blocks of a term's postings together.
+
+        Parameters:
+            term_id (int): The term ID.
+            start (int): The first block number.
+            stop (int): The block number after the last one.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers of the blocks.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        first = self._term_blocks[term_id]
+        count = min(self.terms._counts[term_id] - (start - first) * self.block_size, (stop - start) * self.block_size)
+        values = vbyte_decode(self.postings[self._block_offsets[start]:self._block_offsets[stop]])
+
+        # Every full block is its gaps then its frequencies; the term's last
+        # block may be shorter.
+        full = count // self.block_size
+        split = full * self.block_size * 2
+        blocks = values[:split].reshape(full, 2, self.block_size)
+        tail = count - full * self.block_size
+        gaps = np.concatenate((blocks[:, 0].ravel(), values[split:split + tail]))
+        frequencies = np.concatenate((blocks[:, 1].ravel(), values[split + tail:]))
+        doc_numbers = np.cumsum(gaps)
+        if start > first:
+            doc_numbers += np.uint64(self.block_docs[start - 1])
+
+        return doc_numbers.astype(np.int64), frequencies.astype(np.int64)
+
+    def term_postings(self, term_id: int):
+        """
+        Description:
+            Decodes all the postings of a term, decoding its blocks together.
+
+        Parameters:
+            term_id (int): The term ID.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        return self.decode_blocks(term_id, self._term_blocks[term_id], self._term_blocks[term_id + 1])
+
+    def postings_of(self, term: str):
+        """
+        Description:
+            Returns the postings of a term.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers, empty if
+                the term is not indexed.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        term_id = self.terms.term_id(term)
+        if term_id < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return self.term_postings(term_id)
+
+    def to_dict(self, term: str):
+        """
+        Description:
+            Returns the postings of a term in the shape of the JSON index.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (Dict[str, int]): The count of the term in every document.
+        """
+        doc_numbers, frequencies = self.postings_of(term)
+        return {self.doc_id(number): frequency for number, frequency in zip(doc_numbers.tolist(), frequencies.tolist())}
+
+def main():
+    """
+    Description:
+        Main function of the program. Prints the postings of the given words
+        from a binary inverted index, normalized the way the index was built.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Inverted Index Lookup")
+    parser.add_argument("--index", default="wikipedia.index", help="the inverted index file, or the directory of a segmented index.")
+    parser.add_argument("--limit", type=int, default=10, help="the number of postings printed per word.")
+    parser.add_argument("words", nargs="*", help="the words to look up.")
+    args = parser.parse_args()
+
+    from index_segments import open_index
+    from normalization import index_term
+
+    start = time.perf_counter()
+    try:
+        index = open_index(args.index)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+    print(f"{index.num_docs} documents, opened in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    for word in args.words:
+        term = index_term(word)
+        if term is None:
+            print(f"{word}: stopword, not indexed")
+            continue
+        start = time.perf_counter()
+        doc_numbers, frequencies = index.postings_of(term)
+        elapsed = time.perf_counter() - start
+        print(f"{word} ({term}): {len(doc_numbers)} documents in {elapsed * 1000:.3f} ms")
+        for number, frequency in zip(doc_numbers[:args.limit].tolist(), frequencies[:args.limit].tolist()):
+            print("\t", index.doc_id(number), "\t", frequency)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import pickle
+import ssl
+import string
+import sys
+import tempfile
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from normalization import stop_words
+from term_table import TermTable, read_header
+
+CORPUS_FILE_NAME = "data_wikipedia/00c2bfc7-57db-496e-9d5c-d62f8d8119e3.json"
+MODEL_FILE_NAME = "noisy_channel.model"
+
+# When a vocabulary limit is set, the counts of every file are split by a
+# hash of the word into COUNT_SHARDS files on disk, and each shard is merged
+# and pruned on its own at the end. The counts stay exact, while the
+# builder only holds one shard and the words kept so far in memory.
+COUNT_SHARDS = 64
+
+def _download_nltk_data():
+    """
+    Description:
+        Downloads the nltk data needed to build a model, getting past SSL
+        certificate verification if it fails.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    import nltk
+
+    try:
+        _create_unverified_https_context = ssl._create_unverified_context
+    except AttributeError:
+        pass
+    else:
+        ssl._create_default_https_context = _create_unverified_https_context
+
+    nltk.download("stopwords", quiet=True)
+    nltk.download("punkt", quiet=True)
+
+    return
+
+def corpus_sources(corpus: str):
+    """
+    Description:
+        Returns the files of a corpus, which is either a single file or a
+        directory of Wikipedia JSON files. Only the .json files of a
+        directory are part of the corpus.
+
+    Parameters:
+        corpus (str): The path of the corpus file or directory.
+
+    Returns:
+        (List[str]): The paths of the corpus files.
+    """
+    if not os.path.isdir(corpus):
+        return [corpus]
+
+    sources = [os.path.join(corpus, file_name) for file_name in sorted(os.listdir(corpus)) if file_name.endswith(".json")]
+    return [source for source in sources if os.path.isfile(source)]
+
+def source_fingerprint(sources: List[str]):
+    """
+    Description:
+        Returns the size and modification time of every source file, used to
+        decide whether a model is out of date.
+
+    Parameters:
+        sources (List[str]): The paths of the source files.
+
+    Returns:
+        (List[list]): A [path, size, mtime_ns] entry for every source.
+    """
+    fingerprint = []
+    for path in sources:
+        stat = os.stat(path)
+        fingerprint.append([os.path.normpath(path), stat.st_size, stat.st_mtime_ns])
+
+    return fingerprint
+
+def count_words(text: str):
+    """
+    Description:
+        Counts the words of a text the way the spell checker expects: lower
+        case, punctuation removed, alphabetic tokens only and no stopwords.
+
+    Parameters:
+        text (str): The text to count the words of.
+
+    Returns:
+        (Counter): The number of occurrences of each word.
+    """
+    from nltk.tokenize import word_tokenize
+
+    stopwords = stop_words()
+    text = text.translate(str.maketrans("", "", string.punctuation))
+    text = text.lower()
+
+    return Counter(word for word in word_tokenize(text) if word.isalpha() and word not in stopwords)
+
+def count_file_words(file_name: str):
+    """
+    Description:
+        Counts the words of the articles of one Wikipedia JSON file, one
+        article at a time.
+
+    Parameters:
+        file_name (str): The path of the JSON file.
+
+    Returns:
+        (Counter): The number of occurrences of each word.
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        data = json.load(file) #[ {id, text, title} ]
+
+    counts = Counter()
+    for entry in data:
+        counts.update(count_words(entry["text"]))
+
+    return counts
+
+def prune_counts(word_counts: Counter, min_count: int = 1, max_terms: int = None):
+    """
+    Description:
+        Drops the rare words of a vocabulary.
+
+    Parameters:
+        word_counts (Counter): The number of occurrences of each word.
+        min_count (int): The minimum number of occurrences of a kept word.
+        max_terms (int): The maximum number of words kept, the most frequent
+            ones first and ties in alphabetical order. None keeps every word.
+
+    Returns:
+        (Counter): The pruned counts.
+    """
+    if min_count > 1:
+        word_counts = Counter({word: count for word, count in word_counts.items() if count >= min_count})
+    if max_terms is not None and len(word_counts) > max_terms:
+        word_counts = Counter(dict(heapq.nsmallest(max_terms, word_counts.items(), key=lambda item: (-item[1], item[0]))))
+
+    return word_counts
+
+def save_language_model(word_counts: Dict[str, int], model_file: str, sources: List[str], total_words: int = None, options: dict = None, corpus: str = None):
+    """
+    Description:
+        Serializes the word counts into a term table file, recording where
+        they came from.
+
+    Parameters:
+        word_counts (Dict[str, int]): The number of occurrences of each word.
+        model_file (str): The path of the model file to write.
+        sources (List[str]): The files the counts were built from.
+        total_words (int): The number of words in the corpus, which differs
+            from the sum of the counts once rare words are pruned.
+        options (dict): The build options, reused when the model is rebuilt.
+        corpus (str): The corpus file or directory the sources were found in.
+
+    Returns:
+        None
+    """
+    metadata = {
+        "total_words": sum(word_counts.values()) if total_words is None else total_words,
+        "sources": source_fingerprint(sources),
+        "options": options or {},
+    }
+    if corpus is not None:
+        metadata["corpus"] = os.path.normpath(corpus)
+    TermTable.from_counts(word_counts, metadata).save(model_file)
+
+    return
+
+def read_model_header(model_file: str):
+    """
+    Description:
+        Reads what a model file records about how it was built.
+
+    Parameters:
+        model_file (str): The path of the model file.
+
+    Returns:
+        (dict): The total number of words, sources and build options, or
+            None if the file is missing or not a model.
+    """
+    header = read_header(model_file)
+    if header is None or "sources" not in header["metadata"]:
+        return None
+
+    return header["metadata"]
+
+def model_corpus(header: dict):
+    """
+    Description:
+        Returns the corpus a model was built from, as recorded in its header.
+        Models that predate the recorded corpus give the single source file,
+        or the directory holding their sources.
+
+    Parameters:
+        header (dict): The model header, from read_model_header().
+
+    Returns:
+        (str): The corpus file or directory.
+    """
+    if "corpus" in header:
+        return header["corpus"]
+
+    paths = [path for path, _, _ in header["sources"]]
+    if not paths:
+        return CORPUS_FILE_NAME
+    return paths[0] if len(paths) == 1 else os.path.commonpath(paths)
+
+def is_stale(model_file: str, corpus: str = None):
+    """
+    Description:
+        Checks whether a model file needs to be rebuilt because it is missing
+        or because its corpus changed since it was built. Without a corpus,
+        the model is checked against the corpus it was built from. A file
+        that is not a model, such as the Zipf term table, is never
+        overwritten: a ValueError is raised instead.
+
+    Parameters:
+        model_file (str): The path of the model file.
+        corpus (str): The corpus file or directory the model should be
+            built from, or None for the one recorded in the model.
+
+    Returns:
+        (bool): True if the model must be rebuilt.
+    """
+    header = read_model_header(model_file)
+    if header is None:
+        if os.path.exists(model_file):
+            raise ValueError(f"{model_file} is not a language model file")
+        return True
+
+    try:
+        return header["sources"] != source_fingerprint(corpus_sources(corpus if corpus is not None else model_corpus(header)))
+    except FileNotFoundError:
+        # A shipped model is still usable without its corpus.
+        return False
+
+def load_language_model(model_file: str):
+    """
+    Description:
+        Loads a model file by memory-mapping it.
+
+    Parameters:
+        model_file (str): The path of the model file.
+
+    Returns:
+        word_counts (TermTable): The number of occurrences of each word.
+        total_words (int): The total number of words in the corpus.
+    """
+    header = read_model_header(model_file)
+    if header is None:
+        raise ValueError(f"{model_file} is not a language model file")
+
+    return TermTable.load(model_file), header["total_words"]
+
+def build_language_model(model_file: str = MODEL_FILE_NAME, corpus: str = CORPUS_FILE_NAME, workers: int = 1, min_count: int = 1, max_terms: int = None):
+    """
+    Description:
+        Builds a model file from a corpus. A single corpus file is counted
+        whole, as the spell checker always has. A directory is streamed one
+        JSON file at a time through worker processes, whose partial counts
+        are merged as they arrive.
+
+    Parameters:
+        model_file (str): The path of the model file to write.
+        corpus (str): The path of the corpus file or directory.
+        workers (int): The number of counting processes for a directory.
+        min_count (int): The minimum number of occurrences of a kept word.
+        max_terms (int): The maximum number of words kept.
+
+    Returns:
+        None
+    """
+    _download_nltk_data()
+
+    sources = corpus_sources(corpus)
+    options = {"min_count": min_count, "max_terms": max_terms}
+    if not os.path.isdir(corpus):
+        with open(corpus, "r") as file:
+            text = file.read()
+        word_counts = count_words(text)
+        total_words = sum(word_counts.values())
+        save_language_model(prune_counts(word_counts, min_count, max_terms), model_file, sources, total_words, options, corpus)
+        return
+
+    if max_terms is None:
+        word_counts = Counter()
+        total_words = 0
+        with multiprocessing.Pool(workers) as pool:
+            for partial in pool.imap_unordered(count_file_words, sources):
+                word_counts.update(partial)
+                total_words += sum(partial.values())
+    else:
+        word_counts, total_words = _count_sharded(sources, workers, min_count, max_terms)
+
+    save_language_model(prune_counts(word_counts, min_count, max_terms), model_file, sources, total_words, options, corpus)
+
+    return
+
+def _count_sharded(sources: List[str], workers: int, min_count: int, max_terms: int):
+    """
+    Description:
+        Counts the words of a directory corpus with a vocabulary limit. The
+        partial counts of every file are written to COUNT_SHARDS shard
+        files by a hash of the word, so every word is counted in one shard
+        only; each shard is then merged exactly and pruned against the
+        words kept from the shards before it.
+
+    Parameters:
+        sources (List[str]): The paths of the JSON files.
+        workers (int): The number of counting processes.
+        min_count (int): The minimum number of occurrences of a kept word.
+        max_terms (int): The maximum number of words kept.
+
+    Returns:
+        word_counts (Counter): The counts of the kept words.
+        total_words (int): The total number of words in the corpus.
+    """
+    total_words = 0
+    word_counts = Counter()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"{shard:03d}.counts") for shard in range(COUNT_SHARDS)]
+        shard_files = [open(path, "wb") for path in paths]
+        try:
+            with multiprocessing.Pool(workers) as pool:
+                for partial in pool.imap_unordered(count_file_words, sources):
+                    total_words += sum(partial.values())
+                    shards = [{} for _ in range(COUNT_SHARDS)]
+                    for word, count in partial.items():
+                        shards[zlib.crc32(word.encode("utf-8")) % COUNT_SHARDS][word] = count
+                    for shard_file, shard in zip(shard_files, shards):
+                        if shard:
+                            pickle.dump(shard, shard_file)
+        finally:
+            for shard_file in shard_files:
+                shard_file.close()
+
+        for path in paths:
+            shard_counts = Counter()
+            with open(path, "rb") as shard_file:
+                while True:
+                    try:
+                        shard_counts.update(pickle.load(shard_file))
+                    except EOFError:
+                        break
+            word_counts.update(prune_counts(shard_counts, min_count, max_terms))
+            word_counts = prune_counts(word_counts, max_terms=max_terms)
+
+    return word_counts, total_words
+
+def ensure_language_model(model_file: str = MODEL_FILE_NAME, corpus: str = None):
+    """
+    Description:
+        Loads a model file, building it first if it is missing or its corpus
+        changed. Without a corpus, an existing model is checked against and
+        rebuilt from the corpus it was built from, so a model built from a
+        whole directory is never replaced by one built from the default
+        file; a missing model is built from CORPUS_FILE_NAME. A rebuild
+        keeps the pruning options of the previous build.
+
+    Parameters:
+        model_file (str): The path of the model file.
+        corpus (str): The path of the corpus file or directory, or None.
+
+    Returns:
+        word_counts (Dict[str, int]): The number of occurrences of each word.
+        total_words (int): The total number of words in the corpus.
+    """
+    if is_stale(model_file, corpus):
+        header = read_model_header(model_file)
+        options = header["options"] if header is not None else {}
+        if corpus is None:
+            corpus = model_corpus(header) if header is not None else CORPUS_FILE_NAME
+        print(f"Building language model {model_file} from {corpus}...", file=sys.stderr)
+        build_language_model(model_file, corpus, os.cpu_count() or 1, **options)
+
+    return load_language_model(model_file)
+
+def main():
+    """
+    Description:
+        Main function of the program.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Noisy Channel Language Model Builder")
+    parser.add_argument("--corpus", help=f"the corpus file, or directory of JSON files, to build the model from. Defaults to the corpus the model was built from, or {CORPUS_FILE_NAME}.")
+    parser.add_argument("--model", default=MODEL_FILE_NAME, help="the model file to write")
+    parser.add_argument("--force", action="store_true", help="rebuild the model even if the corpus did not change")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="the number of processes counting a directory")
+    parser.add_argument("--mincount", type=int, default=1, help="drop words occurring fewer times than this")
+    parser.add_argument("--maxterms", type=int, help="keep at most this many of the most frequent words")
+    args = parser.parse_args()
+
+    try:
+        if args.force or is_stale(args.model, args.corpus):
+            corpus = args.corpus
+            if corpus is None:
+                header = read_model_header(args.model)
+                corpus = model_corpus(header) if header is not None else CORPUS_FILE_NAME
+            build_language_model(args.model, corpus, args.workers, args.mincount, args.maxterms)
+            print(f"Built {args.model}")
+        else:
+            print(f"{args.model} is up to date")
+
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    word_counts, total_words = load_language_model(args.model)
+    print(f"{len(word_counts)} terms, {total_words} words")
+
+if __name__ == '__main__':
+    main()
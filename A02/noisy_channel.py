@@ -1,50 +1,41 @@
 import argparse
+import functools
+import multiprocessing
+import re
 import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from collections import Counter
+import sys
 import math
-import ssl
-
-# Get past SSL certificate verification
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-nltk.download('stopwords')
-nltk.download('punkt')
-
-stop_words = set(stopwords.words('english'))
-
-try:
-    with open('data_wikipedia/00c2bfc7-57db-496e-9d5c-d62f8d8119e3.json', 'r') as file:
-        text = file.read()
-except (FileNotFoundError, PermissionError) as e:
-    print(f"Error: {e}")
-    exit()
-
-text = text.translate(str.maketrans('', '', string.punctuation))
-text = text.lower()
-tokens = word_tokenize(text)
-words = []
-for word in tokens:
-    if word.isalpha() and word not in stop_words:
-        words.append(word)
-
-# Creating a language model for calculating probabilities of words in the dataset
-word_counts = Counter(words)
-total_words = sum(word_counts.values())
-
-# Calculating probabilities of words in the dataset
-word_probs = {}
-for word, count in word_counts.items():
-    word_probs[word] = count / total_words
-
-def noisy_channel_model(word: str, vocab: dict, del_cost=1, ins_cost=1, sub_cost=1):
+from collections import OrderedDict
+from typing import Iterable, Iterator, List
+from language_model import MODEL_FILE_NAME, ensure_language_model
+from spell_index import SymmetricDeleteIndex, VocabularyTrie
+from term_table import TermProbabilities
+
+CORRECTION_CACHE_SIZE = 100000
+POOL_MIN_WORDS = 2000
+POOL_CHUNK_SIZE = 256
+STREAM_BATCH_LINES = 10000
+WORD_REGEX = re.compile(r"[A-Za-z]+")
+
+def load_word_probs(model_file: str = MODEL_FILE_NAME, corpus: str = None):
+    """
+    Description:
+        Returns the probabilities of words in the dataset, loaded from the
+        prebuilt language model (which is rebuilt only if the corpus changed).
+
+    Parameters:
+        model_file (str): The path of the language model file.
+        corpus (str): The corpus file or directory to check the model
+            against, or None for the one it was built from.
+
+    Returns:
+        word_probs (TermProbabilities): A read-only dictionary of words and
+            their probabilities, backed by the memory-mapped model.
+    """
+    word_counts, total_words = ensure_language_model(model_file, corpus)
+    return TermProbabilities(word_counts, total_words)
+
+def noisy_channel_model(word: str, vocab: dict, del_cost=1, ins_cost=1, sub_cost=1, index: SymmetricDeleteIndex = None):
     """
     Description:
         Returns a dictionary of candidate words and their probabilities.
@@ -55,11 +46,16 @@ def noisy_channel_model(word: str, vocab: dict, del_cost=1, ins_cost=1, sub_cost
         del_cost (int): The cost of deleting a character.
         ins_cost (int): The cost of inserting a character.
         sub_cost (int): The cost of substituting a character.
+        index (SymmetricDeleteIndex): An index over vocab to look candidates
+            up in instead of generating every edit of the word.
 
     Returns:
         probs (dict): A dictionary of candidate words and their probabilities.
     """
-    candidates = generate_candidates(word)
+    if index is not None:
+        candidates = index.lookup(word)
+    else:
+        candidates = generate_candidates(word)
     probs = {}
     for candidate in candidates:
         if candidate in vocab:
@@ -67,6 +63,39 @@ def noisy_channel_model(word: str, vocab: dict, del_cost=1, ins_cost=1, sub_cost
             probs[candidate] = prob
     return probs
 
+def trie_channel_model(word: str, vocab: dict, trie: VocabularyTrie, max_cost=2, del_cost=1, ins_cost=1, sub_cost=1):
+    """
+    Description:
+        Returns a dictionary of candidate words and their probabilities,
+        finding the candidates and their edit costs in one bounded search of
+        a vocabulary trie instead of generating and testing edits. The
+        candidates are the words within edit distance max_cost, scored as
+        channel_model scores them: words more than one character longer or
+        shorter are dropped, and with weighted costs every candidate is
+        scored by channel_model itself.
+
+    Parameters:
+        word (str): The word to find candidates for.
+        vocab (dict): A dictionary of words and their probabilities.
+        trie (VocabularyTrie): A trie over the words of vocab.
+        max_cost (int): The maximum edit distance of a candidate.
+        del_cost (int): The cost of deleting a character.
+        ins_cost (int): The cost of inserting a character.
+        sub_cost (int): The cost of substituting a character.
+
+    Returns:
+        probs (dict): A dictionary of candidate words and their probabilities.
+    """
+    costs = trie.search(word, max_cost, max_length_difference=1)
+    probs = {}
+    for candidate, cost in costs.items():
+        if del_cost == ins_cost == sub_cost == 1:
+            # The unit-cost trie cost is the edit distance channel_model uses.
+            probs[candidate] = math.exp(-cost) * vocab[candidate]
+        else:
+            probs[candidate] = channel_model(word, candidate, del_cost, ins_cost, sub_cost) * vocab[candidate]
+    return probs
+
 def generate_candidates(word: str):
     """
     Description:
@@ -86,10 +115,119 @@ def generate_candidates(word: str):
     inserts = {a + c + b for a, b in splits for c in alphabet}
     return deletes | transposes | replaces | inserts
 
+@functools.lru_cache(maxsize=1024)
+def _match_masks(word: str):
+    """
+    Description:
+        Returns the bit mask of the positions of every character of a word,
+        cached because the same misspelled word is matched against all of
+        its candidates.
+
+    Parameters:
+        word (str): The word to build the masks of.
+
+    Returns:
+        masks (dict): A dictionary of characters and their position masks.
+    """
+    masks = {}
+    for i, c in enumerate(word):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+def _bit_parallel_distance(x: str, y: str):
+    """
+    Description:
+        Returns the unit-cost Levenshtein distance between x and y using
+        Myers' bit-parallel algorithm (as formulated by Hyyrö), which
+        processes a whole column of the dynamic program per character of y.
+
+    Parameters:
+        x (str): The word whose characters form the bit vectors.
+        y (str): The word to scan.
+
+    Returns:
+        score (int): The edit distance.
+    """
+    if not x:
+        return len(y)
+    masks = _match_masks(x)
+    all_ones = (1 << len(x)) - 1
+    high = 1 << (len(x) - 1)
+    pv, mv, score = all_ones, 0, len(x)
+    for c in y:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & all_ones
+        mv = ph & xv
+    return score
+
+def _banded_distance(x: str, y: str, del_cost: int, ins_cost: int, sub_cost: int):
+    """
+    Description:
+        Returns the weighted edit distance of channel_model's dynamic program,
+        only filling the diagonal band of cells that can lie on a path no
+        more expensive than the straight diagonal one. Two rows are allocated
+        once and reused.
+
+    Parameters:
+        x (str): The shorter word.
+        y (str): The longer word, at most one character longer than x.
+        del_cost (int): The cost of deleting a character.
+        ins_cost (int): The cost of inserting a character.
+        sub_cost (int): The cost of substituting a character.
+
+    Returns:
+        (int): The edit distance.
+    """
+    n, m = len(x), len(y)
+    inf = float('inf')
+    # Each step off the diagonal costs at least `step`, and a path through
+    # offset k has to leave the diagonal |k| times and come back to the final
+    # offset m - n, so offsets that cannot beat the diagonal path are skipped.
+    upper = sum(sub_cost for c1, c2 in zip(x, y) if c1 != c2) + (m - n) * ins_cost
+    step = min(del_cost, ins_cost, 1)
+    if step > 0:
+        reach = upper / step + 1e-9
+        lo = -int((reach - (m - n)) // 2)
+        hi = int((reach + (m - n)) // 2)
+    else:
+        lo, hi = -n, m
+    prev_row = [inf] * (m + 2)
+    curr_row = [inf] * (m + 2)
+    for j in range(min(m, hi) + 1):
+        prev_row[j] = j
+    for i, c1 in enumerate(x, 1):
+        start = max(0, i + lo)
+        end = min(m, i + hi)
+        if start == 0:
+            curr_row[0] = i
+            start = 1
+        else:
+            curr_row[start - 1] = inf
+        for j in range(start, end + 1):
+            del_cost_ = prev_row[j] + del_cost
+            ins_cost_ = curr_row[j - 1] + ins_cost
+            sub_cost_ = prev_row[j - 1] + sub_cost * (c1 != y[j - 1])
+            curr_row[j] = min(del_cost_, ins_cost_, sub_cost_)
+        curr_row[end + 1] = inf
+        prev_row, curr_row = curr_row, prev_row
+    return prev_row[m]
+
 def channel_model(x: str, y: str, del_cost: int, ins_cost: int, sub_cost: int):
     """
     Description:
-        Returns the probability of transforming x into y.
+        Returns the probability of transforming x into y. Unit costs use the
+        bit-parallel edit distance and weighted costs a banded dynamic
+        program; both give the same distance as the full dynamic program.
 
     Parameters:
         x (str): The word to transform.
@@ -103,20 +241,227 @@ def channel_model(x: str, y: str, del_cost: int, ins_cost: int, sub_cost: int):
     """
     if x == y:
         return 1
+    if abs(len(x) - len(y)) > 1:
+        return 0
+    if del_cost == ins_cost == sub_cost == 1:
+        # The distance is symmetric, so x stays the bit vector side and its
+        # masks are reused across all the candidates it is scored against.
+        return math.exp(-_bit_parallel_distance(x, y))
     if len(x) > len(y):
         x, y = y, x
-    if len(y) - len(x) > 1:
-        return 0
-    prev_row = list(range(len(y) + 1))
-    for i, c1 in enumerate(x):
-        curr_row = [i + 1]
-        for j, c2 in enumerate(y):
-            del_cost_ = prev_row[j + 1] + del_cost
-            ins_cost_ = curr_row[j] + ins_cost
-            sub_cost_ = prev_row[j] + sub_cost * (c1 != c2)
-            curr_row.append(min(del_cost_, ins_cost_, sub_cost_))
-        prev_row = curr_row
-    return math.exp(-prev_row[-1])
+    return math.exp(-_banded_distance(x, y, del_cost, ins_cost, sub_cost))
+
+class CorrectionCache:
+    """
+    Description:
+        A bounded least-recently-used cache of corrections, since the same
+        misspellings keep coming back in query logs.
+
+    Attributes:
+        maxsize (int): The maximum number of corrections kept.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that were not cached.
+    """
+    def __init__(self, maxsize: int = CORRECTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, word: str):
+        """
+        Description:
+            Returns the cached correction of a word, marking it recently used.
+
+        Parameters:
+            word (str): The word to look up.
+
+        Returns:
+            (str): The correction, or None if it is not cached.
+        """
+        correction = self._entries.get(word)
+        if correction is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(word)
+        self.hits += 1
+        return correction
+
+    def put(self, word: str, correction: str):
+        """
+        Description:
+            Caches the correction of a word, evicting the least recently used
+            correction if the cache is full.
+
+        Parameters:
+            word (str): The word.
+            correction (str): Its correction.
+
+        Returns:
+            None
+        """
+        self._entries[word] = correction
+        self._entries.move_to_end(word)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+def correct(word: str, vocab: dict, index: SymmetricDeleteIndex = None, trie: VocabularyTrie = None, max_cost=2):
+    """
+    Description:
+        Returns the most probable correction of a word, or the word itself
+        if none of its candidates is in the vocabulary.
+
+    Parameters:
+        word (str): The word to correct.
+        vocab (dict): A dictionary of words and their probabilities.
+        index (SymmetricDeleteIndex): An index to look candidates up in.
+        trie (VocabularyTrie): A trie to search candidates in, used instead of index.
+        max_cost (int): The maximum edit cost of a trie candidate.
+
+    Returns:
+        (str): The correction.
+    """
+    if trie is not None:
+        candidates = trie_channel_model(word, vocab, trie, max_cost)
+    else:
+        candidates = noisy_channel_model(word, vocab, index=index)
+    if not candidates:
+        return word
+    return max(candidates, key=candidates.get)
+
+# The model used by pool workers. It is handed over once per worker by the
+# pool initializer, which on fork-based platforms shares the parent's memory
+# instead of pickling it.
+_worker_model = None
+
+def _init_worker(vocab: dict, index: SymmetricDeleteIndex, trie: VocabularyTrie, max_cost):
+    global _worker_model
+    _worker_model = (vocab, index, trie, max_cost)
+
+def _correct_in_worker(word: str):
+    return correct(word, *_worker_model)
+
+def create_pool(workers: int, vocab: dict, index: SymmetricDeleteIndex = None, trie: VocabularyTrie = None, max_cost=2):
+    """
+    Description:
+        Returns a process pool whose workers hold the loaded model.
+
+    Parameters:
+        workers (int): The number of worker processes.
+        vocab (dict): A dictionary of words and their probabilities.
+        index (SymmetricDeleteIndex): An index to look candidates up in.
+        trie (VocabularyTrie): A trie to search candidates in.
+        max_cost (int): The maximum edit cost of a trie candidate.
+
+    Returns:
+        (multiprocessing.pool.Pool): The process pool.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    return context.Pool(workers, initializer=_init_worker, initargs=(vocab, index, trie, max_cost))
+
+def correct_many(words: Iterable[str], vocab: dict, index: SymmetricDeleteIndex = None, trie: VocabularyTrie = None, max_cost=2, cache: CorrectionCache = None, pool=None):
+    """
+    Description:
+        Returns the corrections of many words. Every distinct word is only
+        corrected once, words already in the cache are not corrected at all,
+        and large batches are spread across a process pool.
+
+    Parameters:
+        words (Iterable[str]): The words to correct.
+        vocab (dict): A dictionary of words and their probabilities.
+        index (SymmetricDeleteIndex): An index to look candidates up in.
+        trie (VocabularyTrie): A trie to search candidates in.
+        max_cost (int): The maximum edit cost of a trie candidate.
+        cache (CorrectionCache): The cache of previous corrections.
+        pool (multiprocessing.pool.Pool): A pool from create_pool, used when
+            there are at least POOL_MIN_WORDS words left to correct.
+
+    Returns:
+        (List[str]): The correction of every word, in order.
+    """
+    words = list(words)
+    corrections = {}
+    missing = []
+    for word in dict.fromkeys(words):
+        cached = cache.get(word) if cache is not None else None
+        if cached is None:
+            missing.append(word)
+        else:
+            corrections[word] = cached
+
+    if pool is not None and len(missing) >= POOL_MIN_WORDS:
+        results = pool.imap(_correct_in_worker, missing, POOL_CHUNK_SIZE)
+    else:
+        results = (correct(word, vocab, index, trie, max_cost) for word in missing)
+
+    for word, correction in zip(missing, results):
+        corrections[word] = correction
+        if cache is not None:
+            cache.put(word, correction)
+
+    return [corrections[word] for word in words]
+
+def _match_case(word: str, correction: str):
+    """
+    Description:
+        Returns the correction with the capitalization of the original word.
+
+    Parameters:
+        word (str): The original word.
+        correction (str): The lower case correction.
+
+    Returns:
+        (str): The correction with matching case.
+    """
+    if word.isupper() and len(word) > 1:
+        return correction.upper()
+    if word[0].isupper():
+        return correction.capitalize()
+    return correction
+
+def correct_stream(lines: Iterable[str], vocab: dict, index: SymmetricDeleteIndex = None, trie: VocabularyTrie = None, max_cost=2, cache: CorrectionCache = None, pool=None, batch_lines=STREAM_BATCH_LINES) -> Iterator[str]:
+    """
+    Description:
+        Corrects every word of a document, yielding corrected lines as soon
+        as each batch of lines is done so whole documents never need to be
+        held in memory. Everything but the words is left untouched.
+
+    Parameters:
+        lines (Iterable[str]): The lines of the document.
+        vocab (dict): A dictionary of words and their probabilities.
+        index (SymmetricDeleteIndex): An index to look candidates up in.
+        trie (VocabularyTrie): A trie to search candidates in.
+        max_cost (int): The maximum edit cost of a trie candidate.
+        cache (CorrectionCache): The cache of previous corrections.
+        pool (multiprocessing.pool.Pool): A pool from create_pool.
+        batch_lines (int): The number of lines corrected together.
+
+    Returns:
+        (Iterator[str]): The corrected lines.
+    """
+    if cache is None:
+        cache = CorrectionCache()
+
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_lines:
+            yield from _correct_lines(batch, vocab, index, trie, max_cost, cache, pool)
+            batch = []
+    if batch:
+        yield from _correct_lines(batch, vocab, index, trie, max_cost, cache, pool)
+
+def _correct_lines(lines: List[str], vocab: dict, index, trie, max_cost, cache: CorrectionCache, pool):
+    words = [match.group().lower() for line in lines for match in WORD_REGEX.finditer(line)]
+    corrections = iter(correct_many(words, vocab, index, trie, max_cost, cache, pool))
+    for line in lines:
+        yield WORD_REGEX.sub(lambda match: _match_case(match.group(), next(corrections)), line)
 
 def main():
     """
@@ -132,19 +477,50 @@ def main():
     parser = argparse.ArgumentParser(description='Noisy Channel Model Spell Checker')
     parser.add_argument('--correct', nargs='+', help='list of misspelled words to correct')
     parser.add_argument('--proba', nargs='+', help='list of words to calculate probabilities for')
+    parser.add_argument('--model', default=MODEL_FILE_NAME, help='the prebuilt language model file')
+    parser.add_argument('--corpus', help='the corpus file or directory to rebuild the language model from; defaults to the one it was built from')
+    parser.add_argument('--distance', type=int, help='look candidates up to this edit distance in a vocabulary index')
+    parser.add_argument('--search', choices=['symspell', 'trie'], default='symspell', help='the vocabulary index used with --distance')
+    parser.add_argument('--file', help='a document (or - for standard input) to correct line by line')
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes correcting large batches')
     args = parser.parse_args()
 
+    try:
+        word_probs = load_word_probs(args.model, args.corpus)
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    index = None
+    trie = None
+    if (args.correct or args.file) and args.distance is not None:
+        if args.search == 'trie':
+            trie = VocabularyTrie(word_probs)
+        else:
+            index = SymmetricDeleteIndex(word_probs, args.distance)
+
     if args.correct:
         words = []
         for arg in args.correct:
             for word in arg.strip('[]').split(','):
                 if word.isalpha():
                     words.append(word.strip(string.punctuation))
-        for word in words:
-            candidates = noisy_channel_model(word, word_probs)
-            best_word = max(candidates, key=candidates.get)
+        for word, best_word in zip(words, correct_many(words, word_probs, index, trie, args.distance)):
             print(f"{word} -> {best_word}")
 
+    if args.file:
+        pool = create_pool(args.workers, word_probs, index, trie, args.distance) if args.workers > 1 else None
+        file = sys.stdin if args.file == '-' else open(args.file, 'r')
+        try:
+            for line in correct_stream(file, word_probs, index, trie, args.distance, pool=pool):
+                sys.stdout.write(line)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+            if pool is not None:
+                pool.close()
+                pool.join()
+
     if args.proba:
         words = []
         for arg in args.proba:
@@ -0,0 +1,290 @@
+import functools
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
+
+NORMALIZATION_CACHE_VERSION = 1
+
+# The default number of surface forms whose normalized form is kept. Word
+# frequencies follow Zipf's law, so a cache far smaller than the vocabulary
+# answers most lookups.
+NORMALIZATION_CACHE_SIZE = 1 << 18
+
+class TermNormalizer:
+    """
+    Description:
+        Normalizes words (stemming, lemmatization or both) and memoizes the
+        result of every surface form in a bounded least-recently-used cache,
+        since the same few words make up most of any corpus. The cache can
+        be saved to disk and loaded by a later run.
+
+    Attributes:
+        key (str): Names the normalization, so a saved cache is only loaded
+            by the same normalization.
+        maxsize (int): The maximum number of surface forms kept.
+        hits (int): The number of words answered from the cache.
+        misses (int): The number of words that were normalized.
+    """
+    def __init__(self, normalize: Callable[[str], str], key: str, maxsize: int = NORMALIZATION_CACHE_SIZE):
+        self.key = key
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._normalize = normalize
+        self._entries = OrderedDict()
+        self._fresh = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __call__(self, word: str):
+        """
+        Description:
+            Returns the normalized form of a word, from the cache if it has
+            been seen before.
+
+        Parameters:
+            word (str): The word.
+
+        Returns:
+            (str): The normalized form.
+        """
+        result = self._entries.get(word)
+        if result is not None:
+            self._entries.move_to_end(word)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = self._normalize(word)
+        self._entries[word] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        if self._fresh is not None:
+            self._fresh[word] = result
+        return result
+
+    def normalize_all(self, words: Iterable[str]) -> Iterator[str]:
+        """
+        Description:
+            Normalizes words lazily.
+
+        Parameters:
+            words (Iterable[str]): The words.
+
+        Returns:
+            (Iterator[str]): The normalized forms.
+        """
+        return map(self, words)
+
+    def hit_rate(self):
+        """
+        Description:
+            Returns the fraction of the words answered from the cache.
+
+        Parameters:
+            None
+
+        Returns:
+            (float): The hit rate, 0 if no word was normalized yet.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """
+        Description:
+            Returns the statistics of the cache.
+
+        Parameters:
+            None
+
+        Returns:
+            (dict): The size, capacity, hits, misses and hit rate.
+        """
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate()}
+
+    def track_fresh(self):
+        """
+        Description:
+            Starts recording the words normalized from now on, so a worker
+            process can hand them back to be merged into another cache.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self._fresh = {}
+
+    def take_fresh(self):
+        """
+        Description:
+            Returns the words normalized since the last call and forgets them.
+
+        Parameters:
+            None
+
+        Returns:
+            (Dict[str, str]): The normalized form of every new word.
+        """
+        fresh = self._fresh or {}
+        if self._fresh is not None:
+            self._fresh = {}
+        return fresh
+
+    def update(self, entries: dict):
+        """
+        Description:
+            Adds normalized forms computed elsewhere to the cache, without
+            counting them as hits or misses.
+
+        Parameters:
+            entries (Dict[str, str]): The normalized form of every word.
+
+        Returns:
+            None
+        """
+        for word, result in entries.items():
+            self._entries[word] = result
+            self._entries.move_to_end(word)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self, cache_file: str):
+        """
+        Description:
+            Writes the cache to a file, least recently used first, replacing
+            the file at once so an interrupted run never leaves half a cache.
+
+        Parameters:
+            cache_file (str): The path of the cache file.
+
+        Returns:
+            None
+        """
+        temp_file = cache_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump({"version": NORMALIZATION_CACHE_VERSION, "key": self.key, "entries": list(self._entries.items())}, file)
+        os.replace(temp_file, cache_file)
+
+    def load(self, cache_file: str):
+        """
+        Description:
+            Adds the entries of a saved cache, if the file exists and was
+            saved by the same normalization.
+
+        Parameters:
+            cache_file (str): The path of the cache file.
+
+        Returns:
+            (int): The number of entries loaded.
+        """
+        if not os.path.isfile(cache_file):
+            return 0
+
+        with open(cache_file, "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("version") != NORMALIZATION_CACHE_VERSION or saved.get("key") != self.key:
+            return 0
+
+        self.update(dict(saved["entries"]))
+        return min(len(saved["entries"]), self.maxsize)
+
+def porter_normalizer(maxsize: int = NORMALIZATION_CACHE_SIZE):
+    """
+    Description:
+        Returns a cached Porter stemmer.
+
+    Parameters:
+        maxsize (int): The maximum number of surface forms kept.
+
+    Returns:
+        (TermNormalizer): The normalizer.
+    """
+    import nltk.stem
+
+    return TermNormalizer(nltk.stem.PorterStemmer().stem, "porter", maxsize)
+
+def lemma_stem_normalizer(maxsize: int = NORMALIZATION_CACHE_SIZE):
+    """
+    Description:
+        Returns a cached normalizer that lower-cases a word, lemmatizes it
+        with WordNet and stems the lemma with the Porter stemmer.
+
+    Parameters:
+        maxsize (int): The maximum number of surface forms kept.
+
+    Returns:
+        (TermNormalizer): The normalizer.
+    """
+    import nltk.stem
+
+    stemmer = nltk.stem.PorterStemmer()
+    lemmatizer = nltk.stem.WordNetLemmatizer()
+    return TermNormalizer(lambda word: stemmer.stem(lemmatizer.lemmatize(word.lower())), "wordnet+porter", maxsize)
+
+@functools.lru_cache(maxsize=1)
+def stop_words():
+    """
+    Description:
+        Returns the English stopwords, loaded once per process.
+
+    Parameters:
+        None
+
+    Returns:
+        (FrozenSet[str]): The stopwords.
+    """
+    import nltk.corpus
+
+    return frozenset(nltk.corpus.stopwords.words("english"))
+
+@functools.lru_cache(maxsize=1)
+def index_stemmer():
+    """
+    Description:
+        Returns the cached Porter stemmer of the process, shared by indexing
+        and querying so both map a word to the same term.
+
+    Parameters:
+        None
+
+    Returns:
+        (TermNormalizer): The stemmer.
+    """
+    return porter_normalizer()
+
+def index_terms(tokens: Iterable[str]) -> Iterator[str]:
+    """
+    Description:
+        Turns lower-cased tokens into index terms: stopwords are dropped and
+        the rest are Porter stemmed.
+
+    Parameters:
+        tokens (Iterable[str]): The lower-cased tokens.
+
+    Returns:
+        (Iterator[str]): The terms.
+    """
+    stopwords = stop_words()
+    stemmer = index_stemmer()
+    return (stemmer(token) for token in tokens if token not in stopwords)
+
+def index_term(word: str):
+    """
+    Description:
+        Turns one query word into its index term, the way index_terms() does.
+
+    Parameters:
+        word (str): The word.
+
+    Returns:
+        (str): The term, or None if the word is a stopword.
+    """
+    word = word.lower()
+    if word in stop_words():
+        return None
+    return index_stemmer()(word)
@@ -1,13 +1,23 @@
 import argparse
+import heapq
+import time
+import numpy as np
+import edge_list
+from page_rank_csr import build_transition_matrix, index_nodes, page_rank_csr
+from page_rank_incremental import apply_edge_delta, page_rank_adaptive, read_edge_delta, warm_start
+from page_rank_blocked import blocked_graph_dir, load_node_ids, page_rank_blocked, partition_graph
+from page_rank_local import out_links, personalized_page_rank
+from page_rank_parallel import page_rank_parallel
+from rank_store import load_ranks, rank_store_dir, save_ranks, top_k
 
 DATA_SET = "data/web-Stanford.txt"
 
-def load_data():
+def load_data(path: str = DATA_SET):
      """
      Description:
           Load the data set.
      Parameters:
-          None
+          path (str): the path of the data set.
      Returns:
           graph: the graph of nodes.
           outbound: the number of outbound links for each node.
@@ -15,28 +25,56 @@ def load_data():
      graph = {}
      outbound = {}
 
-     with open(DATA_SET, "r") as f:
-          for line in f.readlines():
-               if line.startswith("#"):
-                    continue
+     for from_node, to_node in read_node_pairs(path):
+          if to_node not in graph:
+               graph[to_node] = []
 
-               nodes = line.strip().split()
-               from_node = nodes[0]
-               to_node = nodes[1]
+          if from_node not in graph:
+               graph[from_node] = []
 
-               if to_node not in graph:
-                    graph[to_node] = []
+          if from_node not in outbound:
+               outbound[from_node] = 0
 
-               if from_node not in graph:
-                    graph[from_node] = []
+          graph[to_node].append(from_node)
+          outbound[from_node] += 1
 
-               if from_node not in outbound:
-                    outbound[from_node] = 0
+     return graph, outbound
 
-               graph[to_node].append(from_node)
-               outbound[from_node] += 1
+def read_node_pairs(path: str):
+     """
+     Description:
+          Read the (from_node, to_node) string pairs of a text data set, or of a binary edge file written by the crawler.
+     Parameters:
+          path (str): the path of the data set.
+     Returns:
+          pairs: an iterator of (from_node, to_node) pairs.
+     """
+     if edge_list.is_binary_edge_file(path):
+          for edges in edge_list.iter_edge_chunks(path):
+               for from_node, to_node in edges.tolist():
+                    yield str(from_node), str(to_node)
+          return
 
-     return graph, outbound
+     with open(path, "r") as f:
+          for line in f:
+               if line.startswith("#"):
+                    continue
+
+               nodes = line.strip().split()
+               yield nodes[0], nodes[1]
+
+def load_edges(path: str = DATA_SET, use_cache: bool = True):
+     """
+     Description:
+          Load the data set as arrays of edges, from its binary cache when the data set has not changed.
+     Parameters:
+          path (str): the path of the data set, a text edge list or a binary edge file written by the crawler.
+          use_cache (bool): whether to use the binary graph cache.
+     Returns:
+          sources: the from_node of every edge.
+          targets: the to_node of every edge.
+     """
+     return edge_list.load_edges(path, use_cache=use_cache)
 
 def page_rank(prev: dict, curr: dict, graph: dict, outbound: dict, lambda_: float, num_nodes: int):
      """
@@ -69,38 +107,280 @@ def page_rank(prev: dict, curr: dict, graph: dict, outbound: dict, lambda_: floa
 
      return curr
 
-def page_rank_handler(graph: dict, outbound: dict, maxiteration: int, lambda_: float, thr: float, nodes: list):
+def page_rank_dict(graph: dict, outbound: dict, maxiteration: int, lambda_: float, thr: float, verbose: bool = True):
      """
      Description:
-          Handle the PageRank algorithm.
+          Run the PageRank iterations over the dict graph until the ranks converge.
      Parameters:
           graph (dict): the graph of nodes.
           outbound (dict): the number of outbound links for each node.
           maxiteration (int): the maximum number of iterations to stop if algorithm has not converged.
           lambda_ (float): the λ parameter value.
           thr (float): the threshold value.
-          nodes (list): the list of nodes to be printed.
+          verbose (bool): whether to print every iteration.
      Returns:
-          None
+          curr (dict): the PageRank values.
+          iterations (int): the number of iterations run.
+          times (list): the time taken by every iteration, in seconds.
      """
      num_nodes = len(graph)
-     nodes = set(nodes)
      prev = {node: 1 / num_nodes for node in graph}
      curr = {node: 1 / num_nodes for node in graph}
+     times = []
 
      for i in range(maxiteration):
-          print("Iteration: ", i)
+          if verbose:
+               print("Iteration: ", i)
+          start = time.perf_counter()
           curr = page_rank(prev, curr, graph, outbound, lambda_, num_nodes)
+          done = all(abs(curr[node] - prev[node]) < thr for node in graph)
+          times.append(time.perf_counter() - start)
+
+          if done:
+               if verbose:
+                    print("Converged at iteration: ", i)
+               return curr, i + 1, times
+
+          prev, curr = curr, prev
+
+     return prev, maxiteration, times
+
+def page_rank_handler(graph: dict, outbound: dict, maxiteration: int, lambda_: float, thr: float, nodes: list, top: int = None):
+     """
+     Description:
+          Handle the PageRank algorithm.
+     Parameters:
+          graph (dict): the graph of nodes.
+          outbound (dict): the number of outbound links for each node.
+          maxiteration (int): the maximum number of iterations to stop if algorithm has not converged.
+          lambda_ (float): the λ parameter value.
+          thr (float): the threshold value.
+          nodes (list): the list of nodes to be printed.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     curr, iterations, times = page_rank_dict(graph, outbound, maxiteration, lambda_, thr)
+     if times:
+          print("Time per iteration: ", sum(times) / len(times))
+
+     if top is None:
+          print_ranks(sorted(curr.items(), key=lambda x: x[1], reverse=True), nodes)
+     else:
+          page_rank_sorted = heapq.nlargest(top, curr.items(), key=lambda x: x[1])
+          print_ranks(page_rank_sorted, nodes)
+          shown = set(node for node, rank in page_rank_sorted)
+          for node in nodes:
+               if str(node) not in shown:
+                    print_node_rank(node, curr.get(str(node)))
+
+     return
+
+def csr_page_rank_handler(sources: np.ndarray, targets: np.ndarray, maxiteration: int, lambda_: float, thr: float, nodes: list, norm: str = "linf", workers: int = 1, store_dir: str = None, top: int = None):
+     """
+     Description:
+          Handle the PageRank algorithm with the CSR engine, on several worker processes if workers is more than 1.
+     Parameters:
+          sources (np.ndarray): the from_node of every edge.
+          targets (np.ndarray): the to_node of every edge.
+          maxiteration (int): the maximum number of iterations to stop if algorithm has not converged.
+          lambda_ (float): the λ parameter value.
+          thr (float): the threshold value.
+          nodes (list): the list of nodes to be printed.
+          norm (str): the convergence norm, "linf" or "l1".
+          workers (int): the number of worker processes.
+          store_dir (str): the directory the ranks are saved to, if any.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     node_ids, sources, targets = index_nodes(sources, targets)
+     matrix = build_transition_matrix(sources, targets, len(node_ids))
+     if workers > 1:
+          ranks, iterations, times = page_rank_parallel(matrix, lambda_, maxiteration, thr, workers, norm)
+     else:
+          ranks, iterations, times = page_rank_csr(matrix, lambda_, maxiteration, thr, norm)
+
+     if times:
+          print("Time per iteration: ", sum(times) / len(times))
+     if store_dir:
+          save_ranks(store_dir, node_ids, ranks, {"iterations": iterations, "lambda_": lambda_, "thr": thr})
+
+     print_top_ranks(node_ids, ranks, nodes, top)
+
+     return
+
+def blocked_page_rank_handler(path: str, maxiteration: int, lambda_: float, thr: float, nodes: list, norm: str = "linf", budget: int = 256, store_dir: str = None, top: int = None):
+     """
+     Description:
+          Handle the PageRank algorithm out of core: the data set is sorted into destination blocks on disk, and only the rank vectors are kept in memory.
+     Parameters:
+          path (str): the path of the data set.
+          maxiteration (int): the maximum number of iterations to stop if algorithm has not converged.
+          lambda_ (float): the λ parameter value.
+          thr (float): the threshold value.
+          nodes (list): the list of nodes to be printed.
+          norm (str): the convergence norm, "linf" or "l1".
+          budget (int): the memory budget in megabytes.
+          store_dir (str): the directory the ranks are saved to, if any.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     memory_budget = budget << 20
+     graph_dir = blocked_graph_dir(path)
+     manifest = partition_graph(path, graph_dir, memory_budget)
+     print("Blocks: ", len(manifest["blocks"]))
+
+     ranks, iterations, times = page_rank_blocked(graph_dir, lambda_, maxiteration, thr, norm, memory_budget)
+     if times:
+          print("Time per iteration: ", sum(times) / len(times))
+
+     node_ids = load_node_ids(graph_dir)
+     if store_dir:
+          save_ranks(store_dir, node_ids, ranks, {"iterations": iterations, "lambda_": lambda_, "thr": thr})
+
+     print_top_ranks(node_ids, ranks, nodes, top)
+
+     return
+
+def incremental_page_rank_handler(sources: np.ndarray, targets: np.ndarray, delta_file: str, maxiteration: int, lambda_: float, thr: float, nodes: list, norm: str = "linf", store_dir: str = None, adaptive: bool = False, compare: bool = False, top: int = None):
+     """
+     Description:
+          Handle the PageRank algorithm after an update of the graph: the edge delta is applied to the data set and the iterations start from the ranks saved by the previous run instead of from 1 / N.
+     Parameters:
+          sources (np.ndarray): the from_node of every edge.
+          targets (np.ndarray): the to_node of every edge.
+          delta_file (str): the edge delta file.
+          maxiteration (int): the maximum number of iterations to stop if algorithm has not converged.
+          lambda_ (float): the λ parameter value.
+          thr (float): the threshold value.
+          nodes (list): the list of nodes to be printed.
+          norm (str): the convergence norm, "linf" or "l1".
+          store_dir (str): the directory the previous ranks are loaded from and the new ranks are saved to.
+          adaptive (bool): whether to stop recomputing nodes that have settled.
+          compare (bool): whether to also run from 1 / N to count the iterations saved.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     added, removed = read_edge_delta(delta_file)
+     print("Edges added: ", len(added), "\t", "Edges removed: ", len(removed))
+     sources, targets = apply_edge_delta(sources, targets, added, removed)
+
+     node_ids, sources, targets = index_nodes(sources, targets)
+     matrix = build_transition_matrix(sources, targets, len(node_ids))
+
+     try:
+          old_node_ids, old_ranks, info = load_ranks(store_dir)
+          initial, reused = warm_start(node_ids, old_node_ids, old_ranks)
+          print("Warm start: ", reused, "of", len(node_ids), "nodes reuse their previous rank")
+     except (FileNotFoundError, ValueError) as e:
+          print("No previous ranks, starting from 1 / N: ", e)
+          initial, info = None, {}
+
+     engine = page_rank_adaptive if adaptive else page_rank_csr
+     ranks, iterations, times = engine(matrix, lambda_, maxiteration, thr, norm, initial)
+     print("Iterations: ", iterations, "\t", "Time: ", sum(times))
+
+     if compare:
+          _, cold_iterations, cold_times = page_rank_csr(matrix, lambda_, maxiteration, thr, norm, verbose=False)
+          print("Iterations from 1 / N: ", cold_iterations, "\t", "Time: ", sum(cold_times))
+          print("Iterations saved: ", cold_iterations - iterations)
+     elif "iterations" in info:
+          print("Iterations of the previous run: ", info["iterations"], "\t", "Iterations saved: ", info["iterations"] - iterations)
+
+     if store_dir:
+          save_ranks(store_dir, node_ids, ranks, {"iterations": iterations, "lambda_": lambda_, "thr": thr, "delta": delta_file})
+
+     print_top_ranks(node_ids, ranks, nodes, top)
+
+     return
+
+def personalized_page_rank_handler(sources: np.ndarray, targets: np.ndarray, lambda_: float, nodes: list, tolerance: float, top: int = None):
+     """
+     Description:
+          Handle the personalized PageRank algorithm, which ranks the nodes relative to the given nodes instead of the whole graph, touching only their neighborhood.
+     Parameters:
+          sources (np.ndarray): the from_node of every edge.
+          targets (np.ndarray): the to_node of every edge.
+          lambda_ (float): the λ parameter value.
+          nodes (list): the seed nodes.
+          tolerance (float): the error tolerance of the approximation.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     node_ids, sources, targets = index_nodes(sources, targets)
+     links = out_links(build_transition_matrix(sources, targets, len(node_ids)))
+
+     positions = np.searchsorted(node_ids, nodes)
+     seeds = [int(position) for position, node in zip(positions, nodes) if position < len(node_ids) and node_ids[position] == node]
+     if not seeds:
+          print("Error: none of the nodes are in the graph")
+          return
+
+     ranks, pushes, edges = personalized_page_rank(links, seeds, lambda_, tolerance)
+     print("Pushes: ", pushes, "\t", "Edges: ", edges, "\t", "Nodes reached: ", len(ranks))
 
-          if all(abs(curr[node] - prev[node]) < thr for node in graph):
-               print("Converged at iteration: ", i)
-               break
+     reached = np.fromiter(ranks, dtype=np.int64, count=len(ranks))
+     print_top_ranks(node_ids[reached], np.fromiter(ranks.values(), dtype=np.float64, count=len(ranks)), nodes, top)
 
-          prev = curr
+     return
+
+def print_top_ranks(node_ids: np.ndarray, ranks: np.ndarray, nodes: list, top: int = None):
+     """
+     Description:
+          Print the highest ranked nodes, selected with a partial sort, followed by the rank of every listed node that is not among them.
+     Parameters:
+          node_ids (np.ndarray): the node ID of every rank.
+          ranks (np.ndarray): the PageRank values.
+          nodes (list): the list of nodes to be printed.
+          top (int): the number of highest ranked nodes to print, or None for all of them.
+     Returns:
+          None
+     """
+     order = top_k(ranks, len(ranks) if top is None else top)
+     print_ranks(zip(node_ids[order].tolist(), ranks[order].tolist()), nodes)
+
+     shown = set(node_ids[order].tolist())
+     for node in nodes:
+          if node not in shown:
+               position = np.flatnonzero(node_ids == node)
+               print_node_rank(node, ranks[position[0]].item() if len(position) else None)
+
+     return
 
-     page_rank_sorted = sorted(curr.items(), key=lambda x: x[1], reverse=True)
+def print_node_rank(node, rank):
+     """
+     Description:
+          Print the PageRank of one listed node.
+     Parameters:
+          node: the node ID.
+          rank (float): the PageRank of the node, or None if it is not in the graph.
+     Returns:
+          None
+     """
+     if rank is None:
+          print("NodeID: ", node, "\t", "(not in the graph)")
+     else:
+          print("NodeID: ", node, "\t", "PageRank: ", rank)
+
+     return
+
+def print_ranks(page_rank_sorted, nodes: list):
+     """
+     Description:
+          Print the PageRank of every node, highest first.
+     Parameters:
+          page_rank_sorted (iterable): the (node, rank) pairs, sorted by rank.
+          nodes (list): the list of nodes to be printed.
+     Returns:
+          None
+     """
+     nodes = set(str(node) for node in nodes)
      for node, rank in page_rank_sorted:
-          if node in nodes:
+          if str(node) in nodes:
                print("NodeID: ", node, "\t", "PageRank: ", rank)
           else:
                print("NodeID: ", node, "\t", "PageRank: ", rank, " (not in the list of nodes to be printed)")
@@ -117,11 +397,27 @@ def arg_handler():
           args: the arguments.
      """
      parser = argparse.ArgumentParser()
+     parser.add_argument("--data", default=DATA_SET, help="the data set: a text edge list, or a binary edge file written by the crawler.")
      parser.add_argument("--maxiteration", type=int, default=100, help="the maximum number of iterations to stop if algorithm has not converged.")
      parser.add_argument("--lambda_", type=float, default=0.85, help="the λ parameter value.")
      parser.add_argument("--thr", type=float, default=0.0001, help="the threshold value to stop if algorithm has converged.")
      parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 3, 4, 5], help="the NodeIDs that we want to get their PageRank values at the end of iterations.") 
+     parser.add_argument("--top", type=int, default=20, help="the number of highest ranked nodes to print; the listed --nodes are always printed.")
+     parser.add_argument("--all", dest="top", action="store_const", const=None, help="print every node, highest ranked first.")
+     parser.add_argument("--engine", choices=["dict", "csr", "blocked"], default="csr", help="the PageRank implementation: Python dicts, sparse matrix-vector products, or out-of-core destination blocks.")
+     parser.add_argument("--norm", choices=["linf", "l1"], default="linf", help="the norm of the change between iterations compared to the threshold (csr engine).")
+     parser.add_argument("--workers", type=int, default=1, help="the number of processes running the csr engine.")
+     parser.add_argument("--budget", type=int, default=256, help="the memory budget of the blocked engine, in megabytes.")
+     parser.add_argument("--personalized", action="store_true", help="rank the nodes relative to the --nodes instead of the whole graph.")
+     parser.add_argument("--tolerance", type=float, default=1e-6, help="the error tolerance of the personalized PageRank.")
+     parser.add_argument("--incremental", metavar="DELTA", help="apply an edge delta file of +/- from_node to_node lines and start from the saved ranks.")
+     parser.add_argument("--adaptive", action="store_true", help="in incremental mode, stop recomputing nodes whose rank has settled.")
+     parser.add_argument("--compare", action="store_true", help="in incremental mode, also run from 1 / N to report the iterations saved.")
+     parser.add_argument("--ranks", help="the directory the final ranks are saved to and loaded from (default: next to the data set).")
+     parser.add_argument("--no-cache", dest="cache", action="store_false", help="parse the data set without reading or writing its binary graph cache.")
      args = parser.parse_args()
+     if args.ranks is None:
+          args.ranks = rank_store_dir(args.data)
 
      return args
 
@@ -136,13 +432,26 @@ def main():
      """
      args = arg_handler()
 
+     print("data: ", args.data)
      print("maxiteration: ", args.maxiteration)
      print("lambda_: ", args.lambda_)
      print("thr: ", args.thr)
      print("nodes: ", args.nodes)
 
-     graph, outbound = load_data()
-     page_rank_handler(graph, outbound, args.maxiteration, args.lambda_, args.thr, args.nodes)
+     if args.incremental:
+          sources, targets = load_edges(args.data, args.cache)
+          incremental_page_rank_handler(sources, targets, args.incremental, args.maxiteration, args.lambda_, args.thr, args.nodes, args.norm, args.ranks, args.adaptive, args.compare, args.top)
+     elif args.personalized:
+          sources, targets = load_edges(args.data, args.cache)
+          personalized_page_rank_handler(sources, targets, args.lambda_, args.nodes, args.tolerance, args.top)
+     elif args.engine == "dict":
+          graph, outbound = load_data(args.data)
+          page_rank_handler(graph, outbound, args.maxiteration, args.lambda_, args.thr, args.nodes, args.top)
+     elif args.engine == "blocked":
+          blocked_page_rank_handler(args.data, args.maxiteration, args.lambda_, args.thr, args.nodes, args.norm, args.budget, args.ranks, args.top)
+     else:
+          sources, targets = load_edges(args.data, args.cache)
+          csr_page_rank_handler(sources, targets, args.maxiteration, args.lambda_, args.thr, args.nodes, args.norm, args.workers, args.ranks, args.top)
 
      return
 
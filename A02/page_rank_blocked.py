@@ -0,0 +1,263 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from edge_list import EDGE_CHUNK_BYTES, file_fingerprint, iter_edge_chunks
+from page_rank_csr import converged
+
+BLOCKED_GRAPH_VERSION = 1
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+# Bytes of memory an edge needs while a block is processed: its source and
+# destination read from the block file, and the float64 temporaries of the
+# rank it contributes.
+BYTES_PER_EDGE = 32
+
+# Bytes of memory a node needs for the resident vectors: the previous and
+# current ranks, the reciprocal of its outbound links and the rank it shares
+# along each of them.
+BYTES_PER_NODE = 32
+
+def blocked_graph_dir(path: str):
+    """
+    Description:
+        Returns the directory holding the destination blocks of an edge list.
+
+    Parameters:
+        path (str): The path of the edge list.
+
+    Returns:
+        (str): The path of the directory.
+    """
+    return os.path.splitext(path)[0] + ".blocks"
+
+def _chunk_bytes(memory_budget: int):
+    """
+    Description:
+        Returns how much of the text edge list to parse at a time, so the
+        parsed chunk and its temporaries stay well within the budget.
+
+    Parameters:
+        memory_budget (int): The memory budget in bytes.
+
+    Returns:
+        (int): The chunk size in bytes.
+    """
+    return max(1 << 16, min(EDGE_CHUNK_BYTES, memory_budget // 8))
+
+def _block_bounds(inbound: np.ndarray, block_edges: int):
+    """
+    Description:
+        Splits the nodes into contiguous destination ranges of about
+        block_edges in-links each. A block ends with the node that crosses
+        a multiple of block_edges, so it may hold one node's in-links more.
+
+    Parameters:
+        inbound (np.ndarray): The number of in-links of every node.
+        block_edges (int): The maximum number of edges of a block.
+
+    Returns:
+        (List[int]): The boundaries of the blocks, from 0 to the number of nodes.
+    """
+    edges_before = np.cumsum(inbound) - inbound
+    blocks = edges_before // block_edges
+    bounds = [0] + (np.flatnonzero(np.diff(blocks)) + 1).tolist() + [len(inbound)]
+
+    return bounds
+
+def partition_graph(path: str, graph_dir: str = None, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+    """
+    Description:
+        Sorts a text edge list into destination blocks on disk: block b holds
+        every edge whose destination falls in its range of nodes, as int32
+        (source, destination) pairs of dense node IDs. The text is read three
+        times, chunk by chunk, so memory use is bounded by the budget and the
+        number of nodes, never by the number of edges:
+            1. collect the node IDs,
+            2. count the in-links and out-links of every node,
+            3. append every edge to the file of its block.
+        The blocks are reused while the edge list keeps its size and
+        modification time.
+
+    Parameters:
+        path (str): The path of the edge list.
+        graph_dir (str): The directory of the blocks. Defaults to blocked_graph_dir(path).
+        memory_budget (int): The memory budget in bytes.
+
+    Returns:
+        (dict): The manifest of the blocked graph.
+    """
+    if graph_dir is None:
+        graph_dir = blocked_graph_dir(path)
+    fingerprint = file_fingerprint(path).tolist()
+
+    manifest = read_manifest(graph_dir)
+    if manifest is not None and manifest["fingerprint"] == fingerprint and manifest["memory_budget"] == memory_budget:
+        return manifest
+
+    chunk_bytes = _chunk_bytes(memory_budget)
+
+    node_ids = np.empty(0, dtype=np.int64)
+    for edges in iter_edge_chunks(path, chunk_bytes):
+        node_ids = np.union1d(node_ids, edges)
+    num_nodes = len(node_ids)
+    if num_nodes * BYTES_PER_NODE > memory_budget:
+        raise ValueError(f"the rank vectors of {num_nodes} nodes need {num_nodes * BYTES_PER_NODE} bytes, more than the memory budget of {memory_budget}")
+
+    outbound = np.zeros(num_nodes, dtype=np.int64)
+    inbound = np.zeros(num_nodes, dtype=np.int64)
+    for edges in iter_edge_chunks(path, chunk_bytes):
+        dense = np.searchsorted(node_ids, edges)
+        outbound += np.bincount(dense[:, 0], minlength=num_nodes)
+        inbound += np.bincount(dense[:, 1], minlength=num_nodes)
+
+    block_edges = max(1, (memory_budget - num_nodes * BYTES_PER_NODE) // BYTES_PER_EDGE)
+    bounds = _block_bounds(inbound, block_edges)
+    starts = np.array(bounds[:-1], dtype=np.int64)
+
+    if os.path.isdir(graph_dir):
+        shutil.rmtree(graph_dir)
+    os.makedirs(graph_dir)
+    block_files = [f"block-{block:05d}.edges" for block in range(len(starts))]
+
+    for edges in iter_edge_chunks(path, chunk_bytes):
+        dense = np.searchsorted(node_ids, edges).astype(np.int32)
+        blocks = np.searchsorted(starts, dense[:, 1], side="right") - 1
+        order = np.argsort(blocks, kind="stable")
+        dense = dense[order]
+        cuts = np.searchsorted(blocks[order], np.arange(len(starts) + 1))
+        for block in np.flatnonzero(np.diff(cuts)).tolist():
+            with open(os.path.join(graph_dir, block_files[block]), "ab") as file:
+                file.write(dense[cuts[block]:cuts[block + 1]].tobytes())
+
+    np.save(os.path.join(graph_dir, "nodes.npy"), node_ids)
+    np.save(os.path.join(graph_dir, "outbound.npy"), outbound)
+
+    manifest = {
+        "version": BLOCKED_GRAPH_VERSION,
+        "source": os.path.normpath(path),
+        "fingerprint": fingerprint,
+        "memory_budget": memory_budget,
+        "num_nodes": num_nodes,
+        "num_edges": int(outbound.sum()),
+        "bounds": bounds,
+        "blocks": block_files,
+    }
+    temp_file = os.path.join(graph_dir, "manifest.json.tmp")
+    with open(temp_file, "w") as file:
+        json.dump(manifest, file)
+    os.replace(temp_file, os.path.join(graph_dir, "manifest.json"))
+
+    return manifest
+
+def read_manifest(graph_dir: str):
+    """
+    Description:
+        Reads the manifest of a blocked graph.
+
+    Parameters:
+        graph_dir (str): The directory of the blocks.
+
+    Returns:
+        (dict): The manifest, or None if it is missing or out of date.
+    """
+    try:
+        with open(os.path.join(graph_dir, "manifest.json"), "r") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, PermissionError, ValueError):
+        return None
+
+    if manifest.get("version") != BLOCKED_GRAPH_VERSION:
+        return None
+
+    return manifest
+
+def page_rank_blocked(graph_dir: str, lambda_: float, maxiteration: int, thr: float, norm: str = "linf", memory_budget: int = DEFAULT_MEMORY_BUDGET, verbose: bool = True):
+    """
+    Description:
+        Runs the same power iteration as page_rank_csr over a graph that was
+        sorted into destination blocks by partition_graph. Only the rank
+        vectors stay in memory; every iteration streams the memory-mapped
+        blocks from disk one at a time, reading each in slices that fit the
+        memory budget, and accumulates the ranks flowing into the block's
+        destination range.
+
+    Parameters:
+        graph_dir (str): The directory of the blocks.
+        lambda_ (float): The λ parameter value.
+        maxiteration (int): The maximum number of iterations.
+        thr (float): The threshold value.
+        norm (str): The convergence norm, "linf" or "l1".
+        memory_budget (int): The memory budget in bytes.
+        verbose (bool): Whether to print every iteration.
+
+    Returns:
+        ranks (np.ndarray): The PageRank values.
+        iterations (int): The number of iterations run.
+        times (List[float]): The time taken by every iteration, in seconds.
+    """
+    manifest = read_manifest(graph_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"{graph_dir} does not hold a blocked graph")
+
+    num_nodes = manifest["num_nodes"]
+    bounds = manifest["bounds"]
+    outbound = np.load(os.path.join(graph_dir, "outbound.npy"))
+    with np.errstate(divide="ignore"):
+        inverse_outbound = np.where(outbound > 0, 1.0 / outbound, 0.0)
+    del outbound
+
+    slice_edges = max(1, (memory_budget - num_nodes * BYTES_PER_NODE) // BYTES_PER_EDGE)
+    teleport = lambda_ / num_nodes
+    prev = np.full(num_nodes, 1 / num_nodes)
+    curr = np.empty(num_nodes)
+    times = []
+
+    for i in range(maxiteration):
+        if verbose:
+            print("Iteration: ", i)
+        start = time.perf_counter()
+        # Rank leaving every node along each of its links.
+        share = prev * inverse_outbound
+
+        for block, block_file in enumerate(manifest["blocks"]):
+            lo, hi = bounds[block], bounds[block + 1]
+            incoming = np.zeros(hi - lo)
+            block_path = os.path.join(graph_dir, block_file)
+            if os.path.exists(block_path) and os.path.getsize(block_path):
+                edges = np.memmap(block_path, dtype=np.int32, mode="r").reshape(-1, 2)
+                for first in range(0, len(edges), slice_edges):
+                    part = np.array(edges[first:first + slice_edges])
+                    incoming += np.bincount(part[:, 1] - lo, weights=share[part[:, 0]], minlength=hi - lo)
+                del edges
+
+            np.multiply(incoming, 1 - lambda_, out=curr[lo:hi])
+            curr[lo:hi] += teleport
+
+        done = converged(prev, curr, thr, norm)
+        times.append(time.perf_counter() - start)
+
+        if done:
+            if verbose:
+                print("Converged at iteration: ", i)
+            return curr, i + 1, times
+
+        prev, curr = curr, prev
+
+    return prev, maxiteration, times
+
+def load_node_ids(graph_dir: str):
+    """
+    Description:
+        Returns the original ID of every dense node of a blocked graph.
+
+    Parameters:
+        graph_dir (str): The directory of the blocks.
+
+    Returns:
+        (np.ndarray): The node IDs.
+    """
+    return np.load(os.path.join(graph_dir, "nodes.npy"), mmap_mode="r")
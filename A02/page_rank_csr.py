@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+def index_nodes(sources: np.ndarray, targets: np.ndarray):
+    """
+    Description:
+        Maps the node IDs of an edge list to dense integers 0..n-1, in
+        increasing order of node ID.
+
+    Parameters:
+        sources (np.ndarray): The source node ID of every edge.
+        targets (np.ndarray): The target node ID of every edge.
+
+    Returns:
+        node_ids (np.ndarray): The original ID of every dense node.
+        sources (np.ndarray): The dense source of every edge (int32).
+        targets (np.ndarray): The dense target of every edge (int32).
+    """
+    node_ids, inverse = np.unique(np.concatenate((sources, targets)), return_inverse=True)
+    inverse = inverse.astype(np.int32)
+
+    return node_ids, inverse[:len(sources)], inverse[len(sources):]
+
+def build_transition_matrix(sources: np.ndarray, targets: np.ndarray, num_nodes: int):
+    """
+    Description:
+        Builds the CSR transition matrix M of a graph, where M[v, u] is
+        1 / outbound(u) for every edge u -> v, so the rank flowing into
+        every node is one sparse matrix-vector product M @ rank.
+
+    Parameters:
+        sources (np.ndarray): The dense source of every edge.
+        targets (np.ndarray): The dense target of every edge.
+        num_nodes (int): The number of nodes.
+
+    Returns:
+        (scipy.sparse.csr_matrix): The transition matrix.
+    """
+    outbound = np.bincount(sources, minlength=num_nodes)
+    weights = 1.0 / outbound[sources]
+    matrix = scipy.sparse.csr_matrix((weights, (targets, sources)), shape=(num_nodes, num_nodes))
+
+    return matrix
+
+def converged(prev: np.ndarray, curr: np.ndarray, thr: float, norm: str = "linf"):
+    """
+    Description:
+        Checks whether two rank vectors are within the threshold of each
+        other. The L∞ norm matches the dict engine, which requires every
+        node to change by less than thr.
+
+    Parameters:
+        prev (np.ndarray): The previous PageRank values.
+        curr (np.ndarray): The current PageRank values.
+        thr (float): The threshold value.
+        norm (str): "linf" or "l1".
+
+    Returns:
+        (bool): True if the ranks have converged.
+    """
+    difference = np.abs(curr - prev)
+    if norm == "l1":
+        return difference.sum() < thr
+
+    return difference.max(initial=0.0) < thr
+
+def page_rank_csr(matrix: scipy.sparse.csr_matrix, lambda_: float, maxiteration: int, thr: float, norm: str = "linf", initial: np.ndarray = None, verbose: bool = True, personalization: np.ndarray = None):
+    """
+    Description:
+        Runs the PageRank power iteration with the same formula as the dict
+        engine: rank(v) = λ / N + (1 - λ) * Σ rank(u) / outbound(u) over the
+        edges u -> v, where every iteration is one sparse matrix-vector product.
+        With a personalization vector the random surfer teleports to the
+        nodes it weights instead of to every node, which gives personalized
+        PageRank: λ * personalization(v) replaces λ / N.
+
+    Parameters:
+        matrix (scipy.sparse.csr_matrix): The transition matrix.
+        lambda_ (float): The λ parameter value.
+        maxiteration (int): The maximum number of iterations.
+        thr (float): The threshold value.
+        norm (str): The convergence norm, "linf" or "l1".
+        initial (np.ndarray): The starting ranks. Default is 1 / N everywhere.
+        verbose (bool): Whether to print every iteration.
+        personalization (np.ndarray): The teleport distribution, summing to 1.
+            Default is uniform.
+
+    Returns:
+        curr (np.ndarray): The PageRank values.
+        iterations (int): The number of iterations run.
+        times (List[float]): The time taken by every iteration, in seconds.
+    """
+    num_nodes = matrix.shape[0]
+    teleport = lambda_ / num_nodes if personalization is None else lambda_ * personalization
+    prev = np.full(num_nodes, 1 / num_nodes) if initial is None else initial.astype(np.float64, copy=True)
+    curr = np.empty(num_nodes)
+    times = []
+
+    for i in range(maxiteration):
+        if verbose:
+            print("Iteration: ", i)
+        start = time.perf_counter()
+        np.multiply(matrix @ prev, 1 - lambda_, out=curr)
+        curr += teleport
+        done = converged(prev, curr, thr, norm)
+        times.append(time.perf_counter() - start)
+
+        if done:
+            if verbose:
+                print("Converged at iteration: ", i)
+            return curr, i + 1, times
+
+        prev, curr = curr, prev
+
+    return prev, maxiteration, times
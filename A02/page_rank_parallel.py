@@ -0,0 +1,306 @@
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+import scipy.sparse
+
+from edge_list import load_edges
+from page_rank_csr import build_transition_matrix, index_nodes, page_rank_csr
+
+DATA_SET = "data/web-Stanford.txt"
+
+def _context():
+    """
+    Description:
+        Returns the multiprocessing context of the workers. Fork starts the
+        workers without re-importing this module.
+
+    Returns:
+        (multiprocessing.context.BaseContext): The context.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+class SharedArrays:
+    """
+    Description:
+        A set of NumPy arrays backed by multiprocessing.shared_memory blocks,
+        so worker processes read and write them in place instead of having
+        them pickled. The owner creates the blocks and unlinks them on close;
+        workers attach to them by name with the spec.
+
+    Attributes:
+        arrays (Dict[str, np.ndarray]): The shared arrays by name.
+        spec (Dict[str, Tuple[str, tuple, str]]): The block name, shape and
+            dtype of every array, enough to attach to it from another process.
+    """
+    def __init__(self, spec: Dict[str, Tuple[str, tuple, str]], blocks: Dict[str, shared_memory.SharedMemory], owner: bool):
+        self.spec = spec
+        self._blocks = blocks
+        self._owner = owner
+        self.arrays = {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[name].buf) for name, (_, shape, dtype) in spec.items()}
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]):
+        """
+        Description:
+            Copies arrays into new shared memory blocks.
+
+        Parameters:
+            arrays (Dict[str, np.ndarray]): The arrays to share.
+
+        Returns:
+            (SharedArrays): The shared copies.
+        """
+        spec = {}
+        blocks = {}
+        try:
+            for name, array in arrays.items():
+                blocks[name] = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                spec[name] = (blocks[name].name, array.shape, array.dtype.str)
+        except BaseException:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+
+        shared = cls(spec, blocks, owner=True)
+        for name, array in arrays.items():
+            shared.arrays[name][...] = array
+
+        return shared
+
+    @classmethod
+    def attach(cls, spec: Dict[str, Tuple[str, tuple, str]]):
+        """
+        Description:
+            Attaches to arrays shared by another process.
+
+        Parameters:
+            spec (Dict[str, Tuple[str, tuple, str]]): The spec of the arrays.
+
+        Returns:
+            (SharedArrays): The shared arrays.
+        """
+        blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in spec.items()}
+        return cls(spec, blocks, owner=False)
+
+    def close(self):
+        """
+        Description:
+            Releases the arrays, and frees the blocks if this is the owner.
+
+        Returns:
+            None
+        """
+        self.arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            if self._owner:
+                block.unlink()
+
+        return
+
+def partition_rows(indptr: np.ndarray, parts: int):
+    """
+    Description:
+        Splits the rows (destination nodes) of a CSR matrix into contiguous
+        ranges with about the same number of edges each, since the work of a
+        row is its number of in-links.
+
+    Parameters:
+        indptr (np.ndarray): The row pointers of the matrix.
+        parts (int): The number of ranges.
+
+    Returns:
+        (np.ndarray): The parts + 1 boundaries of the ranges.
+    """
+    num_rows = len(indptr) - 1
+    bounds = np.searchsorted(indptr, np.linspace(0, indptr[-1], parts + 1), side="left")
+    bounds = np.clip(bounds, 0, num_rows)
+    bounds[0] = 0
+    bounds[-1] = num_rows
+
+    return np.maximum.accumulate(bounds)
+
+def _worker(spec: dict, worker: int, lo: int, hi: int, lambda_: float, barrier, norm: str):
+    """
+    Description:
+        Computes the new ranks of the destination nodes lo..hi every
+        iteration. The ranks alternate between two shared buffers, so
+        nothing is copied between iterations. After each iteration the
+        worker records its share of the change, waits for the others, and
+        waits again while the coordinator decides whether to stop.
+
+    Parameters:
+        spec (dict): The spec of the shared arrays.
+        worker (int): The index of the worker.
+        lo (int): The first destination node of the worker.
+        hi (int): One past the last destination node of the worker.
+        lambda_ (float): The λ parameter value.
+        barrier (multiprocessing.Barrier): The barrier shared with the coordinator.
+        norm (str): The convergence norm, "linf" or "l1".
+
+    Returns:
+        None
+    """
+    shared = SharedArrays.attach(spec)
+    try:
+        arrays = shared.arrays
+        indptr = arrays["indptr"]
+        start, end = int(indptr[lo]), int(indptr[hi])
+        num_nodes = len(indptr) - 1
+        # The worker's rows share the indices and data of the shared matrix;
+        # only the rebased row pointers are copied.
+        rows = scipy.sparse.csr_matrix((arrays["data"][start:end], arrays["indices"][start:end], indptr[lo:hi + 1] - start), shape=(hi - lo, num_nodes), copy=False)
+        teleport = lambda_ / num_nodes
+        ranks = arrays["ranks"]
+        changes = arrays["changes"]
+        control = arrays["control"]
+
+        i = 0
+        while True:
+            prev = ranks[i % 2]
+            curr = ranks[(i + 1) % 2][lo:hi]
+            np.multiply(rows @ prev, 1 - lambda_, out=curr)
+            curr += teleport
+
+            difference = np.abs(curr - prev[lo:hi])
+            changes[worker] = difference.sum() if norm == "l1" else difference.max(initial=0.0)
+
+            barrier.wait()
+            barrier.wait()
+            if control[0]:
+                break
+            i += 1
+
+    finally:
+        shared.close()
+
+    return
+
+def page_rank_parallel(matrix: scipy.sparse.csr_matrix, lambda_: float, maxiteration: int, thr: float, workers: int, norm: str = "linf", verbose: bool = True):
+    """
+    Description:
+        Runs the same power iteration as page_rank_csr on several cores. The
+        transition matrix and both rank vectors are placed in shared memory,
+        and every worker process owns a range of destination nodes, the rows
+        of the matrix it updates. Two barriers per iteration separate the
+        workers' updates from the convergence check.
+
+    Parameters:
+        matrix (scipy.sparse.csr_matrix): The transition matrix.
+        lambda_ (float): The λ parameter value.
+        maxiteration (int): The maximum number of iterations.
+        thr (float): The threshold value.
+        workers (int): The number of worker processes.
+        norm (str): The convergence norm, "linf" or "l1".
+        verbose (bool): Whether to print every iteration.
+
+    Returns:
+        ranks (np.ndarray): The PageRank values.
+        iterations (int): The number of iterations run.
+        times (List[float]): The time taken by every iteration, in seconds.
+    """
+    num_nodes = matrix.shape[0]
+    if maxiteration < 1:
+        return np.full(num_nodes, 1 / num_nodes), 0, []
+
+    ranks = np.empty((2, num_nodes))
+    ranks[0] = 1 / num_nodes
+    bounds = partition_rows(matrix.indptr, workers)
+    shared = SharedArrays.create({
+        "indptr": matrix.indptr,
+        "indices": matrix.indices,
+        "data": matrix.data,
+        "ranks": ranks,
+        "changes": np.zeros(workers),
+        "control": np.zeros(1, dtype=np.int64),
+    })
+
+    context = _context()
+    barrier = context.Barrier(workers + 1)
+    processes = [
+        context.Process(target=_worker, args=(shared.spec, worker, int(bounds[worker]), int(bounds[worker + 1]), lambda_, barrier, norm), daemon=True)
+        for worker in range(workers)
+    ]
+    times = []
+    try:
+        for process in processes:
+            process.start()
+
+        changes = shared.arrays["changes"]
+        control = shared.arrays["control"]
+        for i in range(maxiteration):
+            if verbose:
+                print("Iteration: ", i)
+            start = time.perf_counter()
+            barrier.wait()
+            change = changes.sum() if norm == "l1" else changes.max()
+            times.append(time.perf_counter() - start)
+
+            done = change < thr
+            control[0] = done or i == maxiteration - 1
+            barrier.wait()
+            if done and verbose:
+                print("Converged at iteration: ", i)
+            if control[0]:
+                break
+
+        result = shared.arrays["ranks"][(i + 1) % 2].copy()
+
+    except BaseException:
+        barrier.abort()
+        raise
+
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        shared.close()
+
+    return result, i + 1, times
+
+def main():
+    """
+    Description:
+        Main function of the program. Runs a fixed number of iterations with
+        the single core CSR engine and with the parallel engine on each
+        number of workers, and prints the time per iteration and speedup.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Parallel PageRank Speedup")
+    parser.add_argument("--data", default=DATA_SET, help="the edge list to rank.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, multiprocessing.cpu_count()], help="the numbers of worker processes to time.")
+    parser.add_argument("--iterations", type=int, default=20, help="the number of iterations timed for each engine.")
+    parser.add_argument("--lambda_", type=float, default=0.85, help="the λ parameter value.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    node_ids, sources, targets = index_nodes(*load_edges(args.data))
+    matrix = build_transition_matrix(sources, targets, len(node_ids))
+    print(f"{len(node_ids)} nodes, {matrix.nnz} edges, loaded in {time.perf_counter() - start:.2f}s, {multiprocessing.cpu_count()} cores")
+
+    # A threshold of 0 runs every iteration, so each engine does the same work.
+    baseline, _, times = page_rank_csr(matrix, args.lambda_, args.iterations, 0.0, verbose=False)
+    single = np.median(times)
+    print(f"{'engine':<12} {'ms/iteration':>14} {'speedup':>10} {'max diff':>10}")
+    print(f"{'csr':<12} {single * 1000:>14.2f} {1.0:>10.2f} {0.0:>10.1e}")
+
+    for workers in sorted(set(args.workers)):
+        ranks, _, times = page_rank_parallel(matrix, args.lambda_, args.iterations, 0.0, workers, verbose=False)
+        per_iteration = np.median(times)
+        print(f"{'parallel-' + str(workers):<12} {per_iteration * 1000:>14.2f} {single / per_iteration:>10.2f} {np.abs(ranks - baseline).max():>10.1e}")
+
+if __name__ == "__main__":
+    main()
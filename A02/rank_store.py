@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+from edge_list import load_url_table, url_table_file
+
+RANK_STORE_VERSION = 2
+
+# Node IDs are mapped to their position with a direct lookup array while it
+# is at most this many times larger than the number of nodes, and with a
+# binary search over the sorted IDs otherwise.
+MAX_ID_SPREAD = 4
+
+def top_k(ranks: np.ndarray, k: int):
+    """
+    Description:
+        Returns the positions of the k highest ranks, highest first, with a
+        partial sort instead of sorting every rank. Ties keep their order.
+
+    Parameters:
+        ranks (np.ndarray): The PageRank values.
+        k (int): The number of positions.
+
+    Returns:
+        (np.ndarray): The positions.
+    """
+    k = max(0, min(k, len(ranks)))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if k == len(ranks):
+        return np.argsort(-ranks, kind="stable")
+
+    top = np.argpartition(-ranks, k - 1)[:k]
+    return top[np.lexsort((top, -ranks[top]))]
+
+def rank_store_dir(path: str):
+    """
+    Description:
+        Returns the directory holding the ranks computed from an edge list.
+
+    Parameters:
+        path (str): The path of the edge list.
+
+    Returns:
+        (str): The path of the directory.
+    """
+    return os.path.splitext(path)[0] + ".ranks"
+
+def save_ranks(store_dir: str, node_ids: np.ndarray, ranks: np.ndarray, info: dict = None):
+    """
+    Description:
+        Writes a rank vector with the node ID of every entry, replacing any
+        ranks already in the directory. The arrays are plain .npy files so
+        they can be memory-mapped. The positions of the nodes in decreasing
+        order of rank are saved too, so the top k is a prefix, and small
+        integer IDs get a direct ID to position table.
+
+    Parameters:
+        store_dir (str): The directory of the ranks.
+        node_ids (np.ndarray): The sorted node IDs.
+        ranks (np.ndarray): The rank of every node.
+        info (dict): Extra information saved with the ranks.
+
+    Returns:
+        None
+    """
+    temp_dir = store_dir + ".tmp"
+    if os.path.isdir(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    np.save(os.path.join(temp_dir, "nodes.npy"), np.asarray(node_ids))
+    ranks = np.asarray(ranks, dtype=np.float64)
+    np.save(os.path.join(temp_dir, "ranks.npy"), ranks)
+    np.save(os.path.join(temp_dir, "order.npy"), top_k(ranks, len(ranks)).astype(np.int64))
+
+    node_ids = np.asarray(node_ids)
+    if len(node_ids) and node_ids[0] >= 0 and node_ids[-1] < MAX_ID_SPREAD * len(node_ids):
+        positions = np.full(int(node_ids[-1]) + 1, -1, dtype=np.int64)
+        positions[node_ids] = np.arange(len(node_ids))
+        np.save(os.path.join(temp_dir, "positions.npy"), positions)
+    with open(os.path.join(temp_dir, "info.json"), "w") as file:
+        json.dump({"version": RANK_STORE_VERSION, "num_nodes": len(node_ids), **(info or {})}, file)
+
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(temp_dir, store_dir)
+
+    return
+
+def load_ranks(store_dir: str):
+    """
+    Description:
+        Loads a rank vector saved by save_ranks.
+
+    Parameters:
+        store_dir (str): The directory of the ranks.
+
+    Returns:
+        node_ids (np.ndarray): The sorted node IDs.
+        ranks (np.ndarray): The rank of every node.
+        info (dict): The information saved with the ranks.
+    """
+    with open(os.path.join(store_dir, "info.json"), "r") as file:
+        info = json.load(file)
+    if info.get("version") != RANK_STORE_VERSION:
+        raise ValueError(f"{store_dir} was saved by an unsupported version")
+
+    node_ids = np.load(os.path.join(store_dir, "nodes.npy"), mmap_mode="r")
+    ranks = np.load(os.path.join(store_dir, "ranks.npy"), mmap_mode="r")
+
+    return node_ids, ranks, info
+
+class RankStore:
+    """
+    Description:
+        A read-only view of saved ranks for jobs that need the rank of some
+        nodes or the top k without rerunning PageRank. Every array is
+        memory-mapped, so opening the store reads nothing but the info, a
+        lookup reads a few pages, and the top k reads the first k entries of
+        the rank order.
+
+    Attributes:
+        node_ids (np.ndarray): The sorted node IDs.
+        ranks (np.ndarray): The rank of every node.
+        order (np.ndarray): The positions of the nodes, highest rank first.
+        positions (np.ndarray): The position of every node ID, or -1, if the
+            IDs are small enough for a direct table; otherwise None.
+        info (dict): The information saved with the ranks.
+    """
+    def __init__(self, store_dir: str):
+        self.node_ids, self.ranks, self.info = load_ranks(store_dir)
+        self.order = np.load(os.path.join(store_dir, "order.npy"), mmap_mode="r")
+        positions_file = os.path.join(store_dir, "positions.npy")
+        self.positions = np.load(positions_file, mmap_mode="r") if os.path.exists(positions_file) else None
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def position(self, node_id: int):
+        """
+        Description:
+            Returns the position of a node in the rank vector.
+
+        Parameters:
+            node_id (int): The node ID.
+
+        Returns:
+            (int): The position, or -1 if the node is not in the store.
+        """
+        if self.positions is not None:
+            if 0 <= node_id < len(self.positions):
+                return int(self.positions[node_id])
+            return -1
+
+        position = int(np.searchsorted(self.node_ids, node_id))
+        if position < len(self.node_ids) and self.node_ids[position] == node_id:
+            return position
+        return -1
+
+    def rank(self, node_id: int):
+        """
+        Description:
+            Returns the rank of a node.
+
+        Parameters:
+            node_id (int): The node ID.
+
+        Returns:
+            (float): The rank, or None if the node is not in the store.
+        """
+        position = self.position(node_id)
+        return float(self.ranks[position]) if position >= 0 else None
+
+    def top(self, k: int):
+        """
+        Description:
+            Returns the k highest ranked nodes.
+
+        Parameters:
+            k (int): The number of nodes.
+
+        Returns:
+            (List[Tuple[int, float]]): The node IDs and ranks, highest first.
+        """
+        order = np.asarray(self.order[:k])
+        return list(zip(self.node_ids[order].tolist(), self.ranks[order].tolist()))
+
+def main():
+    """
+    Description:
+        Main function of the program. Prints the top k nodes and the ranks of
+        the given nodes from saved ranks.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="PageRank Lookup")
+    parser.add_argument("--ranks", default=rank_store_dir("data/web-Stanford.txt"), help="the directory of the saved ranks.")
+    parser.add_argument("--top", type=int, default=10, help="the number of highest ranked nodes to print.")
+    parser.add_argument("--nodes", type=int, nargs="*", default=[], help="the NodeIDs to look up.")
+    parser.add_argument("--urls", help="the ID to URL table of a crawl, to print the URL of every node (default: the .urls file next to the ranks, if any).")
+    args = parser.parse_args()
+
+    try:
+        store = RankStore(args.ranks)
+        # The ranks of crawler1.edges are in crawler1.ranks, next to crawler1.urls.
+        url_file = args.urls or url_table_file(args.ranks)
+        urls = load_url_table(url_file) if args.urls or os.path.isfile(url_file) else {}
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    for node, rank in store.top(args.top):
+        print("NodeID: ", node, "\t", "PageRank: ", rank, "\t", urls.get(node, ""))
+    for node in args.nodes:
+        rank = store.rank(node)
+        if rank is None:
+            print("NodeID: ", node, "\t", "(not in the graph)")
+        else:
+            print("NodeID: ", node, "\t", "PageRank: ", rank, "\t", urls.get(node, ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+import argparse
+import math
+import time
+from typing import Callable, List, Union
+
+import numpy as np
+
+from index_segments import SegmentedIndex, open_index
+from index_store import InvertedIndex
+from normalization import index_term
+
+# The number of documents returned by default.
+TOP_K = 10
+
+# Documents are scored in windows of document numbers. The first window is
+# small, so the score a document needs to enter the top k is known early;
+# every window after it is twice as large, up to the maximum.
+FIRST_WINDOW_DOCS = 1 << 12
+MAX_WINDOW_DOCS = 1 << 18
+
+# The blocks of a term that may hold candidates are decoded together when
+# they are at most this many blocks apart, rather than one call per block.
+BLOCK_GAP = 16
+
+# Queries whose terms have fewer postings than this in all are scored
+# exhaustively, which costs less than pruning them window by window.
+PRUNE_MIN_POSTINGS = 1 << 13
+
+# The relative slack given to score bounds, so rounding never prunes a
+# document whose exact score ties the threshold.
+BOUND_TOLERANCE = 1e-9
+
+class BM25:
+    """
+    Description:
+        Okapi BM25. A term's score in a document grows with its frequency
+        and shrinks with the document's length, so the largest frequency
+        and the shortest document of a block bound the score of any of its
+        postings, whatever the parameters.
+
+    Attributes:
+        k1 (float): How quickly the score saturates with the term frequency.
+        b (float): How strongly the score is normalized by document length.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def idf(self, document_frequency: int, num_docs: int):
+        return math.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def score(self, frequencies: np.ndarray, lengths: np.ndarray, idf: float, avg_length: float):
+        """
+        Description:
+            Returns the score of a term in documents.
+
+        Parameters:
+            frequencies (np.ndarray): The term frequency in every document, at least 1.
+            lengths (np.ndarray): The length of every document.
+            idf (float): The inverse document frequency of the term.
+            avg_length (float): The average document length.
+
+        Returns:
+            (np.ndarray): The scores.
+        """
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        return idf * frequencies * (self.k1 + 1) / (frequencies + self.k1 * (1 - self.b + self.b * np.asarray(lengths, dtype=np.float64) / avg_length))
+
+class TfIdf:
+    """
+    Description:
+        Logarithmic term frequency times inverse document frequency. The
+        score does not depend on the document's length, so the largest
+        frequency of a block bounds the score of any of its postings.
+    """
+    def idf(self, document_frequency: int, num_docs: int):
+        return max(0.0, math.log(num_docs / document_frequency))
+
+    def score(self, frequencies: np.ndarray, lengths: np.ndarray, idf: float, avg_length: float):
+        """
+        Description:
+            Returns the score of a term in documents.
+
+        Parameters:
+            frequencies (np.ndarray): The term frequency in every document, at least 1.
+            lengths (np.ndarray): The length of every document, unused.
+            idf (float): The inverse document frequency of the term.
+            avg_length (float): The average document length, unused.
+
+        Returns:
+            (np.ndarray): The scores.
+        """
+        return idf * (1 + np.log(np.asarray(frequencies, dtype=np.float64)))
+
+class QueryTerm:
+    """
+    Description:
+        The postings blocks of a query term in every file of an index,
+        numbered one after another, with the last document of every block
+        and the most any of its postings can score.
+
+    Attributes:
+        term (str): The term.
+        idf (float): The inverse document frequency of the term.
+        last_docs (np.ndarray): The last document number of every block.
+        bounds (np.ndarray): The highest score of every block.
+        upper_bound (float): The highest score of the term.
+    """
+    def __init__(self, term: str, files: List[InvertedIndex], bases: List[int], scorer, idf: float, avg_length: float):
+        self.term = term
+        self.idf = idf
+        self._parts = []
+        last_docs = []
+        bounds = []
+        starts = [0]
+        for file, base in zip(files, bases):
+            term_id = file.terms.term_id(term)
+            if term_id < 0:
+                continue
+            blocks = file.block_range(term_id)
+            self._parts.append((file, term_id, blocks.start, base))
+            last_docs.append(file.block_docs[blocks.start:blocks.stop].astype(np.int64) + base)
+            bounds.append(scorer.score(file.block_max_frequencies[blocks.start:blocks.stop], file.block_min_lengths[blocks.start:blocks.stop], idf, avg_length))
+            starts.append(starts[-1] + len(blocks))
+
+        self.last_docs = np.concatenate(last_docs) if last_docs else np.empty(0, dtype=np.int64)
+        self.bounds = np.concatenate(bounds) if bounds else np.empty(0, dtype=np.float64)
+        self.upper_bound = float(self.bounds.max()) if len(self.bounds) else 0.0
+        self._starts = starts
+
+    def __len__(self):
+        return len(self.last_docs)
+
+    def decode(self, start: int, stop: int):
+        """
+        Description:
+            Decodes consecutive blocks of the term.
+
+        Parameters:
+            start (int): The first block.
+            stop (int): The block after the last one.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        doc_numbers = []
+        frequencies = []
+        for part, (file, term_id, first, base) in enumerate(self._parts):
+            low, high = max(start, self._starts[part]), min(stop, self._starts[part + 1])
+            if low < high:
+                part_doc_numbers, part_frequencies = file.decode_blocks(term_id, first + low - self._starts[part], first + high - self._starts[part])
+                doc_numbers.append(part_doc_numbers + base)
+                frequencies.append(part_frequencies)
+
+        if not doc_numbers:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(doc_numbers), np.concatenate(frequencies)
+
+    def window(self, low: int, high: int):
+        """
+        Description:
+            Returns the postings of the term in a range of documents,
+            decoding only the blocks that overlap it.
+
+        Parameters:
+            low (int): The first document number.
+            high (int): The document number after the last one.
+
+        Returns:
+            doc_numbers (np.ndarray): The sorted document numbers.
+            frequencies (np.ndarray): Their term frequencies.
+        """
+        start = int(np.searchsorted(self.last_docs, low))
+        stop = min(int(np.searchsorted(self.last_docs, high)) + 1, len(self))
+        doc_numbers, frequencies = self.decode(start, stop)
+        inside = (doc_numbers >= low) & (doc_numbers < high)
+
+        return doc_numbers[inside], frequencies[inside]
+
+    def block_bounds(self, doc_numbers: np.ndarray):
+        """
+        Description:
+            Returns the most the term can score in documents: the bound of
+            the block that may hold each one.
+
+        Parameters:
+            doc_numbers (np.ndarray): The document numbers.
+
+        Returns:
+            (np.ndarray): The bounds, 0 past the last block.
+        """
+        return np.append(self.bounds, 0.0)[np.searchsorted(self.last_docs, doc_numbers)]
+
+    def frequencies(self, doc_numbers: np.ndarray):
+        """
+        Description:
+            Returns the frequency of the term in documents, using the last
+            document of every block as skip pointers so only the blocks that
+            may hold them are decoded.
+
+        Parameters:
+            doc_numbers (np.ndarray): The sorted document numbers.
+
+        Returns:
+            (np.ndarray): The term frequencies, 0 where the term is missing.
+        """
+        result = np.zeros(len(doc_numbers), dtype=np.int64)
+        blocks = np.unique(np.searchsorted(self.last_docs, doc_numbers))
+        blocks = blocks[blocks < len(self)]
+        if not len(blocks):
+            return result
+
+        decoded = [self.decode(int(run[0]), int(run[-1]) + 1) for run in np.split(blocks, np.flatnonzero(np.diff(blocks) > BLOCK_GAP) + 1)]
+        term_doc_numbers = np.concatenate([numbers for numbers, _ in decoded])
+        term_frequencies = np.concatenate([frequencies for _, frequencies in decoded])
+        positions = np.searchsorted(term_doc_numbers, doc_numbers)
+        found = positions < len(term_doc_numbers)
+        found[found] = term_doc_numbers[positions[found]] == doc_numbers[found]
+        result[found] = term_frequencies[positions[found]]
+
+        return result
+
+class Ranker:
+    """
+    Description:
+        Ranks the documents of an index for free text queries. search()
+        returns the top k without scoring every matching document, using
+        MaxScore dynamic pruning with block score bounds; search_exhaustive()
+        scores every match, and both return the same documents.
+
+    Attributes:
+        index (Union[InvertedIndex, SegmentedIndex]): The index.
+        scorer (Union[BM25, TfIdf]): The scoring function.
+        num_docs (int): The number of documents, not counting deleted ones.
+        avg_length (float): The average document length.
+        documents_scored (int): The number of documents fully scored so far.
+    """
+    def __init__(self, index: Union[InvertedIndex, SegmentedIndex], scorer=None):
+        if isinstance(index, InvertedIndex):
+            files, bases, live = [index], [0], None
+        else:
+            files, bases, live = index.segments, index.bases[:-1].tolist(), (~index.deleted if index.deleted.any() else None)
+        for file in files:
+            if file.doc_lengths is None:
+                raise ValueError(f"{file.path} has no document lengths; rebuild the index to rank it")
+
+        self.index = index
+        self.scorer = scorer or BM25()
+        self.documents_scored = 0
+        self._files = files
+        self._bases = bases
+        self._live = live
+        self._doc_lengths = np.concatenate([file.doc_lengths for file in files]).astype(np.float64) if files else np.empty(0)
+        live_lengths = self._doc_lengths if live is None else self._doc_lengths[live]
+        self.num_docs = len(live_lengths)
+        self.avg_length = float(live_lengths.mean()) if self.num_docs and live_lengths.any() else 1.0
+
+    def query_terms(self, query: str, normalize: Callable[[str], str] = index_term):
+        """
+        Description:
+            Returns the distinct indexed terms of a query, in order of
+            increasing score bound.
+
+        Parameters:
+            query (str): The query.
+            normalize (Callable[[str], str]): Maps a word to its index term, or None.
+
+        Returns:
+            (List[QueryTerm]): The terms.
+        """
+        terms = {}
+        for word in query.split():
+            term = normalize(word)
+            if not term or term in terms:
+                continue
+            document_frequency = self.index.document_frequency(term)
+            if document_frequency:
+                idf = self.scorer.idf(document_frequency, self.num_docs)
+                terms[term] = QueryTerm(term, self._files, self._bases, self.scorer, idf, self.avg_length)
+
+        return sorted(terms.values(), key=lambda term: (term.upper_bound, term.term))
+
+    def _score(self, terms: List[QueryTerm], doc_numbers: np.ndarray, frequencies: np.ndarray):
+        """
+        Description:
+            Returns the scores of documents, adding the terms up in order so
+            a document scores exactly the same however it was found.
+
+        Parameters:
+            terms (List[QueryTerm]): The terms.
+            doc_numbers (np.ndarray): The document numbers.
+            frequencies (np.ndarray): The frequency of every term (row) in every document (column).
+
+        Returns:
+            (np.ndarray): The scores.
+        """
+        lengths = self._doc_lengths[doc_numbers]
+        scores = np.zeros(len(doc_numbers), dtype=np.float64)
+        for term, row in zip(terms, frequencies):
+            present = row > 0
+            scores[present] += self.scorer.score(row[present], lengths[present], term.idf, self.avg_length)
+
+        return scores
+
+    def _live_documents(self, doc_numbers: np.ndarray):
+        return doc_numbers if self._live is None else doc_numbers[self._live[doc_numbers]]
+
+    @staticmethod
+    def _top(doc_numbers: np.ndarray, scores: np.ndarray, k: int):
+        """
+        Description:
+            Returns the k best documents, ties going to the lower document number.
+
+        Parameters:
+            doc_numbers (np.ndarray): The document numbers.
+            scores (np.ndarray): Their scores.
+            k (int): The number of documents kept.
+
+        Returns:
+            doc_numbers (np.ndarray): The best documents, best first.
+            scores (np.ndarray): Their scores.
+        """
+        order = np.lexsort((doc_numbers, -scores))[:k]
+        return doc_numbers[order], scores[order]
+
+    def search_exhaustive(self, query: str, k: int = TOP_K, normalize: Callable[[str], str] = index_term):
+        """
+        Description:
+            Returns the top k documents of a query, scoring every document
+            that holds a query term.
+
+        Parameters:
+            query (str): The query.
+            k (int): The number of documents returned.
+            normalize (Callable[[str], str]): Maps a word to its index term, or None.
+
+        Returns:
+            (List[Tuple[int, float]]): The document numbers and scores, best first.
+        """
+        terms = self.query_terms(query, normalize)
+        if not terms or k <= 0:
+            return []
+
+        return self._rank_exhaustive(terms, k)
+
+    def _rank_exhaustive(self, terms: List[QueryTerm], k: int):
+        """
+        Description:
+            Returns the top k documents of query terms, scoring every
+            document that holds one of them.
+
+        Parameters:
+            terms (List[QueryTerm]): The terms.
+            k (int): The number of documents returned.
+
+        Returns:
+            (List[Tuple[int, float]]): The document numbers and scores, best first.
+        """
+        postings = [term.decode(0, len(term)) for term in terms]
+        doc_numbers = self._live_documents(np.unique(np.concatenate([numbers for numbers, _ in postings])))
+        frequencies = np.zeros((len(terms), len(doc_numbers)), dtype=np.int64)
+        for row, (term_doc_numbers, term_frequencies) in zip(frequencies, postings):
+            positions = np.searchsorted(doc_numbers, term_doc_numbers)
+            found = positions < len(doc_numbers)
+            found[found] = doc_numbers[positions[found]] == term_doc_numbers[found]
+            row[positions[found]] = term_frequencies[found]
+
+        self.documents_scored += len(doc_numbers)
+        top_docs, top_scores = self._top(doc_numbers, self._score(terms, doc_numbers, frequencies), k)
+
+        return list(zip(top_docs.tolist(), top_scores.tolist()))
+
+    def search(self, query: str, k: int = TOP_K, normalize: Callable[[str], str] = index_term):
+        """
+        Description:
+            Returns the top k documents of a query with MaxScore pruning.
+            Queries of one term or few postings, where pruning cannot save
+            much, are scored exhaustively. Documents are taken a window at a
+            time. With the terms in order of increasing score bound, the
+            longest run of terms whose bounds add up to less than the k-th
+            best score so far is non-essential: a document holding only
+            those cannot enter the top k, so candidates come from the
+            essential terms alone. The rest of a candidate's score is
+            bounded by the blocks of the non-essential terms that may hold
+            it, and those terms are looked up, highest bound first, only for
+            the candidates that can still beat the threshold, decoding only
+            the blocks they fall in.
+
+        Parameters:
+            query (str): The query.
+            k (int): The number of documents returned.
+            normalize (Callable[[str], str]): Maps a word to its index term, or None.
+
+        Returns:
+            (List[Tuple[int, float]]): The document numbers and scores, best first.
+        """
+        terms = self.query_terms(query, normalize)
+        if not terms or k <= 0:
+            return []
+        if len(terms) == 1 or sum(self.index.document_frequency(term.term) for term in terms) < PRUNE_MIN_POSTINGS:
+            return self._rank_exhaustive(terms, k)
+
+        cumulative_bounds = np.cumsum([term.upper_bound for term in terms])
+        end = max(int(term.last_docs[-1]) for term in terms) + 1
+        top_docs = np.empty(0, dtype=np.int64)
+        top_scores = np.empty(0, dtype=np.float64)
+        threshold = -np.inf
+        low, window = 0, FIRST_WINDOW_DOCS
+        while low < end:
+            high = min(low + window, end)
+            window = min(window * 2, MAX_WINDOW_DOCS)
+            floor = threshold - BOUND_TOLERANCE * abs(threshold)
+            essential = int(np.searchsorted(cumulative_bounds, floor))
+            if essential == len(terms):
+                break
+
+            postings = [term.window(low, high) for term in terms[essential:]]
+            doc_numbers = self._live_documents(np.unique(np.concatenate([numbers for numbers, _ in postings])))
+            low = high
+            if not len(doc_numbers):
+                continue
+
+            frequencies = np.zeros((len(terms), len(doc_numbers)), dtype=np.int64)
+            for row, (term_doc_numbers, term_frequencies) in zip(frequencies[essential:], postings):
+                positions = np.searchsorted(doc_numbers, term_doc_numbers)
+                found = positions < len(doc_numbers)
+                found[found] = doc_numbers[positions[found]] == term_doc_numbers[found]
+                row[positions[found]] = term_frequencies[found]
+            partial = self._score(terms[essential:], doc_numbers, frequencies[essential:])
+
+            bounds = np.array([term.block_bounds(doc_numbers) for term in terms[:essential]]).reshape(essential, len(doc_numbers))
+            remaining = bounds.sum(axis=0)
+            alive = partial + remaining >= floor
+            for number in reversed(range(essential)):
+                if not alive.any():
+                    break
+                term = terms[number]
+                candidates = doc_numbers[alive]
+                row = term.frequencies(candidates)
+                frequencies[number, alive] = row
+                partial[alive] += self._score([term], candidates, row[np.newaxis])
+                remaining[alive] -= bounds[number, alive]
+                alive[alive] = partial[alive] + remaining[alive] >= floor
+
+            doc_numbers = doc_numbers[alive]
+            self.documents_scored += len(doc_numbers)
+            scores = self._score(terms, doc_numbers, frequencies[:, alive])
+            top_docs, top_scores = self._top(np.concatenate((top_docs, doc_numbers)), np.concatenate((top_scores, scores)), k)
+            if len(top_docs) == k:
+                threshold = float(top_scores[-1])
+
+        return list(zip(top_docs.tolist(), top_scores.tolist()))
+
+def main():
+    """
+    Description:
+        Main function of the program. Prints the top documents of every
+        query, their scores and the time taken.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Ranked Query")
+    parser.add_argument("--index", default="wikipedia.index", help="the inverted index file, or the directory of a segmented index.")
+    parser.add_argument("--top", type=int, default=TOP_K, help="the number of documents returned per query.")
+    parser.add_argument("--scorer", choices=["bm25", "tfidf"], default="bm25", help="the scoring function.")
+    parser.add_argument("--k1", type=float, default=1.2, help="the BM25 term frequency saturation.")
+    parser.add_argument("--b", type=float, default=0.75, help="the BM25 document length normalization.")
+    parser.add_argument("--exhaustive", action="store_true", help="score every matching document instead of pruning.")
+    parser.add_argument("queries", nargs="+", help="the queries, as free text.")
+    args = parser.parse_args()
+
+    try:
+        index = open_index(args.index)
+        ranker = Ranker(index, BM25(args.k1, args.b) if args.scorer == "bm25" else TfIdf())
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    search = ranker.search_exhaustive if args.exhaustive else ranker.search
+    for query in args.queries:
+        ranker.documents_scored = 0
+        start = time.perf_counter()
+        results = search(query, args.top)
+        elapsed = time.perf_counter() - start
+        print(f"{query}: {len(results)} documents in {elapsed * 1000:.3f} ms, {ranker.documents_scored} scored")
+        for rank, (number, score) in enumerate(results, 1):
+            print(f"\t{rank}. {index.doc_id(number)} ({score:.4f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from typing import Dict, Iterable, List, Set
+
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7
+
+def _deletes(word: str, max_distance: int):
+    """
+    Description:
+        Returns every string reachable from a word by deleting up to
+        max_distance characters, including the word itself.
+
+    Parameters:
+        word (str): The word to delete characters from.
+        max_distance (int): The maximum number of deletions.
+
+    Returns:
+        variants (Set[str]): The set of delete variants.
+    """
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - variants
+        if not frontier:
+            break
+        variants |= frontier
+
+    return variants
+
+def restricted_edit_distance(x: str, y: str, max_distance: int):
+    """
+    Description:
+        Returns the optimal string alignment distance (insertions, deletions,
+        substitutions and adjacent transpositions) between two words, which is
+        the distance generate_candidates explores one step of.
+
+    Parameters:
+        x (str): The first word.
+        y (str): The second word.
+        max_distance (int): The distance past which computation stops early.
+
+    Returns:
+        (int): The distance, or max_distance + 1 if it exceeds max_distance.
+    """
+    if abs(len(x) - len(y)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev_row = list(range(len(y) + 1))
+    for i, c1 in enumerate(x):
+        curr_row = [i + 1]
+        for j, c2 in enumerate(y):
+            cost = min(prev_row[j + 1] + 1, curr_row[j] + 1, prev_row[j] + (c1 != c2))
+            if i and j and c1 == y[j - 1] and x[i - 1] == c2:
+                cost = min(cost, prev_prev[j - 1] + 1)
+            curr_row.append(cost)
+        if min(curr_row) > max_distance:
+            return max_distance + 1
+        prev_prev, prev_row = prev_row, curr_row
+
+    return min(prev_row[-1], max_distance + 1)
+
+class SymmetricDeleteIndex:
+    """
+    Description:
+        A SymSpell-style index mapping the delete variants of every vocabulary
+        word to the words they came from. Two words within edit distance k
+        share a variant reachable with at most k deletions from each, so a
+        query only needs the lookups of its own delete variants. Only the
+        first prefix_length characters are indexed to bound memory, which is
+        still exact because candidates are verified against the full words.
+
+    Attributes:
+        max_distance (int): The largest edit distance the index can answer.
+        prefix_length (int): The number of leading characters indexed.
+        deletes (Dict[str, List[str]]): The delete variant to words mapping.
+    """
+    def __init__(self, vocab: Iterable[str], max_distance: int = DEFAULT_MAX_DISTANCE, prefix_length: int = DEFAULT_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.deletes: Dict[str, List[str]] = {}
+        for word in vocab:
+            for variant in _deletes(word[:prefix_length], max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+
+    def lookup(self, word: str, max_distance: int = None):
+        """
+        Description:
+            Returns the vocabulary words within an edit distance of a word.
+
+        Parameters:
+            word (str): The word to look up.
+            max_distance (int): The maximum edit distance, at most the one
+                the index was built with. Defaults to the index's distance.
+
+        Returns:
+            candidates (Set[str]): The known words within max_distance.
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"index was built for edit distance {self.max_distance}, not {max_distance}")
+
+        candidates: Set[str] = set()
+        rejected: Set[str] = set()
+        for variant in _deletes(word[:self.prefix_length], max_distance):
+            for term in self.deletes.get(variant, ()):
+                if term in candidates or term in rejected:
+                    continue
+                if restricted_edit_distance(word, term, max_distance) <= max_distance:
+                    candidates.add(term)
+                else:
+                    rejected.add(term)
+
+        return candidates
+
+class VocabularyTrie:
+    """
+    Description:
+        A character trie over the vocabulary, searched by carrying one
+        weighted Levenshtein row per trie node. A branch is abandoned as soon
+        as every cell of its row exceeds the cost limit, so the search only
+        visits the prefixes that can still lead to a close enough word and
+        returns each candidate together with its edit cost.
+
+    Attributes:
+        root (dict): The root node, mapping characters to child nodes. The
+            None key of a node holds the word ending there.
+    """
+    def __init__(self, vocab: Iterable[str]):
+        self.root = {}
+        for word in vocab:
+            node = self.root
+            for char in word:
+                node = node.setdefault(char, {})
+            node[None] = word
+
+    def search(self, word: str, max_cost: float, del_cost: float = 1, ins_cost: float = 1, sub_cost: float = 1, max_length_difference: int = None):
+        """
+        Description:
+            Returns the vocabulary words that word can be transformed into
+            for at most max_cost, with the cost of each. Deleting a character
+            of word costs del_cost and inserting a character of the candidate
+            costs ins_cost.
+
+        Parameters:
+            word (str): The word to search for.
+            max_cost (float): The maximum total edit cost.
+            del_cost (float): The cost of deleting a character.
+            ins_cost (float): The cost of inserting a character.
+            sub_cost (float): The cost of substituting a character.
+            max_length_difference (int): The largest difference in length
+                between word and a candidate, or None for no limit.
+
+        Returns:
+            costs (Dict[str, float]): The candidate words and their edit costs.
+        """
+        shortest = 0 if max_length_difference is None else len(word) - max_length_difference
+        longest = None if max_length_difference is None else len(word) + max_length_difference
+
+        costs = {}
+        first_row = [j * del_cost for j in range(len(word) + 1)]
+        if None in self.root and first_row[-1] <= max_cost and shortest <= 0:
+            costs[self.root[None]] = first_row[-1]
+
+        # Each stack entry is a node with its depth and the row of the
+        # prefix leading to it.
+        stack = [(child, char, 1, first_row) for char, child in self.root.items() if char is not None]
+        while stack:
+            node, char, depth, prev_row = stack.pop()
+            curr_row = [prev_row[0] + ins_cost]
+            for j, c in enumerate(word):
+                curr_row.append(min(prev_row[j + 1] + ins_cost, curr_row[j] + del_cost, prev_row[j] + sub_cost * (char != c)))
+
+            if None in node and curr_row[-1] <= max_cost and depth >= shortest:
+                costs[node[None]] = curr_row[-1]
+
+            if min(curr_row) <= max_cost and (longest is None or depth < longest):
+                stack.extend((child, c, depth + 1, curr_row) for c, child in node.items() if c is not None)
+
+        return costs
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from language_model import MODEL_FILE_NAME
+from noisy_channel import CORRECTION_CACHE_SIZE, CorrectionCache, correct_many, create_pool, load_word_probs
+from spell_index import SymmetricDeleteIndex, VocabularyTrie
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.002
+BATCH_MAX_WORDS = 512
+MAX_HEADER_LINES = 100
+
+class CorrectionBatcher:
+    """
+    Description:
+        Collects the words of concurrent correction requests and corrects
+        them together, so repeated words across requests are corrected once.
+        A batch is flushed BATCH_WINDOW seconds after its first word arrives,
+        or as soon as it holds BATCH_MAX_WORDS words. Corrections run on a
+        single worker thread, which keeps the event loop free to accept
+        requests and keeps the cache owned by one thread.
+
+    Attributes:
+        vocab (dict): A dictionary of words and their probabilities.
+        index (SymmetricDeleteIndex): An index to look candidates up in.
+        trie (VocabularyTrie): A trie to search candidates in.
+        max_cost (int): The maximum edit cost of a trie candidate.
+        cache (CorrectionCache): The corrections shared by all requests.
+        pool (multiprocessing.pool.Pool): An optional pool for large batches.
+        batches (int): The number of batches corrected.
+        words (int): The number of words corrected.
+    """
+    def __init__(self, vocab: dict, index: SymmetricDeleteIndex = None, trie: VocabularyTrie = None, max_cost=2, cache: CorrectionCache = None, pool=None):
+        self.vocab = vocab
+        self.index = index
+        self.trie = trie
+        self.max_cost = max_cost
+        self.cache = cache if cache is not None else CorrectionCache()
+        self.pool = pool
+        self.batches = 0
+        self.words = 0
+        self._pending = []
+        self._pending_words = 0
+        self._timer = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def correct(self, words: List[str]):
+        """
+        Description:
+            Returns the corrections of the words of one request once the
+            batch they were added to has been corrected.
+
+        Parameters:
+            words (List[str]): The words to correct.
+
+        Returns:
+            (List[str]): The correction of every word, in order.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((words, future))
+        self._pending_words += len(words)
+
+        if self._pending_words >= BATCH_MAX_WORDS:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(BATCH_WINDOW, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        pending, self._pending, self._pending_words = self._pending, [], 0
+        asyncio.get_running_loop().create_task(self._run(pending))
+
+    async def _run(self, pending: list):
+        words = [word for request_words, _ in pending for word in request_words]
+        try:
+            corrections = await asyncio.get_running_loop().run_in_executor(
+                self._executor, correct_many, words, self.vocab, self.index, self.trie, self.max_cost, self.cache, self.pool)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.words += len(words)
+        position = 0
+        for request_words, future in pending:
+            if not future.cancelled():
+                future.set_result(corrections[position:position + len(request_words)])
+            position += len(request_words)
+
+    def close(self):
+        self._executor.shutdown()
+
+def _request_words(query: Dict[str, List[str]]):
+    """
+    Description:
+        Returns the words of a request, given as repeated w parameters or
+        as one comma separated words parameter.
+
+    Parameters:
+        query (Dict[str, List[str]]): The parsed query string.
+
+    Returns:
+        (List[str]): The lower case words.
+    """
+    words = list(query.get("w", []))
+    for value in query.get("words", []):
+        words.extend(value.split(","))
+
+    return [word.strip().lower() for word in words if word.strip()]
+
+async def _respond(writer: asyncio.StreamWriter, status: str, body: dict, keep_alive: bool):
+    payload = json.dumps(body).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + payload)
+    await writer.drain()
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, batcher: CorrectionBatcher):
+    """
+    Description:
+        Serves the HTTP requests of one connection:
+            GET /correct?w=word&w=word -> {"corrections": {word: correction}}
+            GET /proba?w=word&w=word   -> {"probabilities": {word: P(w)}}
+            GET /stats                 -> batching and cache statistics
+
+    Parameters:
+        reader (asyncio.StreamReader): The connection's reader.
+        writer (asyncio.StreamWriter): The connection's writer.
+        batcher (CorrectionBatcher): The batcher shared by all connections.
+
+    Returns:
+        None
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+
+            headers = {}
+            for _ in range(MAX_HEADER_LINES):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0) or 0)
+            if length:
+                await reader.readexactly(length)
+
+            parts = request_line.decode("latin-1").split()
+            keep_alive = headers.get("connection", "").lower() != "close" and parts[-1:] != ["HTTP/1.0"]
+            if len(parts) < 2 or parts[0] != "GET":
+                await _respond(writer, "405 Method Not Allowed", {"error": "only GET is supported"}, False)
+                break
+
+            url = urlsplit(parts[1])
+            query = parse_qs(url.query)
+            words = _request_words(query)
+
+            if url.path == "/correct":
+                corrections = await batcher.correct(words)
+                await _respond(writer, "200 OK", {"corrections": dict(zip(words, corrections))}, keep_alive)
+            elif url.path == "/proba":
+                await _respond(writer, "200 OK", {"probabilities": {word: batcher.vocab.get(word, 0) for word in words}}, keep_alive)
+            elif url.path == "/stats":
+                cache = batcher.cache
+                await _respond(writer, "200 OK", {"batches": batcher.batches, "words": batcher.words, "cache_size": len(cache), "cache_hits": cache.hits, "cache_misses": cache.misses}, keep_alive)
+            else:
+                await _respond(writer, "404 Not Found", {"error": f"unknown path {url.path}"}, keep_alive)
+
+            if not keep_alive:
+                break
+
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int, batcher: CorrectionBatcher):
+    """
+    Description:
+        Runs the server until it is interrupted.
+
+    Parameters:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        batcher (CorrectionBatcher): The batcher answering correction requests.
+
+    Returns:
+        None
+    """
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(reader, writer, batcher), host, port)
+    print(f"Serving spelling corrections on http://{host}:{port}", flush=True)
+
+    async with server:
+        await server.serve_forever()
+
+def main():
+    """
+    Description:
+        Main function of the program.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description='Noisy Channel Spell Correction Server')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='the address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='the port to listen on')
+    parser.add_argument('--model', default=MODEL_FILE_NAME, help='the prebuilt language model file')
+    parser.add_argument('--corpus', help='the corpus file or directory to rebuild the language model from; defaults to the one it was built from')
+    parser.add_argument('--distance', type=int, help='look candidates up to this edit distance in a vocabulary index')
+    parser.add_argument('--search', choices=['symspell', 'trie'], default='symspell', help='the vocabulary index used with --distance')
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes correcting large batches')
+    parser.add_argument('--cache', type=int, default=CORRECTION_CACHE_SIZE, help='the number of corrections kept in the cache')
+    args = parser.parse_args()
+
+    try:
+        word_probs = load_word_probs(args.model, args.corpus)
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        print(f"Error: {e}")
+        exit()
+
+    index = None
+    trie = None
+    if args.distance is not None:
+        if args.search == 'trie':
+            trie = VocabularyTrie(word_probs)
+        else:
+            index = SymmetricDeleteIndex(word_probs, args.distance)
+
+    pool = create_pool(args.workers, word_probs, index, trie, args.distance) if args.workers > 1 else None
+    batcher = CorrectionBatcher(word_probs, index, trie, args.distance, CorrectionCache(args.cache), pool)
+
+    try:
+        asyncio.run(serve(args.host, args.port, batcher))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+if __name__ == '__main__':
+    main()
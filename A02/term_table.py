@@ -0,0 +1,368 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+from typing import Dict
+
+import numpy as np
+
+# File layout: MAGIC | header length (uint32) | JSON header | arrays
+# Every array starts on an 8 byte boundary so it can be used straight out of
+# the memory-mapped file, which also lets processes that load the same file
+# share its pages.
+TERM_TABLE_MAGIC = b"TTBL"
+TERM_TABLE_VERSION = 1
+TERM_TABLE_ALIGNMENT = 8
+
+# The hash slots are kept at most half full, so a lookup probes one or two
+# slots on average.
+SLOTS_PER_TERM = 2
+
+def _hash(key: bytes):
+    """
+    Description:
+        Returns a hash of a term that is stable across processes and runs,
+        unlike the built-in hash of str.
+
+    Parameters:
+        key (bytes): The UTF-8 encoded term.
+
+    Returns:
+        (int): The hash.
+    """
+    return zlib.crc32(key)
+
+def _pad(length: int):
+    """
+    Description:
+        Returns the number of bytes needed to align a length.
+
+    Parameters:
+        length (int): The current length.
+
+    Returns:
+        (int): The number of padding bytes.
+    """
+    return -length % TERM_TABLE_ALIGNMENT
+
+class TermTable(Mapping):
+    """
+    Description:
+        A compact, read-only mapping of terms to counts. The sorted terms are
+        stored back to back in one UTF-8 string pool and a term's ID is its
+        position in that order. Counts live in a NumPy array indexed by ID,
+        and an open-addressing table of IDs keyed by a CRC32 of the term
+        finds a term in about one probe. This costs a few tens of bytes per
+        term instead of the hundreds of a dict of str objects.
+
+    Attributes:
+        pool (bytes): The concatenated UTF-8 terms, in sorted order.
+        offsets (np.ndarray): The start of every term in pool, plus the end.
+        counts (np.ndarray): The count of every term.
+        slots (np.ndarray): The hash table of term IDs plus one (0 is empty).
+        metadata (dict): Extra information saved with the table.
+        path (str): The file the table was loaded from, if any.
+    """
+    def __init__(self, pool, offsets: np.ndarray, counts: np.ndarray, slots: np.ndarray, metadata: dict = None, path: str = None):
+        self.pool = pool
+        self.offsets = offsets
+        self.counts = counts
+        self.slots = slots
+        self.metadata = metadata or {}
+        self.path = path
+        # Scalar reads from memoryviews return plain ints and are much faster
+        # than indexing NumPy arrays one element at a time.
+        self._offsets = memoryview(offsets).cast("B").cast(offsets.dtype.char)
+        self._counts = memoryview(counts).cast("B").cast(counts.dtype.char)
+        self._slots = memoryview(slots).cast("B").cast(slots.dtype.char)
+        self._mask = len(slots) - 1
+
+    @classmethod
+    def from_counts(cls, counts: Dict[str, int], metadata: dict = None):
+        """
+        Description:
+            Builds a table from a dictionary of counts.
+
+        Parameters:
+            counts (Dict[str, int]): The count of every term.
+            metadata (dict): Extra information saved with the table.
+
+        Returns:
+            (TermTable): The table.
+        """
+        terms = sorted(counts)
+        encoded = [term.encode("utf-8") for term in terms]
+        pool = b"".join(encoded)
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        np.cumsum([len(key) for key in encoded], out=offsets[1:])
+
+        values = [counts[term] for term in terms]
+        dtype = np.uint32 if not values or max(values) < 2 ** 32 else np.uint64
+        count_array = np.array(values, dtype=dtype)
+
+        size = 1
+        while size < SLOTS_PER_TERM * len(terms):
+            size *= 2
+        slots = [0] * size
+        mask = size - 1
+        for term_id, key in enumerate(encoded):
+            slot = _hash(key) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = term_id + 1
+
+        return cls(pool, offsets, count_array, np.array(slots, dtype=np.uint32), metadata)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Description:
+            Loads a table by memory-mapping its file. Nothing but the header
+            is read until the table is used.
+
+        Parameters:
+            path (str): The path of the table file.
+
+        Returns:
+            (TermTable): The table.
+        """
+        header = read_header(path)
+        if header is None:
+            raise ValueError(f"{path} is not a term table file")
+
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        arrays = {}
+        for name, (offset, length, dtype) in header["arrays"].items():
+            start = header["data_offset"] + offset
+            if name == "pool":
+                arrays[name] = memoryview(mapped)[start:start + length]
+            else:
+                arrays[name] = np.frombuffer(mapped, dtype=np.dtype(dtype), count=length, offset=start)
+
+        return cls(arrays["pool"], arrays["offsets"], arrays["counts"], arrays["slots"], header["metadata"], path)
+
+    def save(self, path: str):
+        """
+        Description:
+            Writes the table to a file, atomically replacing any old one.
+
+        Parameters:
+            path (str): The path of the table file.
+
+        Returns:
+            None
+        """
+        arrays = [
+            ("pool", bytes(self.pool), len(self.pool), "|u1"),
+            ("offsets", self.offsets.astype("<u8").tobytes(), len(self.offsets), "<u8"),
+            ("counts", self.counts.astype(self.counts.dtype.newbyteorder("<")).tobytes(), len(self.counts), self.counts.dtype.newbyteorder("<").str),
+            ("slots", self.slots.astype("<u4").tobytes(), len(self.slots), "<u4"),
+        ]
+
+        layout = {}
+        position = 0
+        for name, data, length, dtype in arrays:
+            layout[name] = [position, length, dtype]
+            position += len(data) + _pad(len(data))
+
+        header = {
+            "version": TERM_TABLE_VERSION,
+            "num_terms": len(self),
+            "metadata": self.metadata,
+            "arrays": layout,
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * _pad(len(TERM_TABLE_MAGIC) + 4 + len(header_bytes))
+
+        temp_file = path + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(TERM_TABLE_MAGIC)
+            file.write(struct.pack("<I", len(header_bytes)))
+            file.write(header_bytes)
+            for name, data, length, dtype in arrays:
+                file.write(data)
+                file.write(b"\0" * _pad(len(data)))
+
+        os.replace(temp_file, path)
+
+        return
+
+    def __reduce__(self):
+        # A mapped table is sent to other processes as its path, so each
+        # process maps the same file instead of receiving a copy.
+        if self.path is not None:
+            return (TermTable.load, (self.path,))
+        return (TermTable, (bytes(self.pool), self.offsets, self.counts, self.slots, self.metadata))
+
+    def term_id(self, term: str):
+        """
+        Description:
+            Returns the ID of a term.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (int): The ID, or -1 if the term is not in the table.
+        """
+        key = term.encode("utf-8")
+        slot = _hash(key) & self._mask
+        while True:
+            entry = self._slots[slot]
+            if not entry:
+                return -1
+            term_id = entry - 1
+            if self.pool[self._offsets[term_id]:self._offsets[term_id + 1]] == key:
+                return term_id
+            slot = (slot + 1) & self._mask
+
+    def term(self, term_id: int):
+        """
+        Description:
+            Returns the term with an ID.
+
+        Parameters:
+            term_id (int): The ID.
+
+        Returns:
+            (str): The term.
+        """
+        return bytes(self.pool[self._offsets[term_id]:self._offsets[term_id + 1]]).decode("utf-8")
+
+    def count(self, term: str):
+        """
+        Description:
+            Returns the count of a term, or 0 if it is not in the table.
+
+        Parameters:
+            term (str): The term.
+
+        Returns:
+            (int): The count.
+        """
+        term_id = self.term_id(term)
+        return self._counts[term_id] if term_id >= 0 else 0
+
+    def count_of(self, term_id: int):
+        """
+        Description:
+            Returns the count of the term with an ID.
+
+        Parameters:
+            term_id (int): The ID.
+
+        Returns:
+            (int): The count.
+        """
+        return self._counts[term_id]
+
+    def __getitem__(self, term: str):
+        term_id = self.term_id(term)
+        if term_id < 0:
+            raise KeyError(term)
+        return self._counts[term_id]
+
+    def __contains__(self, term):
+        return isinstance(term, str) and self.term_id(term) >= 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        for term_id in range(len(self)):
+            yield self.term(term_id)
+
+    @property
+    def total(self):
+        """
+        Description:
+            Returns the sum of all counts.
+
+        Returns:
+            (int): The total.
+        """
+        return int(self.counts.sum(dtype=np.uint64))
+
+    def most_common(self, k: int = None):
+        """
+        Description:
+            Returns the k most frequent terms without sorting the whole table.
+
+        Parameters:
+            k (int): The number of terms, or None for all of them.
+
+        Returns:
+            (List[Tuple[str, int]]): The terms and counts, most frequent first.
+        """
+        if k is None or k >= len(self):
+            top = np.argsort(-self.counts.astype(np.int64), kind="stable")
+        else:
+            top = np.argpartition(-self.counts.astype(np.int64), k - 1)[:k]
+            top = top[np.lexsort((top, -self.counts[top].astype(np.int64)))]
+
+        return [(self.term(term_id), self._counts[term_id]) for term_id in top.tolist()]
+
+class TermProbabilities(Mapping):
+    """
+    Description:
+        A read-only view of a term table as the probability of every term,
+        count / total, computed on lookup instead of stored.
+
+    Attributes:
+        table (TermTable): The term counts.
+        total (int): The number of words the counts were taken from.
+    """
+    def __init__(self, table: TermTable, total: int = None):
+        self.table = table
+        self.total = table.total if total is None else total
+
+    def __getitem__(self, term: str):
+        return self.table[term] / self.total
+
+    def __contains__(self, term):
+        return term in self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def get(self, term: str, default=None):
+        term_id = self.table.term_id(term)
+        if term_id < 0:
+            return default
+        return self.table.count_of(term_id) / self.total
+
+def read_header(path: str):
+    """
+    Description:
+        Reads the header of a term table file.
+
+    Parameters:
+        path (str): The path of the table file.
+
+    Returns:
+        (dict): The header, or None if the file is missing or not a table.
+    """
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(TERM_TABLE_MAGIC)) != TERM_TABLE_MAGIC:
+                return None
+
+            (header_length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_length))
+
+    except (FileNotFoundError, PermissionError, struct.error, ValueError):
+        return None
+
+    if header.get("version") != TERM_TABLE_VERSION:
+        return None
+
+    header["data_offset"] = len(TERM_TABLE_MAGIC) + 4 + header_length
+    return header
@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_boolean_query.py --queries 1000
@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_normalization.py --tokens 1000000
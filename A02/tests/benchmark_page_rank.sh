@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_page_rank.py --sizes 10000 100000 1000000 10000000 --report page_rank_benchmark.json
@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_page_rank_local.py --nodes 74361 242416 201132 --tolerance 1e-4 1e-5 1e-6 1e-7
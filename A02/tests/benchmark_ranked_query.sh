@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_ranked_query.py --queries 1000 --top 10
@@ -0,0 +1,3 @@
+#!/bin/bash
+cd ..
+python3 benchmark_spell.py --queries 1000 --edits 1 --distance 1 2
@@ -0,0 +1,7 @@
+#!/bin/bash
+cd ..
+python3 spell_server.py --port 8765 --distance 2 &
+SERVER=$!
+sleep 2
+python3 benchmark_spell_server.py --port 8765 --requests 5000 --concurrency 32
+kill $SERVER
@@ -0,0 +1,57 @@
+#!/bin/bash
+# Updates a segmented index while a source file that yields no documents is
+# added and removed, which used to leave the manifest pointing at a dropped
+# segment.
+cd ..
+python3 - <<'EOF'
+import json
+import os
+import tempfile
+
+from index_segments import open_index, read_manifest, update_index
+
+def index_files(file_names):
+    for file_name in file_names:
+        with open(file_name, "r", encoding="utf-8") as file:
+            articles = json.load(file)
+        partial = {}
+        for article in articles:
+            for word in article["text"].split():
+                partial.setdefault(word, {}).setdefault(article["id"], 0)
+                partial[word][article["id"]] += 1
+        yield partial
+
+def write(path, articles):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(articles, file)
+
+with tempfile.TemporaryDirectory() as root:
+    directory = os.path.join(root, "index")
+    a = os.path.join(root, "a.json")
+    empty = os.path.join(root, "empty.json")
+
+    write(a, [{"id": "1", "text": "apple banana"}, {"id": "2", "text": "banana cherry"}])
+    update_index(directory, [a], index_files, 1 << 20)
+
+    write(empty, [])
+    update_index(directory, [a, empty], index_files, 1 << 20)
+    manifest = read_manifest(directory)
+    assert os.path.normpath(empty) not in manifest["sources"], manifest
+    assert len(manifest["segments"]) == 1, manifest
+
+    os.remove(empty)
+    update_index(directory, [a], index_files, 1 << 20)
+
+    # A manifest written before the fix still names the dropped segment.
+    manifest = read_manifest(directory)
+    manifest["sources"]["gone.json"] = {"size": 2, "mtime_ns": 0, "sha256": "", "segment": "segment-99999.index"}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    update_index(directory, [a], index_files, 1 << 20)
+
+    index = open_index(directory)
+    assert index.num_docs == 2 and "banana" in index, index.num_docs
+    index.close()
+
+print("index_segments: ok")
+EOF
@@ -0,0 +1,43 @@
+#!/bin/bash
+# Reads JSON arrays back with chunk sizes small enough to split every
+# element, numbers included, across reads.
+cd ..
+python3 - <<'PY'
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+
+# wikipedia_processing lists ./data_wikipedia when it is imported.
+sys.path.insert(0, os.getcwd())
+os.chdir(tempfile.mkdtemp())
+os.mkdir("data_wikipedia")
+from wikipedia_processing import iter_json_array
+
+rng = random.Random(42)
+
+def value(depth):
+    kind = rng.randrange(7 if depth < 3 else 5)
+    if kind == 0:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 1:
+        return rng.choice([0, 0.15, -2.5e-7, 1e21, 3.0, rng.random()])
+    if kind == 2:
+        return "".join(rng.choice("ab ,]\"\\é") for _ in range(rng.randrange(6)))
+    if kind == 3:
+        return rng.choice([True, False, None])
+    if kind == 4:
+        return [value(depth + 1) for _ in range(rng.randrange(4))]
+    return {str(i): value(depth + 1) for i in range(rng.randrange(4))}
+
+for _ in range(300):
+    elements = [value(0) for _ in range(rng.randrange(6))]
+    text = json.dumps(elements, indent=rng.choice([None, 1]))
+    for chunk_size in range(1, 9):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == elements, (text, chunk_size)
+
+assert list(iter_json_array(io.StringIO("[0.15]"), 2)) == [0.15]
+print("iter_json_array: ok")
+PY
@@ -1,13 +1,21 @@
 import argparse
 import json
+import multiprocessing
 import nltk
 import nltk.corpus
 import nltk.stem
 import nltk.tokenize
 import os
 import string
-import sys
-from typing import List
+import time
+from collections import Counter
+from typing import Iterable, List
+
+from index_segments import compact, read_manifest, update_index
+from index_store import build_index
+from language_model import corpus_sources, source_fingerprint
+from normalization import index_stemmer, index_terms, stop_words
+from term_table import TermTable
 
 DATA_DIRECTORY = "./data_wikipedia"
 DATA_FILE_ENCODING = "utf-8"
@@ -15,189 +23,456 @@ TOKENIZED_FILE_NAME = "wikipedia.token"
 STOPWORD_FILE_NAME = "wikipedia.token.stop"
 STEMMED_FILE_NAME = "wikipedia.token.stemm"
 INVERTED_INDEX_FILE_NAME = "wikipedia.index"
+SEGMENTED_INDEX_DIRECTORY = "wikipedia.index.d"
+TERM_TABLE_FILE_NAME = "wikipedia.terms"
+
+# The default memory the postings of the inverted index may use before they
+# are flushed to a segment on disk, in bytes.
+INDEX_MEMORY_BUDGET = 512 << 20
 
 JSON_FILE_NAMES = [os.path.join(DATA_DIRECTORY, fileName) for fileName in os.listdir(DATA_DIRECTORY)]
 JSON_FILE_NAMES = [fileName for fileName in JSON_FILE_NAMES if os.path.isfile(fileName)]
 
-def generate_corpus():
+# The number of characters read from a JSON file at a time.
+READ_CHUNK_SIZE = 1 << 20
+
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# The characters that can continue a JSON number.
+NUMBER_CHARACTERS = set("0123456789.eE+-")
+
+def iter_json_array(file, chunk_size: int = READ_CHUNK_SIZE):
     """
     Description:
-        Processes all files in the data directory, and compiles all the
-        "text" attributes of the JSON objects in the files into a single
-        cleaned string.
+        Yields the elements of the JSON array in a file one at a time,
+        reading the file in chunks, so only the element being decoded is
+        held in memory rather than the whole array.
 
     Parameters:
-        params (Parameters): The parameters for the script.
+        file (TextIO): The open JSON file.
+        chunk_size (int): The number of characters read at a time.
 
     Returns:
-        (str): The merged lower-case string with punctuation removed.
+        (Iterator[object]): The decoded elements.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    # What the array expects next: "[", an element or "]" ("first"), a "," or
+    # "]" ("separator"), or an element ("element").
+    expected = "["
+
+    while (True):
+        while (position < len(buffer) and buffer[position].isspace()):
+            position += 1
+
+        if (position < len(buffer)):
+            char = buffer[position]
+            if (expected == "["):
+                if (char != "["):
+                    raise ValueError(f"{file.name} does not hold a JSON array")
+                expected = "first"
+                position += 1
+                continue
+
+            if (char == "]" and expected != "element"):
+                return
+
+            if (expected == "separator"):
+                if (char != ","):
+                    raise ValueError(f"{file.name} is missing a ',' between the elements of its JSON array")
+                expected = "element"
+                position += 1
+                continue
+
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if (eof):
+                    raise
+            else:
+                # An element running to the end of the buffer may be cut off,
+                # and so may a number followed by what could continue it.
+                if (eof or (end < len(buffer) and not (isinstance(element, (int, float)) and buffer[end] in NUMBER_CHARACTERS))):
+                    yield element
+                    expected = "separator"
+                    position = end
+                    continue
+
+        if (eof):
+            raise ValueError(f"{file.name} ends inside its JSON array")
+
+        # Read at least as much as is buffered, so a large element is decoded
+        # a logarithmic number of times.
+        chunk = file.read(max(chunk_size, len(buffer) - position))
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_articles(file_names: List[str] = JSON_FILE_NAMES):
     """
-    text = ""
-    for fileName in JSON_FILE_NAMES:
-        file = open(fileName, "r", encoding=DATA_FILE_ENCODING)
-        data = json.load(file) #[ {id, text, title} ]
-        for entry in data:
-            text += entry["text"]
+    Description:
+        Yields the articles of the JSON files one at a time, closing each
+        file once its articles are read.
 
-    return text.lower().translate(str.maketrans("", "", string.punctuation))
+    Parameters:
+        file_names (List[str]): The paths of the JSON files.
+
+    Returns:
+        (Iterator[dict]): The {id, text, title} objects of the articles.
+    """
+    for fileName in file_names:
+        with open(fileName, "r", encoding=DATA_FILE_ENCODING) as file:
+            yield from iter_json_array(file)
 
-def get_tokenized_corpus(corpus: str):
+def normalize_text(text: str):
     """
     Description:
-        Tokenizes the text and saves the result to a 'wikipedia.token' file.
+        Lower-cases a text and removes its punctuation.
 
     Parameters:
-        corpus (str): The text to tokenize.
+        text (str): The text to normalize.
 
     Returns:
-        (List[str]): The list of tokens.
+        (str): The normalized text.
     """
-    return nltk.word_tokenize(corpus)
+    return text.lower().translate(PUNCTUATION_TABLE)
 
-def zipf_law(tokens: List[str]):
+def generate_corpus(file_names: List[str] = JSON_FILE_NAMES):
     """
     Description:
-        Performs Zipf's law on the text.
+        Streams the "text" attributes of the articles in the data
+        directory, cleaned one article at a time.
 
     Parameters:
-        tokens (List[str]): The list of tokens to perform Zipf's law on.
+        file_names (List[str]): The paths of the JSON files.
+
+    Returns:
+        (Iterator[str]): The lower-case text of every article with
+        punctuation removed.
+    """
+    for entry in iter_articles(file_names):
+        yield normalize_text(entry["text"])
+
+def get_tokenized_corpus(corpus: Iterable[str] = None):
+    """
+    Description:
+        Tokenizes the corpus one article at a time. The tokens are yielded
+        lazily, so each consumer streams the corpus instead of holding a
+        list of every token.
+
+    Parameters:
+        corpus (Iterable[str]): The texts to tokenize. Default is the
+            articles of the data directory.
+
+    Returns:
+        (Iterator[str]): The tokens.
+    """
+    for text in (generate_corpus() if corpus is None else corpus):
+        yield from nltk.word_tokenize(text)
+
+def write_tokens(file_name: str, tokens: Iterable[str]):
+    """
+    Description:
+        Writes tokens to a file, one per line, as they are produced.
+
+    Parameters:
+        file_name (str): The path of the file.
+        tokens (Iterable[str]): The tokens to write.
+
+    Returns:
+        (int): The number of tokens written.
+    """
+    count = 0
+    with open(file_name, "w", encoding=DATA_FILE_ENCODING) as file:
+        for token in tokens:
+            file.write(token if count == 0 else "\n" + token)
+            count += 1
+
+    return count
+
+def zipf_law(tokens: Iterable[str]):
+    """
+    Description:
+        Performs Zipf's law on the text. The token counts are saved to a
+        'wikipedia.terms' term table. They include stopwords and other
+        tokens the spell checker leaves out, so the table records no
+        sources and is not taken for a language model.
+
+    Parameters:
+        tokens (Iterable[str]): The tokens to perform Zipf's law on.
     """
     print("Performing Zipf's law...")
-    frequencies = nltk.FreqDist(tokens)
+    counts = Counter(tokens)
+    table = TermTable.from_counts(counts, {"total_words": sum(counts.values())})
+    table.save(TERM_TABLE_FILE_NAME)
+
+    frequencies = nltk.FreqDist(dict(table.most_common(50)))
     frequencies.plot(50, cumulative=False)
 
     print("Done!")
     return
 
-def tokenize(tokens: List[str]):
+def tokenize(tokens: Iterable[str]):
     """
     Description:
         Tokenizes the text and saves the result to a 'wikipedia.token' file.
 
     Parameters:
-        tokens (List[str]): The list of tokens to tokenize.
+        tokens (Iterable[str]): The tokens to tokenize.
     """
     print("Tokenizing...")
-    with open(TOKENIZED_FILE_NAME, "w", encoding=DATA_FILE_ENCODING) as file:
-        file.write("\n".join(tokens))
+    write_tokens(TOKENIZED_FILE_NAME, tokens)
 
     print("Done!")
     return
 
-def _remove_stopwords(tokens: List[str]):
+def _remove_stopwords(tokens: Iterable[str]):
     """
     Description:
         Removes stopwords from the text.
 
     Parameters:
-        tokens (List[str]): The list of tokens to remove stopwords from.
+        tokens (Iterable[str]): The tokens to remove stopwords from.
 
     Returns:
-        (List[str]): The list of tokens without stopwords.
+        (Iterator[str]): The tokens without stopwords.
     """
-    stopwords = nltk.corpus.stopwords.words("english")
-    result = [word for word in tokens if word not in stopwords]
-    return result
+    stopwords = stop_words()
+    return (word for word in tokens if word not in stopwords)
 
-def remove_stopwords(tokens: List[str]):
+def remove_stopwords(tokens: Iterable[str]):
     """
     Description:
         Removes stopwords from the text and saves the result to a
         'wikipedia.token.stop' file.
 
     Parameters:
-        tokens (List[str]): The list of tokens to remove stopwords from.
+        tokens (Iterable[str]): The tokens to remove stopwords from.
 
     Returns:
-        Nones
+        None
     """
     print("Removing stopwords...")
-    result = _remove_stopwords(tokens)
-    with open(STOPWORD_FILE_NAME, "w", encoding=DATA_FILE_ENCODING) as file:
-        file.write("\n".join(result))
+    write_tokens(STOPWORD_FILE_NAME, _remove_stopwords(tokens))
 
     print("Done!")
 
     return
 
-def _porter_stemming(tokens: List[str]):
+def _porter_stemming(tokens: Iterable[str]):
     """
     Description:
         Performs Porter stemming on the text.
 
     Parameters:
-        tokens (List[str]): The list of tokens to perform Porter stemming on.
+        tokens (Iterable[str]): The tokens to perform Porter stemming on.
 
     Returns:
-        (List[str]): The list of stemmed tokens.
+        (Iterator[str]): The stemmed tokens.
     """
-    stemmer = nltk.stem.PorterStemmer()
-    result = [stemmer.stem(word) for word in tokens]
-
-    return result
+    return index_stemmer().normalize_all(tokens)
 
-def porter_stemming(tokens: List[str]):
+def porter_stemming(tokens: Iterable[str]):
     """
     Description:
         Performs Porter stemming on the text and saves the result to
         a 'wikipedia.token.stemm' file.
 
     Parameters:
-        tokens (List[str]): The list of tokens to perform Porter stemming on.
+        tokens (Iterable[str]): The tokens to perform Porter stemming on.
 
     Returns:
         None
     """
     print("Performing Porter stemming...")
-    result = _porter_stemming(tokens)
-    with open(STEMMED_FILE_NAME, "w", encoding=DATA_FILE_ENCODING) as file:
-        file.write("\n".join(result))
+    stemmer = index_stemmer()
+    hits, misses = stemmer.hits, stemmer.misses
+    write_tokens(STEMMED_FILE_NAME, _porter_stemming(tokens))
+    hits, misses = stemmer.hits - hits, stemmer.misses - misses
+    if (hits + misses):
+        print(f"Stem cache hit rate: {hits / (hits + misses):.2%} ({misses} of {hits + misses} words stemmed).")
 
     print("Done!")
 
     return
 
-def inverted_index():
+def _init_index_worker(cache_file: str = None):
     """
     Description:
-        Creates an inverted index for the text and saves the result to
-        a 'wikipedia.token.index' file.
+        Loads the stopwords and the stemmer of an indexing process once, so
+        every article it indexes reuses them.
 
     Parameters:
-        corpus (str): The text to create an inverted index for.
-        {word: {id: count, id2: count2},}}
+        cache_file (str): The saved stem cache to start from, if any.
 
     Returns:
-        (Dict[str, List[int]]): The inverted index.
+        None
+    """
+    stop_words()
+    stemmer = index_stemmer()
+    if (cache_file):
+        stemmer.load(cache_file)
+        stemmer.track_fresh()
+
+    return
+
+def _index_file_task(fileName: str):
+    """
+    Description:
+        Indexes one JSON file in a worker process.
+
+    Parameters:
+        fileName (str): The path of the JSON file.
+
+    Returns:
+        partial (Dict[str, Dict[str, int]]): The inverted index of the file.
+        hits (int): The number of stems found in the cache.
+        misses (int): The number of words stemmed.
+        fresh (Dict[str, str]): The stems of the new words, if the stem cache is saved.
+    """
+    stemmer = index_stemmer()
+    hits, misses = stemmer.hits, stemmer.misses
+    partial = index_file(fileName)
+
+    return partial, stemmer.hits - hits, stemmer.misses - misses, stemmer.take_fresh()
+
+def index_file(fileName: str):
+    """
+    Description:
+        Creates the inverted index of the articles of one JSON file.
+
+    Parameters:
+        fileName (str): The path of the JSON file.
+
+    Returns:
+        (Dict[str, Dict[str, int]]): The number of occurrences of every
+        stemmed word in every article, in order of first occurrence.
     """
-    print("Creating inverted index...")
     index = {}
-    for fileName in JSON_FILE_NAMES:
-        file = open(fileName, "r", encoding=DATA_FILE_ENCODING)
-        data = json.load(file) #[ {id, text, title} ]
-        for entry in data:
-            articleId = entry["id"]
-            text = entry["text"].lower()
-            tokenizedText = nltk.word_tokenize(text)
-            tokenizedText = _remove_stopwords(tokenizedText)
-            tokenizedText = _porter_stemming(tokenizedText)
+    for entry in iter_articles([fileName]):
+        articleId = entry["id"]
+        text = entry["text"].lower()
+        tokenizedText = index_terms(nltk.word_tokenize(text))
 
-            for word in tokenizedText:
-                if (word not in index):
-                    index[word] = {articleId: 1}
+        for word in tokenizedText:
+            if (word not in index):
+                index[word] = {articleId: 1}
 
-                elif (articleId not in index[word]):
-                    index[word][articleId] = 1
+            elif (articleId not in index[word]):
+                index[word][articleId] = 1
 
-                else:
-                    index[word][articleId] += 1
+            else:
+                index[word][articleId] += 1
 
-    with open(INVERTED_INDEX_FILE_NAME, "w", encoding=DATA_FILE_ENCODING) as file:
-        file.write(json.dumps(index))
+    return index
+
+def _index_partials(file_names: List[str], workers: int, cache_file: str, stats: dict):
+    """
+    Description:
+        Yields the inverted index of every JSON file, in file order, indexed
+        in parallel by worker processes that each load the stopwords and the
+        stemmer once.
+
+    Parameters:
+        file_names (List[str]): The paths of the JSON files.
+        workers (int): The number of indexing processes.
+        cache_file (str): The saved stem cache the workers start from.
+        stats (dict): Receives the "hits" and "misses" of the stem cache.
+
+    Returns:
+        (Iterator[Dict[str, Dict[str, int]]]): The index of every file.
+    """
+    stemmer = index_stemmer()
+    if (workers <= 1):
+        for fileName in file_names:
+            hits, misses = stemmer.hits, stemmer.misses
+            partial = index_file(fileName)
+            stats["hits"] += stemmer.hits - hits
+            stats["misses"] += stemmer.misses - misses
+            yield partial
+
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_index_worker, initargs=(cache_file,)) as pool:
+        for partial, partialHits, partialMisses, fresh in pool.imap(_index_file_task, file_names):
+            stats["hits"] += partialHits
+            stats["misses"] += partialMisses
+            # Learn the workers' stems, so the saved stem cache covers them.
+            stemmer.update(fresh)
+            yield partial
+
+    return
+
+def inverted_index(workers: int = 1, cache_file: str = None, memory_budget: int = INDEX_MEMORY_BUDGET):
+    """
+    Description:
+        Creates an inverted index for the text and saves the result to
+        a 'wikipedia.index' file in the binary format of index_store.py,
+        which is memory-mapped to look terms up. The JSON files are indexed
+        in parallel, one file per task, and their partial indexes are
+        merged in file order, so the index does not depend on the number
+        of workers. Whenever the merged postings outgrow the memory budget
+        they are flushed to a segment on disk, and the segments are merged
+        into the index at the end (SPIMI).
+
+    Parameters:
+        workers (int): The number of indexing processes.
+        cache_file (str): The saved stem cache the workers start from.
+        memory_budget (int): The memory the postings may use, in bytes.
+
+    Returns:
+        (dict): The build report of index_store.build_index.
+    """
+    print("Creating inverted index...")
+    start = time.perf_counter()
+    stats = {"hits": 0, "misses": 0}
+    partials = _index_partials(JSON_FILE_NAMES, workers, cache_file, stats)
+    report = build_index(partials, INVERTED_INDEX_FILE_NAME, memory_budget, {"sources": source_fingerprint(corpus_sources(DATA_DIRECTORY))})
+
+    print(f"Indexed {len(JSON_FILE_NAMES)} files with {workers} worker(s) in {time.perf_counter() - start:.2f} s.")
+    hits, misses = stats["hits"], stats["misses"]
+    if (hits + misses):
+        print(f"Stem cache hit rate: {hits / (hits + misses):.2%} ({misses} of {hits + misses} words stemmed).")
+    print(f"{report['terms']} terms, {report['documents']} documents, {report['postings']} postings; "
+          f"{report['segments']} segment(s) written in {report['flush_time']:.2f} s, merged in {report['merge_time']:.2f} s.")
 
     print("Done!")
 
-    return index
+    return report
+
+def update_inverted_index(workers: int = 1, cache_file: str = None, memory_budget: int = INDEX_MEMORY_BUDGET):
+    """
+    Description:
+        Updates the segmented index in 'wikipedia.index.d' with the JSON
+        files added, changed or removed since the last update. Only the new
+        and changed files are indexed, into a new segment; the articles of
+        changed and removed files are marked deleted, and small segments
+        are merged.
+
+    Parameters:
+        workers (int): The number of indexing processes.
+        cache_file (str): The saved stem cache the workers start from.
+        memory_budget (int): The memory the postings may use, in bytes.
+
+    Returns:
+        (dict): The update report of index_segments.update_index.
+    """
+    print("Updating inverted index...")
+    start = time.perf_counter()
+    stats = {"hits": 0, "misses": 0}
+    report = update_index(SEGMENTED_INDEX_DIRECTORY, JSON_FILE_NAMES, lambda fileNames: _index_partials(fileNames, workers, cache_file, stats), memory_budget)
+
+    print(f"{report['added']} added, {report['changed']} changed, {report['removed']} removed and {report['unchanged']} unchanged files; {report['deleted_docs']} articles deleted.")
+    if (report["segment"] is not None):
+        segment = report["segment"]
+        print(f"New segment: {segment['terms']} terms, {segment['documents']} documents, {segment['postings']} postings.")
+    if (report["compaction"]["merged"]):
+        print(f"Compacted {report['compaction']['merged']} segment(s) in {report['compaction']['time']:.2f} s.")
+    print(f"{report['segments']} segment(s) in {SEGMENTED_INDEX_DIRECTORY}, updated in {time.perf_counter() - start:.2f} s.")
+
+    return report
 
 def main():
     """
@@ -219,27 +494,46 @@ def main():
     parser.add_argument("--stopword", help="Perform stopword removal.", action="store_true")
     parser.add_argument("--stemming", help="Perform stemming.", action="store_true")
     parser.add_argument("--invertedindex", help="Perform inverted index creation.", action="store_true")
+    parser.add_argument("--workers", help="The number of processes creating the inverted index.", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--stemcache", help="A file the stem cache is loaded from and saved to between runs.", type=str, default=None)
+    parser.add_argument("--update", help="Update the segmented inverted index with the new, changed and removed files.", action="store_true")
+    parser.add_argument("--compact", help="Merge every segment of the segmented inverted index into one.", action="store_true")
+    parser.add_argument("--budget", help="The memory the inverted index may use before it is flushed to disk, in MB.", type=int, default=INDEX_MEMORY_BUDGET >> 20)
     args = parser.parse_args()
 
-    corpus = generate_corpus()
-    tokens = get_tokenized_corpus(corpus)
-    print(f"Length of fully merged text is {len(corpus)} characters.")
-    print(f"Memory of fully merged text is {sys.getsizeof(corpus) / 1000000} MB.")
+    if (args.stemcache):
+        print(f"Loaded {index_stemmer().load(args.stemcache)} stems from {args.stemcache}.")
+
+    # Every consumer streams the articles again, so no more than one
+    # article's text and tokens are held in memory at a time.
+    print(f"Streaming the articles of {len(JSON_FILE_NAMES)} files in {DATA_DIRECTORY}.")
 
     if (args.zipf):
-        zipf_law(tokens)
+        zipf_law(get_tokenized_corpus())
 
     if (args.tokenize):
-        tokenize(tokens)
+        tokenize(get_tokenized_corpus())
 
     if (args.stopword):
-        remove_stopwords(tokens)
+        remove_stopwords(get_tokenized_corpus())
 
     if (args.stemming):
-        porter_stemming(tokens)
+        porter_stemming(get_tokenized_corpus())
 
     if (args.invertedindex):
-        print(inverted_index())
+        inverted_index(args.workers, args.stemcache, args.budget << 20)
+        print(f"Look terms up in {INVERTED_INDEX_FILE_NAME} with index_store.py.")
+
+    if (args.update):
+        update_inverted_index(args.workers, args.stemcache, args.budget << 20)
+
+    if (args.compact):
+        report = compact(SEGMENTED_INDEX_DIRECTORY, read_manifest(SEGMENTED_INDEX_DIRECTORY), force=True)
+        print(f"Compacted {report['merged']} segment(s) in {report['time']:.2f} s.")
+
+    if (args.stemcache):
+        index_stemmer().save(args.stemcache)
+        print(f"Saved {len(index_stemmer())} stems to {args.stemcache}.")
 
     return
 
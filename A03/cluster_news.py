@@ -1,4 +1,6 @@
 import argparse
+import os
+import sys
 from sklearn.datasets import fetch_20newsgroups
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans, AgglomerativeClustering, DBSCAN
@@ -8,13 +10,23 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import nltk
 
-def preprocess_data():
+# The term normalizer is shared with the A02 programs rather than copied, so
+# unlike the other assignment folders A03 is not self-contained: it needs
+# normalization.py from the A02 folder next to it.
+A02_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "A02")
+if not os.path.isfile(os.path.join(A02_DIRECTORY, "normalization.py")):
+    raise ImportError(f"cluster_news.py needs normalization.py from {os.path.normpath(A02_DIRECTORY)}")
+sys.path.insert(0, A02_DIRECTORY)
+from normalization import lemma_stem_normalizer
+
+def preprocess_data(stem_cache: str = None):
     """
     Description:
-        Preprocess the data.
+        Preprocess the data. Every word is lemmatized and stemmed once, and
+        repeated words are looked up in a cache.
 
     Parameters:
-        None
+        stem_cache: a file the normalization cache is loaded from and saved to.
 
     Returns:
         preprocessed_data: the preprocessed data.
@@ -24,12 +36,16 @@ def preprocess_data():
     data = [d[1] for d in data]
     data = [nltk.word_tokenize(d) for d in data]
 
-    stop_words = nltk.corpus.stopwords.words('english')
+    stop_words = set(nltk.corpus.stopwords.words('english'))
 
-    stemmer = nltk.stem.PorterStemmer()
-    lemmatizer = nltk.stem.WordNetLemmatizer()
+    normalizer = lemma_stem_normalizer()
+    if stem_cache:
+        normalizer.load(stem_cache)
 
-    data = [[stemmer.stem(lemmatizer.lemmatize(w.lower())) for w in d if w not in stop_words] for d in data]
+    data = [[normalizer(w) for w in d if w not in stop_words] for d in data]
+    print(f"Normalization cache hit rate: {normalizer.hit_rate():.2%} ({len(normalizer)} distinct words cached, {normalizer.misses} words stemmed)")
+    if stem_cache:
+        normalizer.save(stem_cache)
 
     vectorizer = TfidfVectorizer()
     data = vectorizer.fit_transform(data)
@@ -90,6 +106,7 @@ def arg_handler():
     parser.add_argument("--whc", help="Tells script to use Ward Hierarchical Clustering", action="store_true")
     parser.add_argument("--ac", help="Tells script to use Agglomerative clustering", action="store_true")
     parser.add_argument("--dbscan", help="Tells script to use DBSCAN clustering", action="store_true")
+    parser.add_argument("--stemcache", help="Tells script where to keep the lemma and stem cache between runs", default=None)
     args = parser.parse_args()
 
     return args
@@ -106,7 +123,7 @@ def main():
         None
     """
     args = arg_handler()
-    preprocessed_data = preprocess_data()
+    preprocessed_data = preprocess_data(args.stemcache)
 
     for ncluster in args.ncluster:
         if args.kmeans: